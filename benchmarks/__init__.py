@@ -0,0 +1,10 @@
+'''
+Benchmarks for bibliograph.
+
+Synthetic bibliographies and reference CSVs are generated by
+benchmarks.synthetic, ADS stages run against the local server in
+benchmarks.mockads, and benchmarks.run times every stage and writes
+machine-readable results. Run with
+
+	python -m benchmarks.run --sizes 1000 10000 --out bench.jsonl
+'''
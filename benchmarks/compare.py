@@ -0,0 +1,52 @@
+'''
+Compare two benchmark result files written by benchmarks.run.
+
+	python -m benchmarks.compare old.jsonl new.jsonl
+
+For every (benchmark, size) pair found in both files, print the time
+and peak memory from each file and the ratio new/old. When a file
+contains several records for the same pair, the fastest is used.
+'''
+import argparse
+import json
+
+def readResults(filename):
+	results = {}
+	with open(filename, encoding='utf8') as f:
+		for line in f:
+			if line.strip() == '':
+				continue
+			record = json.loads(line)
+			key = (record['benchmark'], record['size'])
+			if (key not in results) or (record['seconds'] < results[key]['seconds']):
+				results[key] = record
+	return(results)
+
+def compare(old, new, threshold=1.1):
+	'''
+	Print a comparison of two sets of results and return the keys of
+	benchmarks that got slower by more than threshold.
+	'''
+	slower = []
+	print('benchmark'.ljust(20), 'size'.rjust(9), 'old s'.rjust(10), 'new s'.rjust(10), 'ratio'.rjust(7), 'old MiB'.rjust(9), 'new MiB'.rjust(9))
+	for key in sorted(set(old) & set(new), key=lambda k: (k[0], k[1])):
+		o, n = old[key], new[key]
+		ratio = n['seconds']/o['seconds'] if o['seconds'] else float('inf')
+		mem = [format(r['peak_bytes']/2**20, '9.1f') if r.get('peak_bytes') is not None else '-'.rjust(9) for r in (o, n)]
+		flag = '  <-- slower' if ratio > threshold else ''
+		print(key[0].ljust(20), str(key[1]).rjust(9), format(o['seconds'], '10.3f'), format(n['seconds'], '10.3f'), format(ratio, '7.2f'), mem[0], mem[1] + flag)
+		if ratio > threshold:
+			slower.append(key)
+	return(slower)
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Compare two bibliograph benchmark result files.')
+	parser.add_argument('old')
+	parser.add_argument('new')
+	parser.add_argument('--threshold', type=float, default=1.1, help='ratio new/old above which a benchmark is reported as slower')
+	args = parser.parse_args(argv)
+	slower = compare(readResults(args.old), readResults(args.new), args.threshold)
+	return(1 if slower else 0)
+
+if __name__ == '__main__':
+	raise SystemExit(main())
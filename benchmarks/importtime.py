@@ -0,0 +1,64 @@
+'''
+Measure the cost of importing bibliograph in a fresh interpreter, the
+way worker processes pay it.
+
+	python -m benchmarks.importtime --repeat 10 --out bench.jsonl
+
+Each repetition starts a new Python process, imports bibliograph and
+reports the import time and which optional heavy dependencies were
+loaded. With lazy imports, ads and networkx should not appear.
+'''
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from os.path import dirname
+from .measure import measurement
+from .measure import resultWriter
+
+HEAVY = ['pandas', 'numpy', 'networkx', 'ads', 'requests', 'progressbar']
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+def importTime(module='bibliograph', repeat=10):
+	'''
+	Import module in repeat fresh interpreters.
+
+	Returns
+	-------
+	times : list
+		Import times in seconds
+
+	loaded : list
+		Heavy dependencies found in sys.modules after the import
+	'''
+	times = []
+	loaded = []
+	for i in range(repeat):
+		out = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY)], cwd=dirname(dirname(__file__)), capture_output=True, text=True, check=True).stdout
+		probe = json.loads(out.strip().split('\n')[-1])
+		times.append(probe['seconds'])
+		loaded = probe['loaded']
+	return(times, loaded)
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Measure bibliograph import time in fresh interpreters.')
+	parser.add_argument('--module', default='bibliograph')
+	parser.add_argument('--repeat', type=int, default=10)
+	parser.add_argument('--out', default=None, help='JSON lines file to append results to')
+	args = parser.parse_args(argv)
+
+	times, loaded = importTime(args.module, args.repeat)
+	writer = resultWriter(args.out)
+	writer.write('import ' + args.module, args.repeat, measurement(statistics.median(times), None, None), min_seconds=min(times), loaded=loaded)
+	print('loaded:', ', '.join(loaded) if loaded else 'none of ' + ', '.join(HEAVY))
+
+if __name__ == '__main__':
+	main()
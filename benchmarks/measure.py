@@ -0,0 +1,106 @@
+import gc
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from os.path import dirname
+
+def environment():
+	'''
+	Describe the environment a benchmark runs in so that results from
+	different runs can be compared.
+
+	Returns
+	-------
+	env : dictionary
+		git commit, python version, platform, and versions of the
+		packages bibliograph depends on.
+	'''
+	try:
+		commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=dirname(__file__), capture_output=True, text=True).stdout.strip()
+	except OSError:
+		commit = ''
+	env = {
+		'commit': commit,
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'timestamp': datetime.utcnow().isoformat(timespec='seconds')
+	}
+	for package in ['pandas', 'networkx', 'numpy']:
+		module = sys.modules.get(package)
+		env[package] = getattr(module, '__version__', None)
+	return(env)
+
+class measurement:
+	'''
+	Time and peak memory of one benchmarked call.
+
+	Attributes
+	----------
+	seconds : float
+		Wall time of the call
+
+	peakBytes : integer or None
+		Peak memory allocated by Python during the call, or None if
+		memory was not traced.
+
+	result
+		Return value of the call
+	'''
+	def __init__(self, seconds, peakBytes, result):
+		self.seconds = seconds
+		self.peakBytes = peakBytes
+		self.result = result
+
+def measure(func, *args, traceMemory=True, **kwargs):
+	'''
+	Call func(*args, **kwargs) and measure wall time and peak memory.
+	Tracing memory slows Python code down considerably, so compare
+	times only between runs with the same traceMemory setting.
+
+	Returns
+	-------
+	measurement
+	'''
+	gc.collect()
+	if traceMemory:
+		tracemalloc.start()
+	start = time.perf_counter()
+	try:
+		result = func(*args, **kwargs)
+		seconds = time.perf_counter() - start
+		peak = tracemalloc.get_traced_memory()[1] if traceMemory else None
+	finally:
+		if traceMemory:
+			tracemalloc.stop()
+	return(measurement(seconds, peak, result))
+
+class resultWriter:
+	'''
+	Append benchmark records to a JSON lines file. Every record
+	carries the environment description so that files from different
+	runs can be concatenated and compared.
+
+	Parameters
+	----------
+	filename : string or None
+		Name of the output file. If None, records are only printed.
+	'''
+	def __init__(self, filename=None):
+		self.filename = filename
+		self.env = environment()
+		self.records = []
+
+	def write(self, benchmark, size, m, **extra):
+		record = dict(self.env)
+		record.update({'benchmark': benchmark, 'size': size, 'seconds': m.seconds, 'peak_bytes': m.peakBytes})
+		record.update(extra)
+		self.records.append(record)
+		peak = '' if m.peakBytes is None else '  peak ' + format(m.peakBytes/2**20, '.1f') + ' MiB'
+		print(benchmark.ljust(20), str(size).rjust(9), format(m.seconds, '10.3f') + ' s' + peak)
+		if self.filename is not None:
+			with open(self.filename, 'a', encoding='utf8') as f:
+				f.write(json.dumps(record) + '\n')
@@ -0,0 +1,203 @@
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+from .synthetic import makeEntry
+
+class mockUniverse:
+	'''
+	A deterministic synthetic literature that the mock ADS server
+	answers queries from. Paper i only references papers with smaller
+	indices, so the citation graph is a DAG like most real citation
+	graphs.
+
+	Parameters
+	----------
+	size : integer
+		Number of papers in the universe
+
+	refsPerPaper : integer
+		Mean number of references per paper
+
+	seed : integer
+		Seed for the random number generator
+	'''
+	def __init__(self, size=100000, refsPerPaper=10, seed=0):
+		rng = random.Random(seed)
+		self.docs = []
+		self.byBibcode = {}
+		self.byKey = {}
+		for i in range(size):
+			entry = makeEntry(rng)
+			bibcode = (entry['year'] + entry['journal'].replace('&', '')).ljust(9, '.') + str(i).rjust(10, '.')
+			doc = {
+				'bibcode': bibcode,
+				'author': [entry['author'] + ', ' + rng.choice('ABCDEFG') + '.'] + [rng.choice(['Smith, J.', 'Jones, K.', 'Oort, J.'])]*rng.randint(0, 2),
+				'year': entry['year'],
+				'title': [entry['title']],
+				'pub': entry['journal'],
+				'volume': entry['volume'],
+				'page': [entry['page']],
+				'reference': [],
+				'citation': []
+			}
+			if i > 0:
+				for j in set(rng.randrange(0, i) for k in range(rng.randint(0, 2*refsPerPaper))):
+					doc['reference'].append(self.docs[j]['bibcode'])
+					self.docs[j]['citation'].append(bibcode)
+			self.docs.append(doc)
+			self.byBibcode[bibcode] = i
+			self.byKey[(entry['year'], entry['volume'], entry['page'])] = i
+
+	def find(self, q):
+		'''
+		Return the list of document indices that answer a query
+		string. Understands bibcode:X, bibcode:(X OR Y ...), the
+		year/volume/page searches made by bibliograph.nasaads, and the
+		references() and citations() operators wrapped around any of
+		those. Unrecognized searches map onto an arbitrary paper so
+		that every query returns data.
+		'''
+		q = q.strip()
+		operator = re.match(r'^(references|citations)\((.*)\)$', q)
+		if operator is not None:
+			found = self.find(operator.group(2))
+			field = 'reference' if operator.group(1) == 'references' else 'citation'
+			result = []
+			for i in found:
+				result.extend(self.byBibcode[b] for b in self.docs[i][field])
+			return(result)
+
+		bibcodes = re.match(r'^bibcode:\(?(.*?)\)?$', q)
+		if bibcodes is not None:
+			return([self.byBibcode[b] for b in bibcodes.group(1).split(' OR ') if b in self.byBibcode])
+
+		terms = dict(re.findall(r'(\w+):(\S+)', q))
+		key = (terms.get('year'), terms.get('volume'), terms.get('page'))
+		if key in self.byKey:
+			return([self.byKey[key]])
+		return([sum(map(ord, q)) % len(self.docs)])
+
+class _handler(BaseHTTPRequestHandler):
+
+	def log_message(self, *args):
+		pass
+
+	def do_GET(self):
+		server = self.server
+		url = urlparse(self.path)
+		if not url.path.rstrip('/').endswith('/search/query'):
+			self.send_error(404)
+			return
+		query = parse_qs(url.query)
+		params = {k: v[0] for k, v in query.items()}
+		q = params.get('q', '')
+		fl = ','.join(query.get('fl', ['id'])).split(',')
+		start = int(params.get('start', 0))
+		rows = int(params.get('rows', 50))
+
+		if server.latency:
+			time.sleep(server.latency)
+
+		with server.lock:
+			server.queries += 1
+			server.remaining -= 1
+		found = server.universe.find(q)
+		docs = [{f: server.universe.docs[i][f] for f in fl if f in server.universe.docs[i]} for i in found[start:start + rows]]
+
+		body = json.dumps({
+			'responseHeader': {'status': 0, 'QTime': 1, 'params': {'q': q, 'fl': ','.join(fl), 'start': str(start), 'rows': str(rows)}},
+			'response': {'numFound': len(found), 'start': start, 'docs': docs}
+		}).encode('utf8')
+
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.send_header('X-RateLimit-Limit', str(server.limit))
+		self.send_header('X-RateLimit-Remaining', str(server.remaining))
+		self.send_header('X-RateLimit-Reset', str(int(time.time()) + 86400))
+		self.end_headers()
+		self.wfile.write(body)
+
+class mockADS:
+	'''
+	Local HTTP server that answers NASA/ADS search API requests from a
+	mockUniverse. Use as a context manager; on entry the ads package is
+	pointed at the server, on exit the original endpoint is restored.
+
+		with mockADS(mockUniverse(10000)) as server:
+			cn.getADSbibcodes(['year', 'volume', 'page'])
+			print(server.queries)
+
+	Parameters
+	----------
+	universe : mockUniverse
+		Papers the server answers queries from
+
+	latency : float
+		Seconds to sleep before answering each request, to model the
+		round trip to the real API.
+
+	limit : integer
+		Daily rate limit reported in the response headers
+	'''
+	def __init__(self, universe=None, latency=0.0, limit=10**9):
+		self.universe = universe if universe is not None else mockUniverse()
+		self.latency = latency
+		self.limit = limit
+		self.httpd = None
+		self.thread = None
+		self.saved = None
+
+	@property
+	def url(self):
+		return('http://127.0.0.1:' + str(self.httpd.server_address[1]) + '/v1/search/query')
+
+	@property
+	def queries(self):
+		return(self.httpd.queries)
+
+	def start(self):
+		self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _handler)
+		self.httpd.daemon_threads = True
+		self.httpd.universe = self.universe
+		self.httpd.latency = self.latency
+		self.httpd.limit = self.limit
+		self.httpd.remaining = self.limit
+		self.httpd.queries = 0
+		self.httpd.lock = threading.Lock()
+		self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+		self.thread.start()
+		self.patch()
+		return(self)
+
+	def stop(self):
+		self.unpatch()
+		self.httpd.shutdown()
+		self.httpd.server_close()
+		self.thread.join()
+
+	def patch(self):
+		import ads
+		import ads.search
+		self.saved = (ads.search.SearchQuery.HTTP_ENDPOINT, ads.config.token)
+		ads.search.SearchQuery.HTTP_ENDPOINT = self.url
+		ads.config.token = 'mock-token'
+
+	def unpatch(self):
+		import ads
+		import ads.search
+		if self.saved is not None:
+			ads.search.SearchQuery.HTTP_ENDPOINT, ads.config.token = self.saved
+			self.saved = None
+
+	def __enter__(self):
+		return(self.start())
+
+	def __exit__(self, *args):
+		self.stop()
@@ -0,0 +1,260 @@
+'''
+Run bibliograph benchmarks on synthetic data.
+
+	python -m benchmarks.run --sizes 1000 10000 --out bench.jsonl
+
+For each size, a BibTex file with that many entries and a reference
+CSV listing references for every unique entry are generated in a
+temporary directory, then every stage is run in order on the same
+citnet. ADS stages run against benchmarks.mockads and are skipped if
+the ads package is not installed.
+'''
+import argparse
+import os
+import random
+import tempfile
+from . import synthetic
+from .measure import measure
+from .measure import resultWriter
+
+STAGES = ['update', 'reach', 'bibtex', 'csv', 'makeGraph', 'writeNetwork', 'export', 'load', 'arrow', 'database', 'timeline', 'authors', 'adsBibcodes', 'adsReferences', 'adsReferencesDocs', 'snowball', 'snowballDocs']
+
+def adsProcessor(article):
+	return([article.author[0].split(',')[0], article.year, article.title[0], article.pub, article.volume, article.page[0], article.bibcode])
+
+ADS_FETCH_TERMS = ['author', 'year', 'title', 'pub', 'volume', 'page', 'bibcode']
+
+ADS_FETCH_COLUMNS = ['author', 'year', 'title', 'journal', 'volume', 'page', 'bibcode']
+
+def runSize(size, writer, stages=STAGES, dupRate=0.05, refsPerSource=10, adsLimit=200, adsLatency=0.0, traceMemory=True, workdir=None):
+	'''
+	Generate data with size entries and run the benchmarked stages.
+
+	Parameters
+	----------
+	size : integer
+		Number of entries in the synthetic BibTex file
+
+	writer : benchmarks.measure.resultWriter
+		Destination for results
+
+	stages : list-like
+		Names of stages to run, a subset of STAGES. Stages after
+		bibtex use the network built by bibtex, so they also run the
+		bibtex stage.
+
+	dupRate : float
+		Fraction of repeated entries in the BibTex file
+
+	refsPerSource : integer
+		Mean number of references per source in the reference CSV
+
+	adsLimit : integer
+		Maximum number of bibliography entries to query in each ADS
+		stage.
+
+	adsLatency : float
+		Seconds of simulated latency per mock ADS request
+
+	traceMemory : boolean
+		If True, record peak memory with tracemalloc
+
+	workdir : string
+		Directory for generated files. A temporary directory is used
+		if None.
+	'''
+	from bibliograph import citnet
+	from bibliograph.instrument import monitor
+	from bibliograph.util import makeGraph
+
+	mon = monitor(quiet=True)
+
+	with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+		bibtex = os.path.join(tmp, 'synthetic.bib')
+		csvfile = os.path.join(tmp, 'synthetic.csv')
+		prefix = os.path.join(tmp, 'synthetic')
+
+		entries = synthetic.makeBibTex(bibtex, size, dupRate=dupRate)
+
+		if 'update' in stages:
+			import pandas as pd
+			cn = citnet(bibcols=synthetic.BIBCOLS, refcols=synthetic.REFCOLS, monitor=mon)
+			rows = [pd.Series(e, index=synthetic.BIBCOLS) for e in entries]
+			def updateAll():
+				for row in rows:
+					cn.update(row)
+			mon.reset()
+			m = measure(updateAll, traceMemory=traceMemory)
+			writer.write('update', size, m, metrics=mon.report(), rows=len(cn.bib))
+
+		if 'reach' in stages:
+			from bibliograph.reach import reachIndex
+			bib, cit = synthetic.makeCitationGraph(size, citationsPerPaper=refsPerSource)
+			mon.reset()
+			m = measure(reachIndex, bib, cit, monitor=mon, traceMemory=traceMemory)
+			index = m.result
+			writer.write('reachBuild', size, m, metrics=mon.report(), edges=len(cit), components=index.numComponents, condensedEdges=index.numCondensedEdges, indexBytes=index.nbytes())
+
+			rng = random.Random(0)
+			pairs = [(rng.randrange(size), rng.randrange(size)) for i in range(1000)]
+			m = measure(lambda: [index.reaches(s, t) for s, t in pairs], traceMemory=False)
+			writer.write('reachQuery', size, m, queries=len(pairs), positive=sum(m.result))
+			found = [p for p, r in zip(pairs, m.result) if r][:100]
+			m = measure(lambda: [index.path(s, t) for s, t in found], traceMemory=False)
+			writer.write('reachPath', size, m, queries=len(found), meanLength=sum(len(p) - 1 for p in m.result)/max(len(found), 1))
+
+		if not any(s in stages for s in STAGES if s not in ['update', 'reach']):
+			return
+
+		mon.reset()
+		m = measure(citnet, bibtex=bibtex, bibcols=synthetic.BIBCOLS, refcols=synthetic.REFCOLS, monitor=mon, traceMemory=traceMemory)
+		cn = m.result
+		if 'bibtex' in stages:
+			writer.write('bibtex', size, m, metrics=mon.report(), rows=len(cn.bib))
+
+		if 'csv' in stages:
+			numTargets = synthetic.makeReferenceCSV(csvfile, entries, refsPerSource=refsPerSource)
+			mon.reset()
+			m = measure(cn.loadCSV, csvfile, translator=synthetic.refTranslator, traceMemory=traceMemory)
+			writer.write('csv', size, m, metrics=mon.report(), rows=len(cn.bib), edges=len(cn.cit), csvTargets=numTargets)
+
+		mon.reset()
+		m = measure(makeGraph, cn.bib, cn.cit, cn.uid, traceMemory=traceMemory)
+		cn.graph = m.result
+		if 'makeGraph' in stages:
+			writer.write('makeGraph', size, m, metrics=mon.report(), nodes=cn.graph.number_of_nodes(), edges=cn.graph.number_of_edges())
+
+		if 'writeNetwork' in stages:
+			mon.reset()
+			m = measure(cn.writeNetwork, prefix, traceMemory=traceMemory)
+			writer.write('writeNetwork', size, m, metrics=mon.report(), bytes=sum(os.path.getsize(prefix + s) for s in ['-bib.json', '-cit.json', '.graphml']))
+
+		if 'export' in stages:
+			for extension in ['.graphml', '.gexf', '.csv']:
+				mon.reset()
+				m = measure(cn.export, prefix + '-export' + extension, traceMemory=traceMemory)
+				writer.write('export' + extension, size, m, metrics=mon.report(), bytes=os.path.getsize(prefix + '-export' + extension))
+
+		if 'load' in stages:
+			if not os.path.isfile(prefix + '-bib.json'):
+				cn.writeNetwork(prefix)
+			mon.reset()
+			m = measure(citnet, fileprefix=prefix, refcols=synthetic.REFCOLS, monitor=mon, traceMemory=traceMemory)
+			writer.write('load', size, m, metrics=mon.report(), rows=len(m.result.bib))
+
+		if 'arrow' in stages:
+			try:
+				import pyarrow
+			except ImportError:
+				print('pyarrow not installed, skipping Arrow benchmarks')
+			else:
+				mon.reset()
+				m = measure(cn.writeArrow, prefix, traceMemory=traceMemory)
+				writer.write('writeArrow', size, m, metrics=mon.report(), bytes=sum(os.path.getsize(prefix + s) for s in ['-bib.arrow', '-cit.arrow']))
+				mon.reset()
+				m = measure(citnet, fileprefix=prefix, monitor=mon, traceMemory=traceMemory)
+				writer.write('loadArrow', size, m, metrics=mon.report(), rows=len(m.result.bib))
+
+		if 'database' in stages:
+			database = prefix + '.sqlite'
+			def buildDatabase():
+				stored = citnet(bibtex=bibtex, bibcols=synthetic.BIBCOLS, refcols=synthetic.REFCOLS, database=database, monitor=mon)
+				if os.path.isfile(csvfile):
+					stored.loadCSV(csvfile, translator=synthetic.refTranslator)
+				return(stored)
+			mon.reset()
+			m = measure(buildDatabase, traceMemory=traceMemory)
+			stored = m.result
+			writer.write('database', size, m, metrics=mon.report(), rows=len(stored.store), edges=stored.store.numEdges(), bytes=os.path.getsize(database))
+			stored.addIndex('year')
+			mon.reset()
+			m = measure(lambda: stored.subnetwork(stored.select('year', ('1950', '1959'))), traceMemory=traceMemory)
+			writer.write('databaseSubnetwork', size, m, metrics=mon.report(), rows=len(m.result.bib), edges=len(m.result.cit))
+			stored.store.close()
+
+		if 'timeline' in stages:
+			mon.reset()
+			m = measure(lambda: cn.timeline().metrics(), traceMemory=traceMemory)
+			writer.write('timeline', size, m, metrics=mon.report(), years=len(m.result), edges=int(m.result['citations'].iloc[-1]) if len(m.result) else 0)
+
+		if 'authors' in stages:
+			from bibliograph.pipeline import pipeline
+			config = {'name': os.path.join(tmp, 'authors'), 'bibcols': synthetic.BIBCOLS, 'refcols': synthetic.REFCOLS, 'inputs': [{'bibtex': bibtex}], 'authors': {'allAuthors': True}}
+			mon.reset()
+			m = measure(pipeline(config, monitor=mon).run, stages=['ingest', 'authors', 'graph'], traceMemory=traceMemory)
+			writer.write('authors', size, m, metrics=mon.report(), authors=len(m.result.authors))
+
+		if any(s in stages for s in ['adsBibcodes', 'adsReferences', 'adsReferencesDocs', 'snowball', 'snowballDocs']):
+			try:
+				import ads
+			except ImportError:
+				print('ads package not installed, skipping ADS benchmarks')
+				return
+			from .mockads import mockADS
+			from .mockads import mockUniverse
+
+			with mockADS(mockUniverse(max(size, 1000)), latency=adsLatency) as server:
+				if any(s in stages for s in ['adsBibcodes', 'adsReferences', 'adsReferencesDocs']):
+					toQuery = cn.bib.index < adsLimit
+					queriesBefore = server.queries
+					mon.reset()
+					m = measure(cn.getADSbibcodes, ['year', 'volume', 'page'], toQuery=toQuery, traceMemory=traceMemory)
+					if 'adsBibcodes' in stages:
+						writer.write('adsBibcodes', size, m, metrics=mon.report(), queries=server.queries - queriesBefore)
+
+				if 'adsReferences' in stages:
+					toQuery = (cn.bib.index < adsLimit) & cn.bib['bibcode'].notna() & (cn.bib['bibcode'] != '?')
+					rowsBefore = len(cn.bib)
+					queriesBefore = server.queries
+					mon.reset()
+					m = measure(cn.queryADS, ['bibcode'], list(ADS_FETCH_TERMS), fetchColumns=list(ADS_FETCH_COLUMNS), toQuery=toQuery, articleProcessor=adsProcessor, traceMemory=traceMemory)
+					writer.write('adsReferences', size, m, metrics=mon.report(), queries=server.queries - queriesBefore, newRows=len(cn.bib) - rowsBefore)
+
+				if 'adsReferencesDocs' in stages:
+					# without an articleProcessor, responses are decoded
+					# column by column with nasaads.docColumns
+					toQuery = (cn.bib.index < adsLimit) & cn.bib['bibcode'].notna() & (cn.bib['bibcode'] != '?')
+					rowsBefore = len(cn.bib)
+					queriesBefore = server.queries
+					mon.reset()
+					m = measure(cn.queryADS, ['bibcode'], list(ADS_FETCH_TERMS), fetchColumns=list(ADS_FETCH_COLUMNS), toQuery=toQuery, traceMemory=traceMemory)
+					writer.write('adsReferencesDocs', size, m, metrics=mon.report(), queries=server.queries - queriesBefore, newRows=len(cn.bib) - rowsBefore)
+
+				if 'snowball' in stages:
+					seeds = [d['bibcode'] for d in server.universe.docs[-10:]]
+					rowsBefore = len(cn.bib)
+					queriesBefore = server.queries
+					mon.reset()
+					m = measure(cn.snowball, seeds, list(ADS_FETCH_TERMS), fetchColumns=list(ADS_FETCH_COLUMNS), articleProcessor=adsProcessor, depth=2, maxSize=adsLimit, traceMemory=traceMemory)
+					writer.write('snowball', size, m, metrics=mon.report(), queries=server.queries - queriesBefore, fetched=len(m.result.fetched), newRows=len(cn.bib) - rowsBefore, edges=m.result.edges)
+
+				if 'snowballDocs' in stages:
+					# crawl into a new network keyed by title, the default
+					# uid, decoding responses with nasaads.docColumns
+					crawled = citnet(bibcols=list(ADS_FETCH_COLUMNS), monitor=mon)
+					seeds = [d['bibcode'] for d in server.universe.docs[-10:]]
+					queriesBefore = server.queries
+					mon.reset()
+					m = measure(crawled.snowball, seeds, list(ADS_FETCH_TERMS), fetchColumns=list(ADS_FETCH_COLUMNS), depth=2, maxSize=adsLimit, traceMemory=traceMemory)
+					writer.write('snowballDocs', size, m, metrics=mon.report(), queries=server.queries - queriesBefore, fetched=len(m.result.fetched), newRows=len(crawled.bib), edges=m.result.edges)
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Benchmark bibliograph on synthetic data.')
+	parser.add_argument('--sizes', type=int, nargs='+', default=[1000], help='numbers of BibTex entries, e.g. 1000 10000 100000 1000000')
+	parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES)
+	parser.add_argument('--dup-rate', type=float, default=0.05, help='fraction of repeated BibTex entries')
+	parser.add_argument('--refs-per-source', type=int, default=10)
+	parser.add_argument('--ads-limit', type=int, default=200, help='maximum entries queried in each ADS stage')
+	parser.add_argument('--ads-latency', type=float, default=0.0, help='seconds of simulated latency per ADS request')
+	parser.add_argument('--no-memory', action='store_true', help='do not trace peak memory (tracing slows Python code)')
+	parser.add_argument('--workdir', default=None, help='directory for generated files')
+	parser.add_argument('--out', default=None, help='JSON lines file to append results to')
+	args = parser.parse_args(argv)
+
+	import bibliograph
+	writer = resultWriter(args.out)
+	for size in args.sizes:
+		runSize(size, writer, stages=args.stages, dupRate=args.dup_rate, refsPerSource=args.refs_per_source, adsLimit=args.ads_limit, adsLatency=args.ads_latency, traceMemory=not args.no_memory, workdir=args.workdir)
+
+if __name__ == '__main__':
+	main()
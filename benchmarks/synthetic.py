@@ -0,0 +1,231 @@
+import random
+
+SURNAMES = ['Smith', 'Jones', 'Chandrasekhar', 'Hubble', 'Zwicky', 'Payne',
+			'Eddington', 'Baade', 'Minkowski', 'Oort', 'Spitzer', 'Schwarzschild',
+			'Hale', 'Shapley', 'Leavitt', 'Russell', 'Hoyle', 'Gamow', 'Bethe',
+			'Sandage', 'Rubin', 'Burbidge', 'Fowler', 'Kuiper', 'Struve']
+
+INITIALS = 'ABCDEFGHIJKLMNOPRSTW'
+
+JOURNALS = ['ApJ', 'MNRAS', 'AJ', 'PASP', 'A&A', 'Nature', 'PhRv', 'ZPhy']
+
+WORDS = ['stellar', 'evolution', 'spectra', 'nebulae', 'galactic', 'rotation',
+		'radiative', 'transfer', 'magnetic', 'fields', 'interstellar',
+		'absorption', 'photometry', 'clusters', 'variable', 'stars',
+		'cosmic', 'rays', 'solar', 'corona', 'dynamics', 'of', 'the', 'on',
+		'observations', 'theory', 'structure', 'atmospheres', 'nuclear']
+
+BIBCOLS = ['author', 'year', 'title', 'journal', 'volume', 'page', 'ref']
+
+REFCOLS = ['author', 'year', 'volume', 'page']
+
+def makeEntry(rng):
+	'''
+	Make one synthetic bibliography entry.
+
+	Parameters
+	----------
+	rng : random.Random
+		Random number generator
+
+	Returns
+	-------
+	entry : dictionary
+		Values for every column in BIBCOLS. The author column holds
+		only the first author's surname so that the ref string built
+		from REFCOLS contains exactly one value per column.
+	'''
+	entry = {
+		'author': rng.choice(SURNAMES),
+		'year': str(rng.randint(1900, 1990)),
+		'title': ' '.join(rng.choice(WORDS) for i in range(rng.randint(3, 10))).capitalize(),
+		'journal': rng.choice(JOURNALS),
+		'volume': str(rng.randint(1, 400)),
+		'page': str(rng.randint(1, 2000))
+	}
+	entry['ref'] = ' '.join(entry[c] for c in REFCOLS)
+	return(entry)
+
+def makeEntries(n, dupRate=0.05, seed=0):
+	'''
+	Make a list of synthetic bibliography entries with a fraction of
+	repeated entries. Repeats share a ref string with an earlier entry
+	but have some fields blanked so that loading them exercises the
+	fill-'x' update path.
+
+	Parameters
+	----------
+	n : integer
+		Number of entries including duplicates
+
+	dupRate : float
+		Fraction of entries which repeat an earlier entry
+
+	seed : integer
+		Seed for the random number generator
+
+	Returns
+	-------
+	entries : list
+		List of dictionaries, one per entry
+	'''
+	rng = random.Random(seed)
+	entries = []
+	for i in range(n):
+		if entries and (rng.random() < dupRate):
+			entry = dict(rng.choice(entries))
+			for c in ['title', 'journal']:
+				if rng.random() < 0.5:
+					entry[c] = 'x'
+		else:
+			entry = makeEntry(rng)
+		entries.append(entry)
+	return(entries)
+
+def writeBibTex(filename, entries):
+	'''
+	Write entries to a BibTex file.
+
+	Parameters
+	----------
+	filename : string
+		Name of the BibTex file to write
+
+	entries : list
+		List of dictionaries like the ones returned by makeEntries.
+		Fields with value 'x' are left out of the file.
+	'''
+	with open(filename, 'w', encoding='utf8') as f:
+		for i, entry in enumerate(entries):
+			f.write('@article{key' + str(i) + ',\n')
+			fields = [c for c in BIBCOLS if (c != 'ref') and (entry[c] != 'x')]
+			f.write(',\n'.join('\t' + c + ' = {' + entry[c] + '}' for c in fields))
+			f.write('\n}\n\n')
+
+def makeBibTex(filename, n, dupRate=0.05, seed=0):
+	'''
+	Write a synthetic BibTex file with n entries.
+
+	Returns
+	-------
+	entries : list
+		The entries written to the file
+	'''
+	entries = makeEntries(n, dupRate=dupRate, seed=seed)
+	writeBibTex(filename, entries)
+	return(entries)
+
+def makeReferenceCSV(filename, entries, refsPerSource=10, newSourceRate=0.1, dupRate=0.3, separator=' | ', seed=0):
+	'''
+	Write a two-column reference CSV in the format read by
+	bibliograph.readwrite.slurpReferenceCSV. Sources are refs of the
+	given entries, plus a fraction of sources which are not in the
+	bibliography. Targets repeat earlier targets at dupRate, which is
+	typical of reference lists where the same classic papers are cited
+	by many sources.
+
+	Parameters
+	----------
+	filename : string
+		Name of the csv file to write
+
+	entries : list
+		Bibliography entries whose refs are used as sources
+
+	refsPerSource : integer
+		Mean number of references listed under each source
+
+	newSourceRate : float
+		Fraction of sources not found in entries
+
+	dupRate : float
+		Fraction of targets which repeat an earlier target
+
+	separator : string
+		Separator between fields of a target entry
+
+	seed : integer
+		Seed for the random number generator
+
+	Returns
+	-------
+	numTargets : integer
+		Number of target rows written
+	'''
+	rng = random.Random(seed)
+	seen = {}
+	sources = []
+	for entry in entries:
+		if entry['ref'] not in seen:
+			seen[entry['ref']] = True
+			sources.append(entry['ref'])
+	targets = []
+	numTargets = 0
+	with open(filename, 'w', encoding='utf-8') as f:
+		for src in sources:
+			if rng.random() < newSourceRate:
+				src = makeEntry(rng)['ref']
+			f.write(src + ',\n')
+			for i in range(rng.randint(1, 2*refsPerSource - 1)):
+				if targets and (rng.random() < dupRate):
+					tgt = rng.choice(targets)
+				else:
+					tgt = makeEntry(rng)
+					targets.append(tgt)
+				f.write(',"' + separator.join(tgt[c] for c in BIBCOLS if c != 'ref') + '"\n')
+				numTargets += 1
+	return(numTargets)
+
+def refTranslator(fields):
+	'''
+	Translator for slurpReferenceCSV which turns the fields written by
+	makeReferenceCSV into values for every column in BIBCOLS.
+	'''
+	entry = dict(zip([c for c in BIBCOLS if c != 'ref'], fields))
+	return([entry[c] for c in BIBCOLS if c != 'ref'] + [' '.join(entry[c] for c in REFCOLS)])
+
+def makeCitationGraph(numPapers, citationsPerPaper=10, forwardRate=0.001, seed=0):
+	'''
+	Make bibliography and citation DataFrames for a large citation
+	network without going through BibTex and CSV files. Papers are
+	numbered in order of publication and cite uniformly chosen
+	earlier papers, except that a fraction of citations point to one
+	of the next few papers, as happens with errata, replies and papers
+	published in the same issue, so the graph has a few small cycles.
+
+	Parameters
+	----------
+	numPapers : integer
+		Number of papers
+
+	citationsPerPaper : integer
+		Mean number of citations made by each paper
+
+	forwardRate : float
+		Fraction of citations to one of the next ten papers
+
+	seed : integer
+		Seed for the random number generator
+
+	Returns
+	-------
+	bib : pd.DataFrame
+		Bibliography with 'ref' and 'year' columns
+
+	cit : pd.DataFrame
+		Citations with 'src' and 'tgt' columns, without duplicates or
+		self-citations
+	'''
+	import numpy as np
+	import pandas as pd
+	rng = np.random.default_rng(seed)
+	numCitations = numPapers*citationsPerPaper
+	src = rng.integers(1, numPapers, numCitations)
+	tgt = (rng.random(numCitations)*src).astype('int64')
+	forward = rng.random(numCitations) < forwardRate
+	tgt[forward] = np.minimum(src[forward] + rng.integers(1, 11, forward.sum()), numPapers - 1)
+	cit = pd.DataFrame({'src': src, 'tgt': tgt})
+	cit = cit[cit['src'] != cit['tgt']].drop_duplicates(ignore_index=True)
+	years = 1900 + (np.arange(numPapers)*100)//numPapers
+	bib = pd.DataFrame({'ref': ['paper' + str(i) for i in range(numPapers)], 'year': years.astype(str)})
+	return(bib, cit)
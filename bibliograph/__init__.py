@@ -1,4 +1,6 @@
 
 from .citnet import citnet
+from .citnet import fromArrow
+from .citnet import mergeCitnets
 
 
@@ -0,0 +1,135 @@
+import json
+from os.path import isfile
+
+# column holding bibliography index labels in Arrow bib tables
+LABEL = 'label'
+
+# schema metadata key holding uid and refcols
+META = b'bibliograph'
+
+def arrowColumn(series):
+	'''
+	Arrow array of one bibliography column. Numeric columns, such as
+	fingerprint uids, are wrapped without copying. Columns whose values
+	Arrow can't give a single type, such as lists mixed with 'x', are
+	stored as strings.
+	'''
+	import pyarrow as pa
+	try:
+		return(pa.array(series.to_numpy(), from_pandas=True))
+	except (pa.ArrowInvalid, pa.ArrowTypeError):
+		return(pa.array(series.astype(str).to_numpy(), type=pa.string()))
+
+def bibTable(bib, uid, refcols):
+	'''
+	Arrow table of a bibliography, with index labels in a 'label'
+	column followed by the bibliography columns. uid and refcols are
+	stored in the schema metadata.
+	'''
+	import pyarrow as pa
+	if LABEL in bib.columns:
+		raise ValueError('Bibliography column ' + LABEL + ' is reserved for index labels in Arrow tables')
+	arrays = [pa.array(bib.index.to_numpy())] + [arrowColumn(bib[c]) for c in bib.columns]
+	names = [LABEL] + [str(c) for c in bib.columns]
+	table = pa.Table.from_arrays(arrays, names=names)
+	return(table.replace_schema_metadata({META: json.dumps({'uid': uid, 'refcols': refcols})}))
+
+def citTable(cit):
+	'''
+	Arrow table of citations with int64 'src' and 'tgt' columns, which
+	wrap the cit columns without copying if they are already int64.
+	'''
+	import pyarrow as pa
+	return(pa.Table.from_arrays([pa.array(cit[c].to_numpy(dtype='int64')) for c in ['src', 'tgt']], names=['src', 'tgt']))
+
+def tableMeta(table):
+	'''
+	uid and refcols stored in the metadata of a bib table, or an empty
+	dictionary
+	'''
+	metadata = table.schema.metadata or {}
+	if META not in metadata:
+		return({})
+	return(json.loads(metadata[META]))
+
+def fromTables(bib, cit):
+	'''
+	bib and cit DataFrames from Arrow tables made by bibTable and
+	citTable, or any tables with the same columns. Numeric columns are
+	converted without copying where Arrow allows it.
+	'''
+	frame = bib.to_pandas(split_blocks=True)
+	if LABEL in frame.columns:
+		frame = frame.set_index(LABEL)
+		frame.index.name = None
+	edges = cit.select(['src', 'tgt']).to_pandas(split_blocks=True)
+	return(frame, edges)
+
+def isArrow(prefix):
+	'''
+	True if prefix names a network written by writeArrow
+	'''
+	return(isfile(prefix + '-bib.arrow') and isfile(prefix + '-cit.arrow'))
+
+def writeTable(table, filename, chunkSize=100000):
+	import pyarrow as pa
+	with pa.OSFile(filename, 'wb') as sink:
+		with pa.ipc.new_file(sink, table.schema) as writer:
+			writer.write_table(table, max_chunksize=chunkSize)
+
+def readTable(filename, memoryMap=True):
+	'''
+	Read an Arrow IPC file. If memoryMap is True, the table refers to
+	the memory-mapped file instead of copying it into memory.
+	'''
+	import pyarrow as pa
+	source = pa.memory_map(filename, 'r') if memoryMap else pa.OSFile(filename, 'rb')
+	return(pa.ipc.open_file(source).read_all())
+
+def writeArrow(cn, prefix, chunkSize=100000):
+	'''
+	Write the bibliography and citations of a citation network to the
+	Arrow IPC files prefix + '-bib.arrow' and prefix + '-cit.arrow'.
+	DuckDB, Polars and other Arrow engines can memory-map these files
+	directly, and citnet(fileprefix=prefix) loads them.
+
+	Parameters
+	----------
+	cn : bibliograph.citnet
+		The network to write
+
+	prefix : string
+		Prefix for the file names
+
+	chunkSize : integer
+		Rows per Arrow record batch
+	'''
+	with cn.monitor.stage('writeArrow'):
+		writeTable(bibTable(cn.bib, cn.uid, cn.refcols), prefix + '-bib.arrow', chunkSize=chunkSize)
+		writeTable(citTable(cn.cit), prefix + '-cit.arrow', chunkSize=chunkSize)
+
+def loadArrow(cn, prefix, memoryMap=True):
+	'''
+	Load a network written by writeArrow into cn, replacing its bib
+	and cit. uid and refcols are read from the file metadata.
+	'''
+	with cn.monitor.stage('loadArrow'):
+		bib = readTable(prefix + '-bib.arrow', memoryMap=memoryMap)
+		cit = readTable(prefix + '-cit.arrow', memoryMap=memoryMap)
+		setTables(cn, bib, cit)
+
+def setTables(cn, bib, cit):
+	'''
+	Replace the bib and cit of cn with Arrow tables, taking uid and
+	refcols from the bib table metadata if it has them. Secondary
+	indexes of cn are rebuilt for the new bib.
+	'''
+	meta = tableMeta(bib)
+	cn.bib, cn.cit = fromTables(bib, cit)
+	cn.uid = meta.get('uid', cn.uid)
+	cn.refcols = meta.get('refcols', cn.refcols)
+	cn.notUnique = [c for c in cn.columns if c != cn.uid]
+	cn._graph = None
+	cn._graphFile = None
+	cn._pendingGraph = cn._buildGraph
+	cn.rebuildIndexes()
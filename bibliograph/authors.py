@@ -0,0 +1,328 @@
+import ast
+import json
+import os
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+
+# LaTeX accent commands like \"{o}, {\'e} or \c c, and the braces BibTex
+# uses to protect capitals
+LATEX_ACCENT = re.compile(r'\\[`\'^"~=.uvHtcdbk]\s*\{?([A-Za-z])\}?')
+LATEX_COMMAND = re.compile(r'\\[A-Za-z]+\s*')
+
+# generational suffixes, which are not part of the surname
+SUFFIXES = {'jr', 'sr', 'ii', 'iii', 'iv'}
+
+# lowercase words that start a surname, as in 'J. D. van der Waals'
+PARTICLES = {'van', 'von', 'der', 'den', 'de', 'del', 'della', 'des', 'di', 'da', 'du', 'dos', 'la', 'le', 'ter', 'ten', 'zu'}
+
+def authorIds(value):
+	'''
+	Author ids in a value of a column made by authorIndex.column with
+	allAuthors=True. Single ids read back from JSON files as integers
+	are accepted.
+
+	Returns
+	-------
+	ids : list
+		Integer ids, empty for 'x'
+	'''
+	if isinstance(value, (int, np.integer)):
+		return([int(value)])
+	if (not isinstance(value, str)) or (value == 'x'):
+		return([])
+	return([int(i) for i in value.split()])
+
+def splitAuthors(value):
+	'''
+	Split a bibliography field into author names. BibTex fields are
+	split on ' and ', fields with several names separated by ';' are
+	split on ';' and list-valued fields (like ADS author lists) are
+	used as they are. Lists stored as text, as they are in SQLite
+	databases and Arrow string columns, are read back as lists. 'x',
+	NaN and empty names are dropped.
+
+	Returns
+	-------
+	names : list
+	'''
+	if isinstance(value, (list, tuple, np.ndarray)):
+		items = value
+	elif (value is None) or (isinstance(value, float) and np.isnan(value)):
+		items = []
+	elif isinstance(value, str) and value.startswith('[') and value.endswith(']'):
+		try:
+			items = ast.literal_eval(value)
+		except (ValueError, SyntaxError):
+			items = [value]
+	else:
+		items = re.split(r'\s+and\s+|;', str(value))
+	names = []
+	for item in items:
+		item = str(item).strip()
+		if (item != '') and (item != 'x'):
+			names.append(item)
+	return(names)
+
+def plainText(text):
+	'''
+	Remove LaTeX accents, braces and diacritics from a name and
+	lowercase it.
+	'''
+	text = LATEX_ACCENT.sub(r'\1', text)
+	text = LATEX_COMMAND.sub('', text).replace('{', '').replace('}', '')
+	text = unicodedata.normalize('NFKD', text)
+	return(''.join(c for c in text if not unicodedata.combining(c)).lower())
+
+def dropSuffixes(words):
+	'''
+	words without the generational suffixes at their end
+	'''
+	words = list(words)
+	while (len(words) != 0) and (re.sub(r'[^a-z]', '', words[-1]) in SUFFIXES):
+		words.pop()
+	return(words)
+
+def authorKey(name, initials=True):
+	'''
+	Canonical form of one author name: the lowercased surname without
+	accents followed by the first initial, if there is one. 'Hubble,
+	Edwin P.', 'Hubble, E.', 'E. P. Hubble' and 'Edwin Hubble' all
+	become 'hubble e'. Suffixes (Jr, Sr, II, III, IV) are dropped,
+	whether they follow the surname or the first names, so 'Smith
+	Jr., J.', 'Smith, J., Jr.' and 'J. Smith Jr.' all become 'smith j'.
+	Names in 'Last, First' form are split at the comma. In other
+	names the surname is the last word and any particles (van, von,
+	der, de, la and so on) before it, so 'J. D. van der Waals' and
+	'van der Waals, J. D.' both become 'van der waals j'.
+
+	Parameters
+	----------
+	name : string
+		An author name
+
+	initials : boolean
+		If False, the key is the surname only, so names with and
+		without first names or initials (like first authors in CSV
+		references) get the same key.
+
+	Returns
+	-------
+	key : string
+		Empty if the name has no letters
+	'''
+	text = plainText(name)
+	if ',' in text:
+		parts = [p for p in text.split(',') if re.sub(r'[^a-z]', '', p) not in SUFFIXES]
+		if len(parts) == 0:
+			return('')
+		words = dropSuffixes(parts[0].split())
+		if len(words) == 0:
+			return('')
+		last = ' '.join(words)
+		first = parts[1] if len(parts) > 1 else ''
+	else:
+		words = dropSuffixes(text.replace('.', '. ').split())
+		if len(words) == 0:
+			return('')
+		start = len(words) - 1
+		while (start > 0) and (words[start - 1] in PARTICLES):
+			start -= 1
+		last = ' '.join(words[start:])
+		first = ' '.join(words[:start])
+	last = ' '.join(re.sub(r"[^a-z' -]", ' ', last).split())
+	first = re.sub(r'[^a-z]', ' ', first).split()
+	if initials and (len(first) != 0) and (last != ''):
+		return(last + ' ' + first[0][0])
+	return(last)
+
+class authorIndex:
+	'''
+	Table of author ids shared by every source of author names. Each
+	distinct canonical name (see authorKey) gets an integer id, and
+	every raw name string and every raw field value is resolved only
+	once: later lookups of the same string are dictionary hits, so
+	repeated names cost nothing to normalize. The table can be written
+	to a JSON file and read back, so ids stay the same across loads,
+	projects and pipeline runs.
+
+	Parameters
+	----------
+	initials : boolean
+		Passed to authorKey. If True (default), authors with the same
+		surname and different first initials get different ids.
+
+	Attributes
+	----------
+	keys : dictionary
+		Author id of every canonical name
+
+	names : list
+		First raw name seen for every author id, for display
+
+	resolved : dictionary
+		Author id of every raw name string looked up so far, or None
+		for names with no letters
+	'''
+	def __init__(self, initials=True):
+		self.initials = initials
+		self.keys = {}
+		self.names = []
+		self.resolved = {}
+		self.fields = {}
+
+	def __len__(self):
+		return(len(self.names))
+
+	def resolve(self, name):
+		'''
+		Author id of one raw name, adding the name to the table if its
+		canonical form is new. None if the name has no letters.
+		'''
+		if name in self.resolved:
+			return(self.resolved[name])
+		key = authorKey(name, initials=self.initials)
+		if key == '':
+			authorId = None
+		elif key in self.keys:
+			authorId = self.keys[key]
+		else:
+			authorId = len(self.names)
+			self.keys[key] = authorId
+			self.names.append(name)
+		self.resolved[name] = authorId
+		return(authorId)
+
+	def resolveField(self, value):
+		'''
+		Author ids of every name in one bibliography field, in order
+		and without repeats
+
+		Returns
+		-------
+		ids : tuple
+		'''
+		hashKey = tuple(value) if isinstance(value, (list, np.ndarray)) else value
+		try:
+			return(self.fields[hashKey])
+		except (KeyError, TypeError):
+			pass
+		ids = []
+		for name in splitAuthors(value):
+			authorId = self.resolve(name)
+			if (authorId is not None) and (authorId not in ids):
+				ids.append(authorId)
+		ids = tuple(ids)
+		try:
+			self.fields[hashKey] = ids
+		except TypeError:
+			pass
+		return(ids)
+
+	def column(self, values, allAuthors=False):
+		'''
+		Author ids for a bibliography column.
+
+		Parameters
+		----------
+		values : pd.Series
+			Author fields, as BibTex strings, ';'-separated strings,
+			single names or lists
+
+		allAuthors : boolean
+			If False, return the id of the first author of each entry.
+			If True, return the ids of every author as a string of
+			space-separated ids, like '0 12 7', which every storage
+			backend and export format keeps as it is. See authorIds.
+
+		Returns
+		-------
+		ids : pd.Series
+			int64 ids (-1 for entries with no author) or strings of
+			ids ('x' for entries with no author), with the index of
+			values
+		'''
+		ids = [self.resolveField(v) for v in values]
+		if allAuthors:
+			return(pd.Series([' '.join(map(str, i)) if len(i) != 0 else 'x' for i in ids], index=values.index, dtype=object))
+		return(pd.Series([i[0] if len(i) != 0 else -1 for i in ids], index=values.index, dtype='int64'))
+
+	def name(self, authorId):
+		'''
+		Display name of an author id
+		'''
+		return(self.names[authorId])
+
+	def write(self, filename):
+		'''
+		Write the table of canonical names and resolved raw names to a
+		JSON file
+		'''
+		data = {
+			'initials': self.initials,
+			'names': self.names,
+			'keys': self.keys,
+			'resolved': self.resolved
+		}
+		with open(filename + '.tmp', 'w', encoding='utf8') as f:
+			json.dump(data, f)
+		os.replace(filename + '.tmp', filename)
+
+	@classmethod
+	def read(cls, filename):
+		with open(filename, encoding='utf8') as f:
+			data = json.load(f)
+		index = cls(initials=data['initials'])
+		index.names = data['names']
+		index.keys = data['keys']
+		index.resolved = data['resolved']
+		return(index)
+
+def addAuthorIds(cn, column='author', idColumn='authorId', allAuthors=False, authors=None):
+	'''
+	Add a column of integer author ids to the bibliography of a
+	citation network. The column can be indexed with citnet.addIndex
+	and compared without parsing author strings again.
+
+	Parameters
+	----------
+	cn : bibliograph.citnet
+		The network
+
+	column : string (probably)
+		Bibliography column holding author names
+
+	idColumn : string (probably)
+		Label of the column to create or overwrite
+
+	allAuthors : boolean
+		See authorIndex.column
+
+	authors : authorIndex OR string
+		Table of author ids to use and extend, or the name of a file
+		written by authorIndex.write. If the file doesn't exist, a new
+		table is started. Defaults to the table of cn, or a new one.
+
+	Returns
+	-------
+	bibliograph.authors.authorIndex
+		The table, which is also stored in cn.authors
+	'''
+	if isinstance(authors, str):
+		authors = authorIndex.read(authors) if os.path.isfile(authors) else authorIndex()
+	elif authors is None:
+		authors = cn.authors if cn.authors is not None else authorIndex()
+
+	before = len(authors.resolved)
+	with cn.monitor.stage('authorIds'):
+		ids = authors.column(cn.bib[column], allAuthors=allAuthors)
+		if cn.store is None:
+			cn.bib[idColumn] = ids
+			if idColumn in cn.indexes:
+				cn.indexes[idColumn].build(cn.bib)
+		else:
+			cn.setValues(ids.index, idColumn, ids.values)
+	cn.monitor.count('author names normalized', len(authors.resolved) - before)
+	cn.authors = authors
+	return(authors)
@@ -1,14 +1,49 @@
 import json
-import networkx as nx
+import numpy as np
 import pandas as pd
 from .readwrite import slurpBibTex
 from .readwrite import slurpReferenceCSV
 from .util import backup
 from .util import bibUpdate 
+from .util import bibUpdateMany
+from .util import collapseEntries
+from .index import INDEX_KINDS
+from .index import edgeIndex
+from .util import refToBib
+from .util import FINGERPRINT
+from .util import refFingerprints
 from .util import makeGraph
+from .instrument import getMonitor
 from .nasaads import queryADSbibcodes
 from .nasaads import queryADS
+from .crawl import refString
+from .crawl import snowball
+from .export import FORMATS
+from .export import writeEdgeList
+from .export import writeGEXF
+from .export import writeGraphML
+from .export import writeNodeList
+from .arrow import bibTable
+from .arrow import citTable
+from .arrow import isArrow
+from .arrow import loadArrow
+from .arrow import setTables
+from .arrow import writeArrow
+from .authors import addAuthorIds
+from .database import sqliteStore
+from .ingest import ingestBatches
+from .diff import applyPatch
+from .diff import diffNetworks
+from .diff import hashFile
+from .diff import networkHashes
+from .reach import reachIndex
+from .storage import isPartitioned
+from .storage import loadPartitioned
+from .storage import writePartitioned
+from .temporal import timeline
+from os.path import abspath
 from os.path import isfile
+from shutil import copyfile
 
 class citnet:
 	'''
@@ -45,11 +80,57 @@ class citnet:
 		is the label for a bibliography column where data from that
 		tag should be stored, and the functions translate the text of
 		the BibTex entry into a value that should be stored in the 
-		bibliography column
+		bibliography column. See bibliograph.readwrite.columnProcessor
+		for processors that handle a whole batch of entries at once.
+
+	fileprefix : string
+		Prefix of files written by writeNetwork, or a directory
+		written by writeNetwork with partitionBy.
+
+	partitions : function
+		Only used when fileprefix is a partitioned directory. Takes a
+		partition key string and returns True if the partition should
+		be loaded. If None, load every partition. See
+		bibliograph.storage.loadPartitioned.
+
+	touching : boolean
+		Only used with partitions. If True, also load citations
+		between selected entries and entries in other partitions.
+
+	database : string
+		Name of an SQLite database file. If given, bib and cit are
+		kept in the database instead of in memory, updates are
+		transactional upserts committed batch by batch, and bib and
+		cit are only read into DataFrames when they are accessed. If
+		the file already holds a network, it is opened and its uid
+		and refcols are used. See bibliograph.database.sqliteStore.
+
+	fingerprint : boolean
+		Only used if refcols is list-like. If True, the unique
+		identifier of each entry is a 64-bit integer fingerprint of
+		its ref string, stored in a 'fid' column, instead of the ref
+		string itself. The ref column is kept for display. Networks
+		loaded from files with a fid column use fingerprints
+		automatically. See bibliograph.util.refFingerprints.
+
+	monitor : bibliograph.instrument.monitor
+		Receives timers, counters, progress reports and messages from
+		every operation on this network. If None, the default monitor
+		from bibliograph.instrument.getMonitor is used.
 
 	'''
 	# TODO : make abbr an attribute of the citation network?
-	def __init__(self, data=None, index=None, bibcols=None, bibtex=None, csv=None, fileprefix=None, refcols='title', bibTex_processors=None, direction='outgoing', uid='ref', noNewSources=False, separator=' | ', translator=None):
+	def __init__(self, data=None, index=None, bibcols=None, bibtex=None, csv=None, fileprefix=None, refcols='title', bibTex_processors=None, direction='outgoing', uid='ref', noNewSources=False, separator=' | ', translator=None, partitions=None, touching=False, database=None, fingerprint=False, monitor=None):
+
+		self.monitor = monitor if monitor is not None else getMonitor()
+		self._graph = None
+		self._graphFile = None
+		self._pendingGraph = None
+		self._edgeIndex = None
+		self._reachIndex = None
+		self.indexes = {}
+		self.authors = None
+		self.store = None
 
 		self.bib = pd.DataFrame(data=data, index=index, columns=bibcols, dtype=str)
 		self.cit = pd.DataFrame(columns=['src', 'tgt'], dtype='int')
@@ -57,40 +138,188 @@ class citnet:
 		self.refcols = refcols
 		if type(refcols) == str:
 			self.uid = refcols
+		elif fingerprint:
+			self.uid = FINGERPRINT
 		else:
 			self.uid = 'ref'
 
+		if database is not None:
+			self.store = sqliteStore(database, self.uid, self.refcols, columns=bibcols, monitor=self.monitor)
+			self.uid = self.store.uid
+			self.refcols = self.store.refcols
+			if data is not None:
+				self.store.replace(bib=self._bib)
+			self.notUnique = [c for c in self.columns if c != self.uid]
+			self._pendingGraph = self._buildGraph
+
 		if bibtex is not None:
 			if (csv is not None) or (fileprefix is not None):
 				raise ValueError('citnet is initialized with exactly one of bibtex, csv, or fileprefix. Got at values for at least two.')
 			slurpBibTex(self, bibtex, bibcols=bibcols, refcols=refcols, tag_processors=bibTex_processors)
 
-			self.notUnique = [c for c in self.bib if c != self.uid]
+			self.notUnique = [c for c in self.columns if c != self.uid]
 
-			self.bib = self.bib.fillna('x')
-			self.graph = makeGraph(self.bib, self.cit, self.uid)
+			if self.store is None:
+				self.bib = self.bib.fillna('x')
+			self._pendingGraph = self._buildGraph
 
 		if csv is not None:
 			if (bibtex is not None) or (fileprefix is not None):
 				raise ValueError('citnet is initialized with exactly one of bibtex, csv, or fileprefix. Got at values for at least two.')
-			print('Loading data from ' + csv)
+			self.monitor.message('Loading data from ' + csv)
 			slurpReferenceCSV(self, csv, direction, noNewSources, separator, translator)
 
 		if fileprefix is not None:
 			if (bibtex is not None) or (csv is not None):
 				raise ValueError('citnet is initialized with exactly one of bibtex, csv, or fileprefix. Got at values for at least two.')
+			if isPartitioned(fileprefix):
+				loadPartitioned(self, fileprefix, predicate=partitions, touching=touching)
+				self._pendingGraph = self._buildGraph
+				self.monitor.message('\nNetwork loaded from disk.\n')
+				return
+
+			if isArrow(fileprefix):
+				loadArrow(self, fileprefix)
+				self.monitor.message('\nNetwork loaded from disk.\n')
+				return
+
 			checkBib = isfile(fileprefix + '-bib.json')
 			checkCit = isfile(fileprefix + '-cit.json')
 			checkGraph = isfile(fileprefix + '.graphml')
 
-			if all([checkBib, checkCit, checkGraph]):
-				self.bib = pd.read_json(fileprefix + '-bib.json')
-				self.cit = pd.read_json(fileprefix + '-cit.json')
-				self.graph = nx.read_graphml(fileprefix + '.graphml')
+			if all([checkBib, checkCit]):
+				with self.monitor.stage('load'):
+					self.bib = pd.read_json(fileprefix + '-bib.json')
+					self.cit = pd.read_json(fileprefix + '-cit.json')
+				if (type(refcols) != str) and (FINGERPRINT in self.bib.columns):
+					self.uid = FINGERPRINT
+				if checkGraph:
+					self._graphFile = fileprefix + '.graphml'
+					self._pendingGraph = self._readGraph
+				else:
+					self._pendingGraph = self._buildGraph
 				self.notUnique = [c for c in self.bib if c != self.uid]
-				print('\nNetwork loaded from disk.\n')
+				self.monitor.message('\nNetwork loaded from disk.\n')
 			else:
-				raise RuntimeError('\nFound at least one stored file for bib, cit, or graph, but did not find all three.')
+				raise RuntimeError('\nDid not find both stored files for bib and cit with prefix ' + fileprefix)
+
+	@property
+	def bib(self):
+		'''
+		The bibliography DataFrame. For networks kept in a database,
+		the whole bibliography is read on access and cached until the
+		next write; use select, subnetwork or store.bibSlice to read
+		only some entries. Assigning a DataFrame replaces the stored
+		bibliography.
+		'''
+		if self.store is not None:
+			return(self.store.readBib())
+		return(self._bib)
+
+	@bib.setter
+	def bib(self, bib):
+		if self.store is not None:
+			self.store.replace(bib=bib)
+		else:
+			self._bib = bib
+
+	@property
+	def cit(self):
+		'''
+		The citation DataFrame. For networks kept in a database, read
+		on access and cached until the next write.
+		'''
+		if self.store is not None:
+			return(self.store.readCit())
+		return(self._cit)
+
+	@cit.setter
+	def cit(self, cit):
+		if self.store is not None:
+			self.store.replace(cit=cit)
+		else:
+			self._cit = cit
+
+	@property
+	def columns(self):
+		'''
+		Bibliography column labels, without reading a stored
+		bibliography.
+		'''
+		if self.store is not None:
+			return(self.store.columns)
+		return(list(self._bib.columns))
+
+	def addColumn(self, column, value='x'):
+		'''
+		Add a bibliography column filled with value if it doesn't
+		exist.
+		'''
+		if column in self.columns:
+			return
+		if self.store is not None:
+			self.store.addColumns([column], value=value)
+		else:
+			self._bib[column] = value
+
+	def setValues(self, labels, column, values):
+		'''
+		Set the values of one bibliography column for the entries
+		with the given index labels. values are matched to labels by
+		position, also when values is a Series with another index.
+		'''
+		if self.store is not None:
+			self.store.setValues(labels, column, values)
+		else:
+			# .loc aligns a Series on its own index, so give values
+			# the index of the labels they are set for
+			self._bib.loc[labels, column] = pd.Series(list(values), index=labels)
+		self._updateIndexes(labels)
+
+	def labelsOf(self, uids):
+		'''
+		Bibliography index labels of entries by uid.
+
+		Returns
+		-------
+		labels : pd.Series
+			Label for every value in uids, NaN if not found. Series
+			index contains the uids.
+		'''
+		if self.store is not None:
+			return(self.store.lookup(uids))
+		return(pd.Series(self.bib.index, index=self.bib[self.uid]).reindex(uids))
+
+	@property
+	def graph(self):
+		'''
+		NetworkX graph of the network. A graph read from disk or built
+		from a BibTex file is only created on first access, so jobs
+		that never use the graph never import networkx.
+		'''
+		if self._pendingGraph is not None:
+			pending = self._pendingGraph
+			self._pendingGraph = None
+			self._graph = pending()
+		return(self._graph)
+
+	@graph.setter
+	def graph(self, g):
+		self._graph = g
+		self._graphFile = None
+		self._pendingGraph = None
+
+	def _buildGraph(self):
+		with self.monitor.stage('makeGraph'):
+			return(makeGraph(self.bib, self.cit, self.uid))
+
+	def _readGraph(self):
+		import networkx as nx
+		# fingerprints are int64 in bib, and graph nodes built from it,
+		# but GraphML files are read back with string nodes by default
+		nodeType = int if self.uid == FINGERPRINT else str
+		with self.monitor.stage('load'):
+			return(nx.read_graphml(self._graphFile, node_type=nodeType))
 
 	def update(self, newEntry, updateCit=False, src=None):
 		'''
@@ -114,17 +343,471 @@ class citnet:
 		'''
 		# TODO : make this function update the graph?
 
+		if self.store is not None:
+			labels = self.updateMany(pd.DataFrame([newEntry.squeeze()]))
+			if updateCit:
+				self.addEdges([src], [labels.iloc[0]])
+			return
+
+		if self.uid == FINGERPRINT:
+			newEntry = newEntry.copy()
+			newEntry[FINGERPRINT] = refFingerprints([newEntry['ref']]).iloc[0]
+
 		getUpdate = bibUpdate(self.bib, newEntry, self.uid)
 
 		if getUpdate.updated:
+			self.monitor.count('bib updates')
 			self.bib.loc[getUpdate.index] = getUpdate.entry
+			self._updateIndexes([getUpdate.index])
 			if updateCit and not ((self.cit.src == src) & (self.cit.tgt == getUpdate.index)).any():
-				self.cit = self.cit.append({'src':src, 'tgt':getUpdate.index}, ignore_index=True)
+				self.cit = pd.concat([self.cit, pd.DataFrame({'src': [src], 'tgt': [getUpdate.index]})], ignore_index=True)
+				self.monitor.count('edges added')
 		else:
-			self.bib = self.bib.append(newEntry, ignore_index=True).fillna('x')
+			self.monitor.count('bib inserts')
+			self.bib = pd.concat([self.bib, pd.DataFrame([newEntry.squeeze()])], ignore_index=True).fillna('x')
+			self._updateIndexes([self.bib.index[-1]])
 			if updateCit:
-				self.cit = self.cit.append({'src':src, 'tgt':self.bib.index[-1]}, ignore_index=True)
+				self.cit = pd.concat([self.cit, pd.DataFrame({'src': [src], 'tgt': [self.bib.index[-1]]})], ignore_index=True)
+				self.monitor.count('edges added')
 	
+	def updateMany(self, entries):
+		'''
+		Merge a DataFrame of bibliography entries into the
+		bibliography in one pass, with the same result as calling
+		update for every row. See bibliograph.util.bibUpdateMany.
+
+		Parameters
+		----------
+		entries : pd.DataFrame
+			New bibliography entries
+
+		Returns
+		-------
+		labels : pd.Series
+			Bibliography index label for every unique identifier in
+			entries. Series index contains the identifiers.
+		'''
+		entries = self.addFingerprints(entries)
+		if (self.uid == FINGERPRINT) and (len(self.columns) != 0) and (FINGERPRINT not in self.columns):
+			if self.store is not None:
+				self.addColumn(FINGERPRINT)
+			else:
+				self.bib[FINGERPRINT] = pd.Series(dtype='int64')
+
+		with self.monitor.stage('update'):
+			if self.store is not None:
+				result = self.store.upsert(entries)
+			else:
+				result = bibUpdateMany(self.bib, entries, self.uid)
+				self.bib = result.bib
+		self.monitor.count('bib inserts', result.inserted)
+		self.monitor.count('bib updates', result.updated)
+		self._updateIndexes(result.labels.values)
+		return(result.labels)
+
+	def addFingerprints(self, entries):
+		'''
+		If this network uses fingerprint uids, return a copy of
+		entries with a fid column computed from the ref column.
+		Otherwise return entries unchanged.
+		'''
+		if self.uid != FINGERPRINT:
+			return(entries)
+		entries = entries.copy()
+		entries[FINGERPRINT] = refFingerprints(entries['ref']).values
+		return(entries)
+
+	def inputColumns(self):
+		'''
+		Bibliography columns and uid column that input files such as
+		reference CSVs provide values for. Input files name entries by
+		ref string in fingerprinted networks; fingerprints are added
+		when entries are merged.
+
+		Returns
+		-------
+		bibcols : list
+
+		uid : string (probably)
+		'''
+		if self.uid == FINGERPRINT:
+			return([c for c in self.columns if c != FINGERPRINT], 'ref')
+		return(self.columns, self.uid)
+
+	def addIndex(self, column, kind='hash', **kwargs):
+		'''
+		Declare a secondary index on a bibliography column. Indexes
+		are kept current by update, updateMany, applyBatch, merge and
+		getADSbibcodes. If bib is modified directly, call
+		rebuildIndexes afterwards.
+
+		Parameters
+		----------
+		column : string (probably)
+			Label of a bibliography column
+
+		kind : string
+			'hash' for exact lookups, 'sorted' for range lookups such
+			as year ranges, or 'token' for multi-valued fields such as
+			author lists. See bibliograph.index.
+
+		kwargs
+			Keyword arguments passed to the index class, such as
+			numeric for sorted indexes or tokenizer for token indexes.
+
+		For networks kept in a database, an SQL index is created on
+		the column instead and kind is ignored.
+		'''
+		if column not in self.columns:
+			raise ValueError('Can only index bibliography columns, got ' + str(column))
+		if self.store is not None:
+			with self.monitor.stage('buildIndex'):
+				self.store.createIndex(column)
+			return
+		if kind not in INDEX_KINDS:
+			raise ValueError('Index kind must be one of ' + ', '.join(INDEX_KINDS) + ', got ' + str(kind))
+		index = INDEX_KINDS[kind](column, **kwargs)
+		with self.monitor.stage('buildIndex'):
+			index.build(self.bib)
+		self.indexes[column] = index
+
+	def rebuildIndexes(self):
+		'''
+		Rebuild every secondary index from the current bibliography.
+		'''
+		with self.monitor.stage('buildIndex'):
+			for index in self.indexes.values():
+				index.build(self.bib)
+
+	def _updateIndexes(self, labels):
+		if len(self.indexes) == 0:
+			return
+		labels = list(labels)
+		for index in self.indexes.values():
+			index.update(self.bib, labels)
+
+	@property
+	def edges(self):
+		'''
+		bibliograph.index.edgeIndex for the current cit DataFrame,
+		rebuilt on access after citations change.
+		'''
+		if (self._edgeIndex is None) or (self._edgeIndex.cit is not self.cit):
+			self._edgeIndex = edgeIndex(self.cit)
+		return(self._edgeIndex)
+
+	@property
+	def reach(self):
+		'''
+		bibliograph.reach.reachIndex for the current cit DataFrame,
+		rebuilt on access after citations change.
+		'''
+		if (self._reachIndex is None) or (self._reachIndex.cit is not self.cit):
+			self._reachIndex = reachIndex(self.bib, self.cit, monitor=self.monitor)
+		return(self._reachIndex)
+
+	def _reachLabels(self, uids):
+		labels = self.labelsOf(uids)
+		if labels.isna().any():
+			raise ValueError('Not in the bibliography: ' + ', '.join(str(u) for u in labels.index[labels.isna()]))
+		return(labels.tolist())
+
+	def reaches(self, src, tgt):
+		'''
+		True if the paper with uid src cites the paper with uid tgt,
+		directly or through a chain of citations. Answered by the
+		reachability index, built on first use, instead of a graph
+		traversal.
+		'''
+		src, tgt = self._reachLabels([src, tgt])
+		return(bool(self.reach.reaches(src, tgt)))
+
+	def citationPath(self, src, tgt):
+		'''
+		Shortest chain of citations from the paper with uid src to
+		the paper with uid tgt.
+
+		Returns
+		-------
+		path : list
+			uids from src to tgt, or None if src doesn't cite tgt
+			directly or indirectly
+		'''
+		src, tgt = self._reachLabels([src, tgt])
+		path = self.reach.path(src, tgt)
+		if path is None:
+			return(None)
+		return(self.bib[self.uid].loc[path].tolist())
+
+	def select(self, column, value):
+		'''
+		Find bibliography entries by the value of a column, using a
+		secondary index if one was declared with addIndex and a scan
+		of the column otherwise.
+
+		Parameters
+		----------
+		column : string (probably)
+			Label of a bibliography column
+
+		value
+			A value to match exactly, a list of values to match any
+			of, or a (low, high) tuple to match an inclusive range.
+			For token indexes, every token of value must be present.
+
+		Returns
+		-------
+		pd.Index
+			Index labels of matching entries
+		'''
+		if self.store is not None:
+			return(self.store.select(column, value))
+		index = self.indexes.get(column)
+		if isinstance(value, tuple):
+			if (index is not None) and (index.kind == 'sorted'):
+				return(index.range(*value))
+			if index is not None:
+				raise ValueError('Range selection on ' + str(column) + ' needs a sorted index')
+			low, high = value
+			values = pd.to_numeric(self.bib[column], errors='coerce')
+			return(self.bib.index[values.between(float(low), float(high))])
+		if isinstance(value, list):
+			found = pd.Index([])
+			for v in value:
+				found = found.union(self.select(column, v))
+			return(found)
+		if index is not None:
+			return(index.lookup(value))
+		return(self.bib.index[self.bib[column] == value])
+
+	def subnetwork(self, labels=None, neighbors=None, **criteria):
+		'''
+		Extract a new network containing selected entries and the
+		citations between them. Entries are found with secondary
+		indexes (see addIndex and select) and citations with the
+		edges index, so neither bib nor cit is scanned when the
+		selection columns are indexed.
+
+			cn.addIndex('year', kind='sorted')
+			cn.addIndex('author', kind='token')
+			sub = cn.subnetwork(year=(1950, 1959), author='Spitzer, L.', neighbors='references')
+
+		Parameters
+		----------
+		labels : list-like
+			Index labels of entries to select. Combined with criteria
+			by intersection.
+
+		neighbors : string
+			None to keep only citations between selected entries,
+			'references' to also include the papers they cite,
+			'citations' to also include the papers citing them, or
+			'both'.
+
+		criteria
+			column=value pairs passed to select. Entries must match
+			all of them.
+
+		Returns
+		-------
+		bibliograph.citnet
+			New network whose index labels are renumbered from zero.
+		'''
+		if neighbors not in [None, 'references', 'citations', 'both']:
+			raise ValueError('neighbors must be None, "references", "citations" or "both", got ' + str(neighbors))
+
+		with self.monitor.stage('subnetwork'):
+			selected = None
+			for column, value in criteria.items():
+				found = self.select(column, value)
+				selected = found if selected is None else selected.intersection(found)
+			if labels is not None:
+				selected = pd.Index(labels) if selected is None else selected.intersection(pd.Index(labels))
+			if selected is None:
+				selected = self.store.labels() if self.store is not None else self.bib.index
+
+			if self.store is not None:
+				cit = self.store.citSlice(selected)
+			else:
+				edges = self.edges
+				outgoing = edges.outgoing(selected.values)
+				incoming = edges.incoming(selected.values)
+				cit = self.cit.iloc[np.union1d(outgoing, incoming)][['src', 'tgt']]
+
+			srcIn = cit['src'].isin(selected)
+			tgtIn = cit['tgt'].isin(selected)
+			if neighbors is None:
+				keep = srcIn & tgtIn
+			elif neighbors == 'references':
+				keep = srcIn
+			elif neighbors == 'citations':
+				keep = tgtIn
+			else:
+				keep = srcIn | tgtIn
+			cit = cit[keep]
+
+			nodes = selected.union(pd.Index(cit['src']).unique()).union(pd.Index(cit['tgt']).unique())
+			bib = self.store.bibSlice(nodes) if self.store is not None else self.bib.loc[nodes]
+			positions = pd.Series(range(len(bib)), index=bib.index)
+			cit = pd.DataFrame({'src': positions.reindex(cit['src']).values, 'tgt': positions.reindex(cit['tgt']).values})
+
+		return(_newCitnet(bib.reset_index(drop=True), cit, self.refcols, self.monitor, uid=self.uid))
+
+	def addEdges(self, src, tgt):
+		'''
+		Add citations to the cit DataFrame, skipping citations that
+		already exist.
+
+		Parameters
+		----------
+		src : list-like
+			Bibliography index labels of citing papers
+
+		tgt : list-like
+			Bibliography index labels of cited papers, same length as
+			src.
+
+		Returns
+		-------
+		added : integer
+			Number of new citations
+		'''
+		if self.store is not None:
+			added = self.store.addEdges(src, tgt)
+			self.monitor.count('edges added', added)
+			return(added)
+		new = pd.DataFrame({'src': src, 'tgt': tgt})
+		if len(new) == 0:
+			return(0)
+		before = len(self.cit)
+		cit = pd.concat([self.cit, new], ignore_index=True)
+		self.cit = cit[~cit.duplicated(['src', 'tgt'])].reset_index(drop=True)
+		added = len(self.cit) - before
+		self.monitor.count('edges added', added)
+		return(added)
+
+	def applyBatch(self, batch, noNewSources=False):
+		'''
+		Merge a batch of entries and citations read from an input file
+		into the network.
+
+		Parameters
+		----------
+		batch : bibliograph.util.entryBatch
+			Entries, citations between uids, and uids of papers which
+			must be in the bibliography.
+
+		noNewSources : boolean
+			If True, raise ValueError if a uid in batch.sources is not
+			already in the bibliography. If False, add missing sources
+			to the bibliography with refToBib.
+		'''
+		entries = batch.entries
+		bibcols, key = self.inputColumns()
+		if len(batch.sources) != 0:
+			inBatch = set(entries[key])
+			candidates = [s for s in dict.fromkeys(batch.sources) if s not in inBatch]
+			uids = refFingerprints(candidates).values if self.uid == FINGERPRINT else candidates
+			found = self.labelsOf(uids).notna().values
+			missing = [s for s, f in zip(candidates, found) if not f]
+			if noNewSources and (len(missing) != 0):
+				raise ValueError('Found sources which are not in the bib DataFrame: ' + ', '.join(map(str, missing)))
+			if len(missing) != 0:
+				if type(self.refcols) == str:
+					newSources = [pd.Series({self.uid: s}, index=self.bib.columns) for s in missing]
+				else:
+					newSources = [refToBib(s, self.bib.columns, self.refcols) for s in missing]
+				entries = pd.concat([pd.DataFrame(newSources), entries], ignore_index=True)
+
+		if len(entries) != 0:
+			self.updateMany(entries)
+
+		if len(batch.edges) != 0:
+			src = batch.edges['src']
+			tgt = batch.edges['tgt']
+			if self.uid == FINGERPRINT:
+				src = refFingerprints(src)
+				tgt = refFingerprints(tgt)
+			labels = self.labelsOf(pd.unique(pd.concat([src, tgt]).values))
+			src = labels.reindex(src)
+			tgt = labels.reindex(tgt)
+			if src.isna().any() or tgt.isna().any():
+				raise ValueError('Found citations between uids which are not in the bibliography')
+			self.addEdges(src.values, tgt.values)
+
+	def ingest(self, readers, maxQueued=4, noNewSources=False):
+		'''
+		Read several inputs at once and merge them into the network.
+		Each reader runs in its own thread and a single writer (the
+		calling thread) merges batches with applyBatch as they arrive,
+		so the time taken approaches the longer of reading and merging
+		instead of their sum. At most maxQueued batches wait to be
+		merged. See bibliograph.ingest.ingestBatches.
+
+			cn.ingest([iterBibTex('a.bib', bibcols=cols, refcols=ref),
+				iterBibTex('b.bib', bibcols=cols, refcols=ref)])
+
+		Parameters
+		----------
+		readers : list
+			Iterables of bibliograph.util.entryBatch objects or
+			DataFrames of entries, like those returned by
+			bibliograph.readwrite.iterBibTex and
+			bibliograph.readwrite.iterReferenceCSV
+
+		maxQueued : integer
+			Maximum number of batches read but not yet merged
+
+		noNewSources : boolean
+			See applyBatch
+
+		Returns
+		-------
+		batches : integer
+			Number of batches merged
+		'''
+		return(ingestBatches(self, readers, maxQueued=maxQueued, noNewSources=noNewSources))
+
+	def merge(self, other):
+		'''
+		Merge another citation network into this one. Entries are
+		unified by uid with the fill-'x' semantics of update, so
+		entries in this network take precedence. Citations in other are
+		remapped to index labels in this network and repeated
+		citations are dropped. Columns found only in other are added
+		to this bibliography. The graph is rebuilt on next access.
+
+		Parameters
+		----------
+		other : bibliograph.citnet
+			Network with the same uid column, for example one built
+			from another shard of the input files.
+
+		Returns
+		-------
+		self : bibliograph.citnet
+		'''
+		if other.uid != self.uid:
+			raise ValueError('Can only merge networks with the same uid column. Got ' + str(self.uid) + ' and ' + str(other.uid))
+
+		with self.monitor.stage('merge'):
+			for c in other.bib.columns:
+				self.addColumn(c)
+
+			labels = self.updateMany(other.bib)
+			mapping = pd.Series(labels.reindex(other.bib[other.uid]).values, index=other.bib.index)
+			src = mapping.reindex(other.cit['src'])
+			tgt = mapping.reindex(other.cit['tgt'])
+			if src.isna().any() or tgt.isna().any():
+				raise ValueError('Found citations in the merged network whose index labels are not in its bibliography')
+			self.addEdges(src.values, tgt.values)
+
+		self.notUnique = [c for c in self.columns if c != self.uid]
+		self._graph = None
+		self._graphFile = None
+		self._pendingGraph = self._buildGraph
+		return(self)
+
 	def loadCSV(self, filename, **kwargs):
 		'''
 		Get bibliography and citation data from a csv file.
@@ -138,29 +821,195 @@ class citnet:
 			Keyword arguments passed to
 			bibliography.readwrite.slurpReferenceCSV
 		'''
-		print('Loading data from ' + filename)
+		self.monitor.message('Loading data from ' + filename)
 		slurpReferenceCSV(self, filename, **kwargs)
 
-	def writeNetwork(self, name):
+	def writeNetwork(self, name, partitionBy=None):
 		'''
 		Write JSON files representing the bibliography and citation
-		DataFrames. Write a graphml file representing the graph.
+		DataFrames. Write a graphml file representing the graph. If
+		the graph hasn't been built yet, the graphml file is streamed
+		from bib and cit with bibliograph.export.writeGraphML instead
+		of building the NetworkX graph first. Row and citation hashes
+		are written to name + '-hash.json' so later versions can be
+		compared with this one by diff without reading it.
 
 		Parameters
 		----------
 		name : string
 			Network name will be the prefix for all stored filenames.
+
+		partitionBy : string OR function
+			If given, write a partitioned directory called name
+			instead, with bibliography and citation files for each
+			value of this column (or of this function of the
+			bibliography). No graphml file is written; the graph is
+			rebuilt when a loaded network's graph is first accessed.
+			See bibliograph.storage.writePartitioned.
 		'''
+		if partitionBy is not None:
+			writePartitioned(self, name, partitionBy)
+			networkHashes.fromNetwork(self).write(hashFile(name))
+			return
+
+		with self.monitor.stage('writeNetwork'):
+			backup(name + '-bib.json')
+			self.bib.to_json(name + '-bib.json')
+
+			backup(name + '-cit.json')
+			self.cit.to_json(name + '-cit.json')
 
-		backup(name + '-bib.json')
-		self.bib.to_json(name + '-bib.json')
+			backup(hashFile(name))
+			networkHashes.fromNetwork(self).write(hashFile(name))
 
-		backup(name + '-cit.json')
-		self.cit.to_json(name + '-cit.json')
+			if (self._pendingGraph == self._readGraph) and (self._graphFile is not None):
+				# the graph was never loaded, so the stored file is current
+				if abspath(self._graphFile) != abspath(name + '.graphml'):
+					backup(name + '.graphml')
+					copyfile(self._graphFile, name + '.graphml')
+			elif self._pendingGraph == self._buildGraph:
+				backup(name + '.graphml')
+				writeGraphML(name + '.graphml', self.bib, self.cit, self.uid, monitor=self.monitor)
+			elif self.graph:
+				import networkx as nx
+				backup(name + '.graphml')
+				nx.write_graphml(self.graph, name + '.graphml')
 
-		if self.graph:
-			backup(name + '.graphml')
-			nx.write_graphml(self.graph, name + '.graphml')
+	def toArrow(self):
+		'''
+		The bibliography and citations as Arrow tables, for handing
+		the network to Arrow engines such as DuckDB and Polars.
+		Numeric columns, including cit and fingerprint uids, are
+		wrapped without copying; string columns are converted.
+
+		Returns
+		-------
+		bib : pyarrow.Table
+			Bibliography index labels in a 'label' column followed by
+			the bibliography columns. uid and refcols are stored in
+			the schema metadata.
+
+		cit : pyarrow.Table
+			int64 'src' and 'tgt' columns of index labels
+		'''
+		return(bibTable(self.bib, self.uid, self.refcols), citTable(self.cit))
+
+	def writeArrow(self, name, chunkSize=100000):
+		'''
+		Write the bibliography and citations to the Arrow IPC files
+		name + '-bib.arrow' and name + '-cit.arrow', which Arrow
+		engines can memory-map directly. citnet(fileprefix=name)
+		loads them, memory-mapped.
+
+		Parameters
+		----------
+		name : string
+			Prefix for the file names
+
+		chunkSize : integer
+			Rows per Arrow record batch
+		'''
+		for suffix in ['-bib.arrow', '-cit.arrow']:
+			backup(name + suffix)
+		writeArrow(self, name, chunkSize=chunkSize)
+
+	def diff(self, old, refcols=None):
+		'''
+		Find what changed since an older version of this network.
+
+		Parameters
+		----------
+		old : bibliograph.citnet OR string
+			Older version of the network, or the name it was saved
+			with by writeNetwork. Only its hash file is read.
+
+		refcols : list-like OR string
+			See bibliograph.diff.diffNetworks
+
+		Returns
+		-------
+		bibliograph.diff.networkPatch
+			Added, modified and removed entries and citations. Apply
+			it to the older version with applyPatch, or save it with
+			its write method.
+		'''
+		return(diffNetworks(old, self, refcols=refcols, monitor=self.monitor))
+
+	def applyPatch(self, patch):
+		'''
+		Bring this network up to date with a newer version by applying
+		a bibliograph.diff.networkPatch computed by diff.
+		'''
+		applyPatch(self, patch)
+
+	def export(self, filename, format=None, columns=None, nodeFilename=None, chunkSize=100000):
+		'''
+		Export the network for visualization tools such as Gephi and
+		Cytoscape. Files are streamed from bib and cit in chunks, so
+		the NetworkX graph is never built.
+
+		Parameters
+		----------
+		filename : string
+			Name of the exported file
+
+		format : string
+			'graphml', 'gexf' or 'csv'. If None, inferred from the
+			extension of filename. 'csv' writes an edge list with
+			Source and Target columns.
+
+		columns : list-like
+			Bibliography columns to export as node attributes.
+			Defaults to every column except uid.
+
+		nodeFilename : string
+			For the 'csv' format, also write a node table with an Id
+			column and the selected columns to this file.
+
+		chunkSize : integer
+			Number of nodes or edges formatted at a time
+		'''
+		if format is None:
+			extension = filename[filename.rfind('.'):].lower() if '.' in filename else ''
+			if extension not in FORMATS:
+				raise ValueError('Can\'t infer export format from ' + filename + ', use one of ' + ', '.join(FORMATS))
+			format = FORMATS[extension]
+
+		if format == 'graphml':
+			writeGraphML(filename, self.bib, self.cit, self.uid, columns=columns, chunkSize=chunkSize, monitor=self.monitor)
+		elif format == 'gexf':
+			writeGEXF(filename, self.bib, self.cit, self.uid, columns=columns, chunkSize=chunkSize, monitor=self.monitor)
+		elif format == 'csv':
+			writeEdgeList(filename, self.bib, self.cit, self.uid, chunkSize=chunkSize, monitor=self.monitor)
+			if nodeFilename is not None:
+				writeNodeList(nodeFilename, self.bib, self.uid, columns=columns, chunkSize=chunkSize, monitor=self.monitor)
+		else:
+			raise ValueError('format must be one of ' + ', '.join(FORMATS.values()) + ', got ' + str(format))
+
+	def entries(self, labels):
+		'''
+		Bibliography rows with the given index labels, in the order of
+		labels. For networks kept in a database, only these rows are
+		read.
+		'''
+		if self.store is not None:
+			return(self.store.bibSlice(labels))
+		return(self.bib.loc[labels])
+
+	def adsSources(self, toQuery=None):
+		'''
+		Sources DataFrame and toQuery mask to pass to the
+		bibliograph.nasaads query functions. toQuery can be a boolean
+		mask over bib or a list of index labels. For networks kept in
+		a database, only the entries to query are read.
+		'''
+		if toQuery is None:
+			return(self.bib, None)
+		isMask = np.asarray(toQuery).dtype == bool
+		if self.store is None:
+			return(self.bib, toQuery if isMask else self.bib.index.isin(toQuery))
+		labels = self.store.labels()[np.asarray(toQuery)] if isMask else pd.Index(toQuery)
+		return(self.entries(labels), None)
 
 	def getADSbibcodes(self, searchColumns, **kwargs):
 		'''
@@ -177,7 +1026,8 @@ class citnet:
 
 		kwargs
 			Keyword arguments are passed directly to
-			bibliograph.nasaads.queryADSbibcodes
+			bibliograph.nasaads.queryADSbibcodes. toQuery can also be
+			a list of index labels; see adsSources.
 
 		Returns
 		-------
@@ -191,16 +1041,25 @@ class citnet:
 			values in columns to be searched either contained spaces
 			or were 'x'.	
 		'''
-		queries, badQueries = queryADSbibcodes(self.bib, searchColumns, **kwargs)
+		kwargs.setdefault('monitor', self.monitor)
+		sources, kwargs['toQuery'] = self.adsSources(kwargs.get('toQuery'))
+		queries, badQueries = queryADSbibcodes(sources, searchColumns, **kwargs)
 
-		self.bib.loc[queries.index, 'bibcode'] = queries['bibcode']
-		self.bib.loc[badQueries, 'bibcode'] = '?'
+		if self.store is not None:
+			self.setValues(queries.index, 'bibcode', queries['bibcode'])
+			self.setValues(badQueries, 'bibcode', ['?']*len(badQueries))
+		else:
+			self.bib.loc[queries.index, 'bibcode'] = queries['bibcode']
+			self.bib.loc[badQueries, 'bibcode'] = '?'
+			self._updateIndexes(list(queries.index) + list(badQueries))
 
 		return(queries, badQueries)
 
-	def queryADS(self, searchColumns, fetchTerms, **kwargs):
+	def queryADS(self, searchColumns, fetchTerms, mergeSize=1000, **kwargs):
 		'''
-		Get ADS data for bibliography entries.
+		Get ADS data for bibliography entries. Queries run in a
+		background thread and results are merged into the network,
+		mergeSize rows at a time, while later queries wait for ADS.
 
 		Parameters
 		----------
@@ -216,9 +1075,14 @@ class citnet:
 			menu above the search bar at
 			https://ui.adsabs.harvard.edu/
 
+		mergeSize : integer
+			Number of results collected before they are merged into
+			the network
+
 		kwargs
 			Keyword arguments are passed directly to
-			bibliograph.nasaads.queryADSbibcodes
+			bibliograph.nasaads.queryADSbibcodes. toQuery can also be
+			a list of index labels; see adsSources.
 
 		Returns
 		-------
@@ -232,19 +1096,212 @@ class citnet:
 			values in columns to be searched either contained spaces
 			or were 'x'.	
 		'''
-		results, queries, badQueries = queryADS(self.bib, searchColumns, fetchTerms, **kwargs)
+		pending = []
+
+		def merge():
+			results = pd.concat(pending, ignore_index=True)
+			pending.clear()
+			entries = results[results.columns[:-1]].fillna('x')
+			if type(self.refcols) != str:
+				entries['ref'] = refString(entries, self.refcols)
+			entries = self.addFingerprints(entries)
+			labels = self.updateMany(entries)
+			self.addEdges(results['srcidx'].values, labels.reindex(entries[self.uid]).values)
+
+		def collect(results):
+			if len(results) != 0:
+				pending.append(results)
+			if sum(len(r) for r in pending) >= mergeSize:
+				merge()
+
+		kwargs.setdefault('monitor', self.monitor)
+		sources, kwargs['toQuery'] = self.adsSources(kwargs.get('toQuery'))
+		results, queries, badQueries = queryADS(sources, searchColumns, fetchTerms, consume=collect, **kwargs)
+		if len(pending) != 0:
+			merge()
+
+		return(results, queries, badQueries)
+
+	def snowball(self, seeds, fetchTerms, **kwargs):
+		'''
+		Expand the network from seed papers by following references
+		and/or citations on NASA/ADS for several levels, fetching each
+		paper once.
+
+		Parameters
+		----------
+		seeds : list-like
+			Bibcodes of the papers to start from
+
+		fetchTerms : list-like
+			ADS fields to get for each paper
+
+		kwargs
+			Keyword arguments are passed directly to
+			bibliograph.crawl.snowball, for example depth, direction,
+			fetchColumns, articleProcessor, maxSize and maxQueries.
+
+		Returns
+		-------
+		crawlResult
+			A bibliograph.crawl.crawlResult object with the fetched
+			bibcodes, their index labels and any unfetched frontier.
+		'''
+		kwargs.setdefault('monitor', self.monitor)
+		return(snowball(self, seeds, fetchTerms, **kwargs))
+
+	def authorIds(self, column='author', idColumn='authorId', allAuthors=False, authors=None):
+		'''
+		Normalize author names and store integer author ids in a
+		bibliography column, so author comparisons, deduplication and
+		indexes don't parse author strings again. Names are resolved
+		through a table of canonical names which is kept in
+		self.authors and reused by later calls, so a name seen before
+		is not normalized again. Save the table with
+		self.authors.write(filename) and pass the filename as authors
+		to keep ids stable across loads.
+
+		Parameters
+		----------
+		column : string (probably)
+			Bibliography column holding author names, as BibTex
+			strings ('Last, First and ...'), single names from CSV
+			references or ADS author lists
+
+		idColumn : string (probably)
+			Label of the column to create or overwrite. Default is
+			'authorId'.
+
+		allAuthors : boolean
+			If False (default), store the int64 id of the first author,
+			-1 for entries with no author. If True, store the ids of
+			every author as a string of space-separated ids ('x' for
+			entries with no author), which bibliograph.authors.authorIds
+			turns back into a list.
+
+		authors : bibliograph.authors.authorIndex OR string
+			Table of author ids, or the name of a file written by
+			authorIndex.write. Defaults to self.authors.
+
+		Returns
+		-------
+		bibliograph.authors.authorIndex
+		'''
+		return(addAuthorIds(self, column=column, idColumn=idColumn, allAuthors=allAuthors, authors=authors))
+
+	def timeline(self, column='year'):
+		'''
+		Order the network in time for per-year analysis. Use
+		metrics() for cumulative per-year citation counts and
+		component sizes, citationCounts() for the citations of every
+		entry by year, and snapshot(year) for a view of the network
+		at the end of a year.
+
+		Parameters
+		----------
+		column : string (probably)
+			Bibliography column holding years. Default is 'year'.
+
+		Returns
+		-------
+		bibliograph.temporal.timeline
+		'''
+		return(timeline(self.bib, self.cit, column=column, monitor=self.monitor))
 
-		uid = self.uid
+def mergeCitnets(nets, monitor=None):
+	'''
+	Merge any number of citation networks into a new network in a
+	single pass. Bibliographies are concatenated and unified by uid
+	with the fill-'x' semantics of citnet.update, so earlier networks
+	take precedence. Citations from every network are remapped to the
+	new index labels with vectorized lookups and deduplicated once,
+	so the cost is linear in the total number of entries and
+	citations however many networks are merged.
 
-		for i in results.index:
+	Parameters
+	----------
+	nets : iterable
+		bibliograph.citnet objects with the same uid column
 
-			srcID = results.loc[i, 'srcidx']
-			
-			thisResult = results.loc[i, results.columns[:-1]].squeeze().copy()
+	monitor : bibliograph.instrument.monitor
+		Monitor for the merged network. Defaults to the monitor of the
+		first network.
+
+	Returns
+	-------
+	bibliograph.citnet
+		New network. Bibliography index labels run from zero in order
+		of first appearance of each uid.
+	'''
+	nets = list(nets)
+	if len(nets) == 0:
+		raise ValueError('mergeCitnets needs at least one network')
 
-			if uid == 'ref':
-				thisResult[uid] = ' '.join([thisResult[c] for c in self.refcols if (thisResult[c] != 'x')])
+	first = nets[0]
+	uid = first.uid
+	if any(n.uid != uid for n in nets):
+		raise ValueError('Can only merge networks with the same uid column')
 
-			self.update(thisResult, updateCit=True, src=srcID)
+	if monitor is None:
+		monitor = first.monitor
 
-		return(results, queries, badQueries)
\ No newline at end of file
+	with monitor.stage('merge'):
+		columns = list(dict.fromkeys(c for n in nets for c in n.bib.columns))
+		bib = pd.concat([n.bib.reindex(columns=columns) for n in nets], ignore_index=True)
+		bib = collapseEntries(bib, uid).fillna('x').reset_index(drop=True)
+
+		uids = pd.Index(bib[uid])
+		cits = []
+		for n in nets:
+			positions = pd.Series(uids.get_indexer(n.bib[n.uid]), index=n.bib.index)
+			src = positions.reindex(n.cit['src'])
+			tgt = positions.reindex(n.cit['tgt'])
+			if src.isna().any() or tgt.isna().any():
+				raise ValueError('Found citations whose index labels are not in the bibliography of their network')
+			cits.append(pd.DataFrame({'src': src.values, 'tgt': tgt.values}))
+		cit = pd.concat(cits, ignore_index=True).drop_duplicates().reset_index(drop=True)
+
+	monitor.count('merged networks', len(nets))
+
+	return(_newCitnet(bib, cit, first.refcols, monitor, uid=uid))
+
+def fromArrow(bib, cit, refcols='title', monitor=None):
+	'''
+	Make a citnet from Arrow tables, such as those returned by
+	citnet.toArrow or by DuckDB and Polars queries on them.
+
+	Parameters
+	----------
+	bib : pyarrow.Table
+		Bibliography, with index labels in a 'label' column if
+		citations refer to them
+
+	cit : pyarrow.Table
+		Citations with 'src' and 'tgt' columns of index labels
+
+	refcols : list-like OR string
+		See citnet. Ignored if the bib table metadata, written by
+		citnet.toArrow, holds uid and refcols.
+
+	monitor : bibliograph.instrument.monitor
+		See citnet
+
+	Returns
+	-------
+	citnet
+	'''
+	cn = citnet(refcols=refcols, monitor=monitor)
+	setTables(cn, bib, cit)
+	return(cn)
+
+def _newCitnet(bib, cit, refcols, monitor, uid=None):
+	'''
+	Make a citnet from existing bib and cit DataFrames. The graph is
+	built on first access.
+	'''
+	cn = citnet(refcols=refcols, fingerprint=(uid == FINGERPRINT), monitor=monitor)
+	cn.bib = bib
+	cn.cit = cit
+	cn.notUnique = [c for c in bib if c != cn.uid]
+	cn._pendingGraph = cn._buildGraph
+	return(cn)
@@ -0,0 +1,66 @@
+'''
+The bibliograph command.
+
+	bibliograph run pipeline.json [--resume | --overwrite] [--stages ingest graph] [--quiet]
+	bibliograph diff old new [--patch patch.json]
+
+See bibliograph.pipeline.pipeline for the configuration format.
+'''
+import argparse
+import json
+import sys
+
+def run(args):
+	from .instrument import monitor
+	from .pipeline import STAGES
+	from .pipeline import pipeline
+
+	with open(args.config, encoding='utf8') as f:
+		config = json.load(f)
+	if args.name is not None:
+		config['name'] = args.name
+	if args.batch_size is not None:
+		config['batchSize'] = args.batch_size
+
+	p = pipeline(config, monitor=monitor(quiet=args.quiet))
+	p.run(stages=args.stages or STAGES, resume=args.resume, overwrite=args.overwrite)
+	return(0)
+
+def diff(args):
+	from .diff import diffNetworks
+	from .instrument import monitor
+
+	patch = diffNetworks(args.old, args.new, refcols=args.refcols, monitor=monitor(quiet=True))
+	for kind, number in patch.summary().items():
+		print(kind + ': ' + str(number))
+	if args.patch is not None:
+		patch.write(args.patch)
+	return(0)
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(prog='bibliograph', description='Build and analyze citation networks.')
+	commands = parser.add_subparsers(dest='command')
+	commands.required = True
+
+	runParser = commands.add_parser('run', help='run a pipeline described by a JSON configuration file')
+	runParser.add_argument('config', help='JSON pipeline configuration')
+	runParser.add_argument('--stages', nargs='+', choices=['ingest', 'ads', 'authors', 'graph', 'export'], help='stages to run, default all')
+	runParser.add_argument('--resume', action='store_true', help='continue from the last checkpoint')
+	runParser.add_argument('--overwrite', action='store_true', help='delete an existing database and start over')
+	runParser.add_argument('--name', default=None, help='override the output name in the configuration')
+	runParser.add_argument('--batch-size', type=int, default=None, help='override the batch size in the configuration')
+	runParser.add_argument('--quiet', action='store_true', help='do not print messages or progress')
+	runParser.set_defaults(func=run)
+
+	diffParser = commands.add_parser('diff', help='compare two saved versions of a network')
+	diffParser.add_argument('old', help='name the older network was saved with')
+	diffParser.add_argument('new', help='name the newer network was saved with')
+	diffParser.add_argument('--patch', default=None, help='write a patch that updates the older network to this JSON file')
+	diffParser.add_argument('--refcols', nargs='+', default=None, help='refcols of networks saved without a hash file')
+	diffParser.set_defaults(func=diff)
+
+	args = parser.parse_args(argv)
+	return(args.func(args))
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,239 @@
+import pandas as pd
+from .ingest import overlap
+from .nasaads import confirmADS
+from .nasaads import docColumns
+from .nasaads import iterBibcodeQueries
+
+LINK_FIELDS = {'references': ['reference'], 'citations': ['citation'], 'both': ['reference', 'citation']}
+
+class crawlResult:
+	'''
+	Object to conveniently store data for a snowball crawl.
+
+	Attributes
+	----------
+	fetched : list
+		Bibcodes of papers fetched from ADS, in the order they were
+		requested
+
+	labels : pd.Series
+		Bibliography index label of every fetched paper. Series index
+		contains the bibcodes.
+
+	frontier : list
+		Bibcodes which were found but not fetched because a budget was
+		reached. Empty if the crawl reached its full depth.
+
+	levels : integer
+		Number of levels fetched, counting the seeds as level zero
+
+	queries : integer
+		Number of ADS queries made
+
+	edges : integer
+		Number of citations added to the network
+	'''
+	def __init__(self):
+		self.fetched = []
+		self.labels = pd.Series(dtype=object)
+		self.frontier = []
+		self.levels = 0
+		self.queries = 0
+		self.edges = 0
+
+def refString(entries, refcols):
+	'''
+	Join refcols values of each entry, skipping 'x' values, the same
+	way ref uids are made for BibTex entries.
+	'''
+	values = entries.reindex(columns=refcols, fill_value='x').astype(str)
+	return(values.apply(lambda row: ' '.join(v for v in row if v != 'x'), axis=1))
+
+def snowball(cn, seeds, fetchTerms, depth=1, direction='references', fetchColumns=None, articleProcessor=None, batchSize=50, maxSize=None, maxQueries=None, bibcodeColumn='bibcode', maxQueued=4, monitor=None):
+	'''
+	Expand a citation network from a set of seed papers by following
+	references and/or citations on NASA/ADS for several levels.
+
+	Each level is fetched with one ADS query per batchSize papers,
+	asking for the metadata and the reference or citation lists of
+	every paper in the batch. Bibcodes found in those lists that have
+	not been seen before form the frontier for the next level, so no
+	paper is fetched twice however many papers point to it. Queries
+	run in a background thread, and fetched papers are merged into the
+	bibliography after every batch with citnet.updateMany while the
+	next batches are fetched. Citations are added with
+	citnet.addEdges once both ends are in the bibliography. Papers on
+	the last level are fetched but not expanded; citations between
+	papers already in the crawl are still added.
+
+	Before each level, the number of queries it needs is checked
+	against the rate limit of the ADS token with
+	bibliograph.nasaads.confirmADS. If the crawl is not confirmed, it
+	stops and the papers of that level are left in the frontier.
+
+	Parameters
+	----------
+	cn : bibliograph.citnet
+		Network to expand
+
+	seeds : list-like
+		Bibcodes of the papers to start from
+
+	fetchTerms : list-like
+		ADS fields to get for each paper. See
+		bibliograph.nasaads.queryADS.
+
+	depth : integer
+		Number of levels to expand. depth=1 fetches the seeds and the
+		papers they are linked to.
+
+	direction : string
+		'references' to follow references (backward in time),
+		'citations' to follow citations (forward in time), or 'both'.
+
+	fetchColumns : list-like
+		Bibliography column labels corresponding to the ADS fields in
+		fetchTerms, or to the values returned by articleProcessor. If
+		None, assume fetchTerms contains bibliography column labels.
+
+	articleProcessor : function
+		Function that takes an ads article object and returns a
+		list-like object of values for the columns in fetchColumns. If
+		None, the raw documents of each response are decoded column by
+		column with bibliograph.nasaads.docColumns.
+
+	batchSize : integer
+		Bibcodes per ADS query
+
+	maxSize : integer
+		Stop after fetching this many papers. Unlimited if None.
+
+	maxQueries : integer
+		Stop after this many ADS queries. Unlimited if None.
+
+	bibcodeColumn : string (probably)
+		Bibliography column which holds ADS bibcodes. Added to the
+		bibliography if it is missing.
+
+	maxQueued : integer
+		Maximum number of fetched batches waiting to be merged. See
+		bibliograph.ingest.overlap.
+
+	monitor : bibliograph.instrument.monitor
+		Receives progress reports, timers and counters. Defaults to
+		the monitor of cn.
+
+	Returns
+	-------
+	crawlResult
+		A bibliograph.crawl.crawlResult object
+	'''
+	if direction not in LINK_FIELDS:
+		raise ValueError('direction must be one of ' + ', '.join(LINK_FIELDS) + ', got ' + str(direction))
+
+	if monitor is None:
+		monitor = cn.monitor
+
+	links = LINK_FIELDS[direction]
+	fetchTerms = list(fetchTerms)
+	columns = list(fetchColumns) if fetchColumns is not None else list(fetchTerms)
+	fl = list(dict.fromkeys(fetchTerms + ['bibcode'] + links))
+
+	if len(cn.columns) != 0:
+		cn.addColumn(bibcodeColumn)
+
+	result = crawlResult()
+	labels = {}
+	seen = set()
+	src = []
+	tgt = []
+
+	frontier = [str(s) for s in dict.fromkeys(seeds)]
+	seen.update(frontier)
+
+	def addResolved(final):
+		'''
+		Add citations whose ends are both in the bibliography. Keep
+		citations to papers which will still be fetched.
+		'''
+		if len(src) == 0:
+			return
+		found = pd.Series(labels, dtype=object)
+		edges = pd.DataFrame({'src': found.reindex(src).values, 'tgt': found.reindex(tgt).values})
+		resolved = edges['src'].notna() & edges['tgt'].notna()
+		result.edges += cn.addEdges(edges['src'][resolved].astype(int).values, edges['tgt'][resolved].astype(int).values)
+		if final:
+			keep = []
+		else:
+			keep = [i for i in edges.index[~resolved] if (src[i] in seen) and (tgt[i] in seen)]
+		src[:] = [src[i] for i in keep]
+		tgt[:] = [tgt[i] for i in keep]
+
+	with monitor.stage('crawl'):
+		for level in range(depth + 1):
+			if (maxSize is not None) and (len(result.fetched) + len(frontier) > maxSize):
+				result.frontier = frontier[maxSize - len(result.fetched):]
+				frontier = frontier[:maxSize - len(result.fetched)]
+			if (maxQueries is not None) and (result.queries + (len(frontier) + batchSize - 1)//batchSize > maxQueries):
+				allowed = max(maxQueries - result.queries, 0)*batchSize
+				result.frontier = frontier[allowed:] + result.frontier
+				frontier = frontier[:allowed]
+			if len(frontier) == 0:
+				break
+			if not confirmADS((len(frontier) + batchSize - 1)//batchSize, monitor=monitor):
+				result.frontier = frontier + result.frontier
+				break
+
+			expand = (level < depth) and (len(result.frontier) == 0)
+			nextFrontier = []
+
+			def merge(articles):
+				result.queries += 1
+				if articleProcessor is None:
+					entries = docColumns(articles, fetchTerms, columns)
+					bibcodes = [doc['bibcode'] for doc in articles]
+					linked = {field: [doc.get(field) for doc in articles] for field in links}
+				else:
+					entries = pd.DataFrame([list(articleProcessor(article)) for article in articles], columns=columns)
+					bibcodes = [article.bibcode for article in articles]
+					linked = {field: [getattr(article, field, None) for article in articles] for field in links}
+
+				for field in links:
+					for bibcode, others in zip(bibcodes, linked[field]):
+						for other in (others or []):
+							if field == 'reference':
+								src.append(bibcode)
+								tgt.append(other)
+							else:
+								src.append(other)
+								tgt.append(bibcode)
+							if expand and (other not in seen):
+								seen.add(other)
+								nextFrontier.append(other)
+
+				if len(entries) != 0:
+					entries = entries.fillna('x')
+					entries[bibcodeColumn] = bibcodes
+					if type(cn.refcols) != str:
+						entries['ref'] = refString(entries, cn.refcols)
+					entries = cn.addFingerprints(entries)
+					found = cn.updateMany(entries)
+					labels.update(zip(bibcodes, found.reindex(entries[cn.uid]).values))
+
+				result.fetched.extend(bibcodes)
+				monitor.count('papers crawled', len(bibcodes))
+				monitor.progress('Crawling level ' + str(level), len(result.fetched))
+
+			overlap([iterBibcodeQueries(frontier, fl, batchSize=batchSize, raw=articleProcessor is None, monitor=monitor)], merge, maxQueued=maxQueued, monitor=monitor)
+
+			result.levels = level + 1
+			addResolved(final=False)
+			frontier = nextFrontier
+
+			if len(result.frontier) != 0:
+				break
+
+		addResolved(final=True)
+
+	result.labels = pd.Series(labels, dtype=object)
+	return(result)
@@ -0,0 +1,336 @@
+import json
+import sqlite3
+import pandas as pd
+from .instrument import getMonitor
+from .util import collapseEntries
+from .util import updateManyResult
+
+# SQLite limits the number of parameters in one statement
+MAX_PARAMETERS = 500
+
+def quote(name):
+	'''
+	Quote a bibliography column label for use as an SQL identifier.
+	'''
+	return('"' + str(name).replace('"', '""') + '"')
+
+def toSQL(values):
+	'''
+	Convert a DataFrame to a list of row tuples SQLite can store.
+	Missing values become 'x' as in the in-memory bibliography, numpy
+	scalars become Python scalars and list-like values, such as ADS
+	author lists, are stored as JSON text.
+	'''
+	rows = values.astype(object).where(values.notna(), 'x').to_numpy().tolist()
+	return([tuple(json.dumps(list(v)) if isinstance(v, (list, tuple)) else (v.item() if hasattr(v, 'item') else v) for v in row) for row in rows])
+
+class sqliteStore:
+	'''
+	Bibliography and citations of a citnet kept in a local SQLite
+	database instead of in memory. Entries are stored in a bib table
+	whose label column holds the bibliography index labels, with a
+	unique index on the uid column, and citations in a cit table with
+	a unique index on (src, tgt) and an index on tgt. Every write is a
+	transaction, so an interrupted job leaves the database as it was
+	after the last complete batch. DataFrames are only built for the
+	rows that are asked for, except by readBib and readCit.
+
+	Parameters
+	----------
+	filename : string
+		Name of the database file. Created if it doesn't exist.
+
+	uid : string (probably)
+		Label of the column containing unique identifiers for each
+		bibliography entry
+
+	refcols : list-like OR string
+		See citnet. If the database already holds a network, the uid
+		and refcols it was created with are used instead.
+
+	columns : list-like
+		Bibliography columns to create if they don't exist
+
+	monitor : bibliograph.instrument.monitor
+		Receives timers and counters. Defaults to the monitor returned
+		by bibliograph.instrument.getMonitor.
+	'''
+	def __init__(self, filename, uid, refcols, columns=None, monitor=None):
+		self.filename = filename
+		self.monitor = monitor if monitor is not None else getMonitor()
+		self.connection = sqlite3.connect(filename)
+		self.connection.execute('PRAGMA journal_mode=WAL')
+		self.connection.execute('PRAGMA synchronous=NORMAL')
+		self.version = 0
+		self._bibCache = None
+		self._citCache = None
+
+		with self.connection:
+			self.connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+			self.connection.execute('CREATE TABLE IF NOT EXISTS bib (label INTEGER PRIMARY KEY)')
+			self.connection.execute('CREATE TABLE IF NOT EXISTS cit (src INTEGER NOT NULL, tgt INTEGER NOT NULL, UNIQUE (src, tgt))')
+			self.connection.execute('CREATE INDEX IF NOT EXISTS cit_tgt ON cit (tgt)')
+
+		meta = dict(self.connection.execute('SELECT key, value FROM meta').fetchall())
+		if 'uid' not in meta:
+			meta = {'uid': json.dumps(uid), 'refcols': json.dumps(refcols)}
+			with self.connection:
+				self.connection.executemany('INSERT INTO meta VALUES (?, ?)', list(meta.items()))
+		self.uid = json.loads(meta['uid'])
+		self.refcols = json.loads(meta['refcols'])
+
+		if (columns is not None) and (len(columns) != 0):
+			self.addColumns(list(columns) + [self.uid])
+
+	@property
+	def columns(self):
+		'''
+		Bibliography column labels in the order they were added
+		'''
+		return([r[1] for r in self.connection.execute('PRAGMA table_info(bib)').fetchall()][1:])
+
+	def addColumns(self, columns, value='x'):
+		'''
+		Add bibliography columns that don't exist yet, filled with
+		value. The unique index on the uid column is created when that
+		column is added.
+		'''
+		existing = set(self.columns)
+		new = [c for c in dict.fromkeys(columns) if c not in existing]
+		if len(new) == 0:
+			return
+		with self.connection:
+			for c in new:
+				self.connection.execute('ALTER TABLE bib ADD COLUMN ' + quote(c) + ' DEFAULT ' + ('NULL' if value is None else "'" + str(value).replace("'", "''") + "'"))
+				if c == self.uid:
+					self.connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS bib_uid ON bib (' + quote(c) + ')')
+		self.changed()
+
+	def changed(self):
+		self.version += 1
+		self._bibCache = None
+		self._citCache = None
+
+	def __len__(self):
+		return(self.connection.execute('SELECT COUNT(*) FROM bib').fetchone()[0])
+
+	def numEdges(self):
+		return(self.connection.execute('SELECT COUNT(*) FROM cit').fetchone()[0])
+
+	def chunks(self, values):
+		values = list(values)
+		for start in range(0, len(values), MAX_PARAMETERS):
+			yield values[start:start + MAX_PARAMETERS]
+
+	def lookup(self, uids, column=None):
+		'''
+		Find the labels of entries by uid, or by the value of another
+		column.
+
+		Returns
+		-------
+		labels : pd.Series
+			Label for every value in uids, NaN if not found. Series
+			index contains the values.
+		'''
+		column = self.uid if column is None else column
+		uids = list(uids)
+		values = [r[0] for r in toSQL(pd.DataFrame({'v': uids}))]
+		found = {}
+		for chunk in self.chunks(dict.fromkeys(values)):
+			query = 'SELECT ' + quote(column) + ', label FROM bib WHERE ' + quote(column) + ' IN (' + ','.join('?'*len(chunk)) + ')'
+			found.update(self.connection.execute(query, chunk).fetchall())
+		return(pd.Series([found.get(v) for v in values], index=uids, dtype=object).infer_objects())
+
+	def upsert(self, entries):
+		'''
+		Merge bibliography entries into the database in one
+		transaction. Entries whose uid is already stored fill fields
+		which are 'x', new uids are appended with the next labels. The
+		result is the same as bibliograph.util.bibUpdateMany.
+
+		Parameters
+		----------
+		entries : pd.DataFrame
+			New bibliography entries. Columns not in the database are
+			ignored unless the database has no columns but uid.
+
+		Returns
+		-------
+		updateManyResult
+			A bibliograph.util.updateManyResult object whose bib is
+			None.
+		'''
+		if self.uid not in entries.columns:
+			raise ValueError('entries must contain the uid column ' + str(self.uid))
+		if len(self.columns) == 0:
+			self.addColumns(list(entries.columns) + [self.uid])
+
+		columns = self.columns
+		entries = collapseEntries(entries.reindex(columns=columns), self.uid)
+		rows = toSQL(entries)
+		uidPosition = columns.index(self.uid)
+		uids = [r[uidPosition] for r in rows]
+
+		with self.connection:
+			existing = self.lookup(uids)
+			found = existing.notna().to_numpy()
+			start = self.connection.execute('SELECT COALESCE(MAX(label), -1) + 1 FROM bib').fetchone()[0]
+
+			labels = []
+			inserts = []
+			updates = []
+			for row, label, isFound in zip(rows, existing.to_numpy(), found):
+				if isFound:
+					labels.append(int(label))
+					updates.append(row + (int(label),))
+				else:
+					labels.append(start + len(inserts))
+					inserts.append((start + len(inserts),) + row)
+
+			if len(inserts):
+				self.connection.executemany('INSERT INTO bib (label, ' + ', '.join(quote(c) for c in columns) + ') VALUES (' + ','.join('?'*(len(columns) + 1)) + ')', inserts)
+			if len(updates):
+				fill = ', '.join(quote(c) + ' = CASE WHEN ' + quote(c) + " = 'x' OR " + quote(c) + ' IS NULL THEN ? ELSE ' + quote(c) + ' END' for c in columns)
+				self.connection.executemany('UPDATE bib SET ' + fill + ' WHERE label = ?', updates)
+
+		self.changed()
+		return(updateManyResult(None, pd.Series(labels, index=entries[self.uid].values), len(inserts), len(updates)))
+
+	def addEdges(self, src, tgt):
+		'''
+		Add citations in one transaction, skipping citations that
+		already exist.
+
+		Returns
+		-------
+		added : integer
+			Number of new citations
+		'''
+		pairs = [(int(s), int(t)) for s, t in zip(src, tgt)]
+		if len(pairs) == 0:
+			return(0)
+		before = self.connection.total_changes
+		with self.connection:
+			self.connection.executemany('INSERT OR IGNORE INTO cit (src, tgt) VALUES (?, ?)', pairs)
+		self.changed()
+		return(self.connection.total_changes - before)
+
+	def setValues(self, labels, column, values):
+		'''
+		Overwrite the values of one column for the entries with the
+		given labels, in one transaction.
+		'''
+		self.addColumns([column])
+		rows = toSQL(pd.DataFrame({'v': list(values)}))
+		with self.connection:
+			self.connection.executemany('UPDATE bib SET ' + quote(column) + ' = ? WHERE label = ?', [(r[0], int(l)) for r, l in zip(rows, labels)])
+		self.changed()
+
+	def replace(self, bib=None, cit=None):
+		'''
+		Replace the stored bibliography and/or citations with
+		DataFrames, in one transaction. bib index labels are kept.
+		'''
+		if bib is not None:
+			self.addColumns(bib.columns)
+			columns = list(bib.columns)
+			rows = [(int(l),) + r for l, r in zip(bib.index, toSQL(bib))]
+		with self.connection:
+			if bib is not None:
+				self.connection.execute('DELETE FROM bib')
+				self.connection.executemany('INSERT INTO bib (label, ' + ', '.join(quote(c) for c in columns) + ') VALUES (' + ','.join('?'*(len(columns) + 1)) + ')', rows)
+			if cit is not None:
+				self.connection.execute('DELETE FROM cit')
+				self.connection.executemany('INSERT OR IGNORE INTO cit (src, tgt) VALUES (?, ?)', [(int(s), int(t)) for s, t in zip(cit['src'], cit['tgt'])])
+		self.changed()
+
+	def createIndex(self, column):
+		'''
+		Create an SQL index on a bibliography column
+		'''
+		name = 'bib_' + ''.join(ch if ch.isalnum() else '_' for ch in str(column))
+		with self.connection:
+			self.connection.execute('CREATE INDEX IF NOT EXISTS ' + quote(name) + ' ON bib (' + quote(column) + ')')
+
+	def query(self, sql, params=()):
+		'''
+		Run a SELECT statement and return the result as a DataFrame
+		'''
+		with self.monitor.stage('sqlQuery'):
+			return(pd.read_sql_query(sql, self.connection, params=params))
+
+	def select(self, column, value):
+		'''
+		Labels of entries whose column matches value, with the
+		semantics of citnet.select: a (low, high) tuple selects an
+		inclusive numeric range, a list selects any of its values and
+		anything else an exact value.
+
+		Returns
+		-------
+		pd.Index
+		'''
+		if isinstance(value, tuple):
+			sql = 'SELECT label FROM bib WHERE CAST(' + quote(column) + ' AS REAL) BETWEEN ? AND ? AND ' + quote(column) + " != 'x' ORDER BY label"
+			params = (float(value[0]), float(value[1]))
+		else:
+			values = [r[0] for r in toSQL(pd.DataFrame({'v': value if isinstance(value, list) else [value]}))]
+			sql = 'SELECT label FROM bib WHERE ' + quote(column) + ' IN (' + ','.join('?'*len(values)) + ') ORDER BY label'
+			params = values
+		return(pd.Index([r[0] for r in self.connection.execute(sql, params).fetchall()], dtype='int64'))
+
+	def labels(self):
+		return(pd.Index([r[0] for r in self.connection.execute('SELECT label FROM bib ORDER BY label').fetchall()], dtype='int64'))
+
+	def bibSlice(self, labels):
+		'''
+		Bibliography rows with the given labels, as a DataFrame indexed
+		by label in the order of labels.
+		'''
+		labels = [int(l) for l in labels]
+		frames = []
+		for chunk in self.chunks(labels):
+			frames.append(self.query('SELECT * FROM bib WHERE label IN (' + ','.join('?'*len(chunk)) + ')', chunk))
+		if len(frames) == 0:
+			return(pd.DataFrame(columns=self.columns))
+		bib = pd.concat(frames, ignore_index=True).set_index('label')
+		bib.index.name = None
+		return(bib.reindex(labels))
+
+	def citSlice(self, labels):
+		'''
+		Citations whose source or target is in labels, in the order
+		they were added.
+		'''
+		frames = []
+		for chunk in self.chunks(int(l) for l in labels):
+			marks = ','.join('?'*len(chunk))
+			frames.append(self.query('SELECT rowid, src, tgt FROM cit WHERE src IN (' + marks + ') OR tgt IN (' + marks + ')', chunk + chunk))
+		if len(frames) == 0:
+			return(pd.DataFrame(columns=['src', 'tgt'], dtype='int'))
+		cit = pd.concat(frames).drop_duplicates('rowid').sort_values('rowid')
+		return(cit[['src', 'tgt']].reset_index(drop=True))
+
+	def readBib(self):
+		'''
+		The whole bibliography as a DataFrame. Cached until the next
+		write.
+		'''
+		if self._bibCache is None:
+			bib = self.query('SELECT * FROM bib ORDER BY label').set_index('label')
+			bib.index.name = None
+			self._bibCache = bib
+		return(self._bibCache)
+
+	def readCit(self):
+		'''
+		All citations as a DataFrame in the order they were added.
+		Cached until the next write.
+		'''
+		if self._citCache is None:
+			self._citCache = self.query('SELECT src, tgt FROM cit ORDER BY rowid')
+		return(self._citCache)
+
+	def close(self):
+		self.connection.close()
@@ -0,0 +1,341 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from .instrument import getMonitor
+from .util import FINGERPRINT
+
+def columnHashes(values, column):
+	'''
+	64-bit hashes of (column, value) pairs as int64, 0 where the value
+	is missing ('x' or NaN).
+	'''
+	strings = values.astype(str)
+	hashes = pd.util.hash_pandas_object(str(column) + '\x1f' + strings, index=False).to_numpy().view('int64')
+	return(np.where(values.isna().to_numpy() | (strings == 'x').to_numpy(), 0, hashes))
+
+def rowHashes(bib):
+	'''
+	Content hash of every bibliography row. Each field is hashed with
+	its column label and the field hashes are summed, so the hash
+	doesn't depend on column order and columns holding only missing
+	values don't change it. List values, such as ADS author lists,
+	are hashed as their string representation.
+
+	Returns
+	-------
+	hashes : np.ndarray
+		int64 hash of every row, in bib order
+	'''
+	total = np.zeros(len(bib), dtype='int64')
+	with np.errstate(over='ignore'):
+		for c in bib.columns:
+			total += columnHashes(bib[c], c)
+	return(total)
+
+def edgeHashes(srcKeys, tgtKeys):
+	'''
+	Hash of every citation given the uid values at both ends, so that
+	citations can be compared between networks whose index labels
+	differ.
+	'''
+	edges = pd.DataFrame({'src': pd.Series(srcKeys, dtype=object).astype(str).values, 'tgt': pd.Series(tgtKeys, dtype=object).astype(str).values})
+	return(pd.util.hash_pandas_object(edges, index=False).to_numpy().view('int64'))
+
+def citKeys(bib, cit, uid):
+	'''
+	uid values at the source and target of every citation
+	'''
+	keys = pd.Series(bib[uid].values, index=bib.index)
+	return(keys.reindex(cit['src']).values, keys.reindex(cit['tgt']).values)
+
+def hashFile(prefix):
+	'''
+	Name of the hash file stored with a network written by
+	citnet.writeNetwork
+	'''
+	if os.path.isdir(prefix):
+		return(os.path.join(prefix, 'hash.json'))
+	return(prefix + '-hash.json')
+
+class networkHashes:
+	'''
+	Per-row content hashes of a bibliography and hashes of its
+	citations, enough to find what changed in a newer version of the
+	network without reading the older bibliography. Written next to
+	saved networks by citnet.writeNetwork.
+
+	Attributes
+	----------
+	uid : string (probably)
+		Label of the uid column of the network
+
+	rows : pd.Series
+		Content hash of every entry, indexed by uid value
+
+	edges : np.ndarray
+		Hash of every citation, see edgeHashes
+	'''
+	def __init__(self, uid, rows, edges):
+		self.uid = uid
+		self.rows = rows
+		self.edges = edges
+
+	@classmethod
+	def fromNetwork(cls, cn):
+		bib = cn.bib
+		src, tgt = citKeys(bib, cn.cit, cn.uid)
+		return(cls(cn.uid, pd.Series(rowHashes(bib), index=bib[cn.uid].values), edgeHashes(src, tgt)))
+
+	@classmethod
+	def read(cls, filename):
+		with open(filename, encoding='utf8') as f:
+			data = json.load(f)
+		rows = pd.Series(np.array(data['rows'], dtype='int64'), index=data['keys'])
+		return(cls(data['uid'], rows, np.array(data['edges'], dtype='int64')))
+
+	def write(self, filename):
+		data = {
+			'uid': self.uid,
+			'keys': self.rows.index.tolist(),
+			'rows': self.rows.tolist(),
+			'edges': self.edges.tolist()
+		}
+		with open(filename + '.tmp', 'w', encoding='utf8') as f:
+			json.dump(data, f)
+		os.replace(filename + '.tmp', filename)
+
+def loadNetwork(prefix, refcols, monitor):
+	'''
+	Load a saved network, taking its uid from its hash file if there
+	is one.
+	'''
+	from .citnet import citnet
+	if os.path.isfile(hashFile(prefix)):
+		with open(hashFile(prefix), encoding='utf8') as f:
+			uid = json.load(f)['uid']
+		if uid not in ['ref', FINGERPRINT]:
+			refcols = uid
+	return(citnet(fileprefix=prefix, refcols=refcols, monitor=monitor))
+
+def loadHashes(network, refcols=None, monitor=None):
+	'''
+	networkHashes of a citnet, of a network saved with prefix network,
+	or network itself if it already is a networkHashes object. Saved
+	networks without a hash file are loaded with refcols and hashed.
+	'''
+	if isinstance(network, networkHashes):
+		return(network)
+	if isinstance(network, str):
+		if os.path.isfile(hashFile(network)):
+			return(networkHashes.read(hashFile(network)))
+		network = loadNetwork(network, refcols, monitor)
+	return(networkHashes.fromNetwork(network))
+
+class networkPatch:
+	'''
+	Changes that bring an older version of a network up to date with
+	a newer one. Entries are identified by uid, so a patch can be
+	applied to a network whose index labels differ from those of the
+	network it was computed from.
+
+	Attributes
+	----------
+	uid : string (probably)
+		Label of the uid column
+
+	entries : pd.DataFrame
+		Full rows, from the newer network, of entries that were added
+		or modified
+
+	added : list
+		uid values of added entries
+
+	modified : list
+		uid values of entries whose fields changed
+
+	removed : list
+		uid values of removed entries
+
+	addedEdges : pd.DataFrame
+		Added citations, with 'src' and 'tgt' columns holding uid
+		values
+
+	removedEdges : np.ndarray
+		Hashes of removed citations, see edgeHashes
+	'''
+	def __init__(self, uid, entries, added, modified, removed, addedEdges, removedEdges):
+		self.uid = uid
+		self.entries = entries
+		self.added = added
+		self.modified = modified
+		self.removed = removed
+		self.addedEdges = addedEdges
+		self.removedEdges = removedEdges
+
+	def __len__(self):
+		return(len(self.added) + len(self.modified) + len(self.removed) + len(self.addedEdges) + len(self.removedEdges))
+
+	def summary(self):
+		'''
+		Number of changes of each kind
+		'''
+		return({
+			'added': len(self.added),
+			'modified': len(self.modified),
+			'removed': len(self.removed),
+			'addedEdges': len(self.addedEdges),
+			'removedEdges': len(self.removedEdges)
+		})
+
+	def write(self, filename):
+		'''
+		Write the patch to a JSON file
+		'''
+		data = {
+			'uid': self.uid,
+			'entries': json.loads(self.entries.to_json(orient='split', index=False)),
+			'added': self.added,
+			'modified': self.modified,
+			'removed': self.removed,
+			'addedEdges': self.addedEdges[['src', 'tgt']].values.tolist(),
+			'removedEdges': self.removedEdges.tolist()
+		}
+		with open(filename, 'w', encoding='utf8') as f:
+			json.dump(data, f)
+
+	@classmethod
+	def read(cls, filename):
+		with open(filename, encoding='utf8') as f:
+			data = json.load(f)
+		entries = pd.DataFrame(data['entries']['data'], columns=data['entries']['columns'])
+		addedEdges = pd.DataFrame(data['addedEdges'], columns=['src', 'tgt'], dtype=object)
+		return(cls(data['uid'], entries, data['added'], data['modified'], data['removed'], addedEdges, np.array(data['removedEdges'], dtype='int64')))
+
+def diffNetworks(old, new, refcols=None, monitor=None):
+	'''
+	Find the entries and citations added, removed or modified between
+	two versions of a network by joining per-row content hashes on
+	uid and comparing sets of citation hashes. Only the hashes of the
+	older network are needed, so for a network saved with
+	citnet.writeNetwork only its hash file is read.
+
+	Parameters
+	----------
+	old : bibliograph.citnet OR string OR networkHashes
+		Older version of the network, or prefix of its saved files
+
+	new : bibliograph.citnet OR string
+		Newer version of the network, or prefix of its saved files
+
+	refcols : list-like OR string
+		Used to load networks given as prefixes whose hash file is
+		missing, as in citnet. The uid of networks with a hash file is
+		read from it. Default is None, for networks with ref (or
+		fingerprint) uids.
+
+	monitor : bibliograph.instrument.monitor
+		Receives timers and counters. Defaults to the monitor returned
+		by bibliograph.instrument.getMonitor.
+
+	Returns
+	-------
+	bibliograph.diff.networkPatch
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	if isinstance(new, str):
+		new = loadNetwork(new, refcols, monitor)
+
+	with monitor.stage('diff'):
+		before = loadHashes(old, refcols, monitor)
+		if before.uid != new.uid:
+			raise ValueError('Can only diff networks with the same uid, got ' + str(before.uid) + ' and ' + str(new.uid))
+
+		bib = new.bib
+		keys = bib[new.uid]
+		after = pd.Series(rowHashes(bib), index=keys.values)
+
+		known = after.index.isin(before.rows.index)
+		oldHashes = before.rows.reindex(after.index[known]).to_numpy()
+		changed = np.zeros(len(bib), dtype=bool)
+		changed[known] = oldHashes != after.to_numpy()[known]
+		added = keys[~known].tolist()
+		modified = keys[changed].tolist()
+		removed = before.rows.index[~before.rows.index.isin(after.index)].tolist()
+		entries = bib[~known | changed].reset_index(drop=True)
+
+		src, tgt = citKeys(bib, new.cit, new.uid)
+		hashes = edgeHashes(src, tgt)
+		newEdges = ~np.isin(hashes, before.edges)
+		addedEdges = pd.DataFrame({'src': src[newEdges], 'tgt': tgt[newEdges]})
+		removedEdges = np.setdiff1d(before.edges, hashes)
+
+	patch = networkPatch(new.uid, entries, added, modified, removed, addedEdges, removedEdges)
+	for kind, number in patch.summary().items():
+		monitor.count('diff ' + kind, number)
+	return(patch)
+
+def applyPatch(cn, patch):
+	'''
+	Apply a networkPatch to cn, an older version of the network it was
+	computed from. Removed entries are dropped with their citations,
+	modified entries are replaced by their newer rows, added entries
+	are appended and citations are added and removed. Index labels
+	are renumbered from zero if entries are removed.
+	'''
+	if patch.uid != cn.uid:
+		raise ValueError('Patch is for networks with uid ' + str(patch.uid) + ', got ' + str(cn.uid))
+
+	with cn.monitor.stage('applyPatch'):
+		bib = cn.bib.copy()
+		cit = cn.cit[['src', 'tgt']]
+
+		for c in patch.entries.columns:
+			if c not in bib.columns:
+				bib[c] = 'x'
+
+		src, tgt = citKeys(bib, cit, cn.uid)
+		if len(patch.removedEdges) != 0:
+			keep = ~np.isin(edgeHashes(src, tgt), patch.removedEdges)
+			cit = cit[keep]
+
+		if len(patch.removed) != 0:
+			keep = ~bib[cn.uid].isin(patch.removed)
+			cit = cit[cit['src'].isin(bib.index[keep]) & cit['tgt'].isin(bib.index[keep])]
+			positions = pd.Series(range(keep.sum()), index=bib.index[keep])
+			bib = bib[keep].reset_index(drop=True)
+			cit = pd.DataFrame({'src': positions.reindex(cit['src']).values, 'tgt': positions.reindex(cit['tgt']).values})
+
+		entries = patch.entries.reindex(columns=bib.columns, fill_value='x')
+		# networks read by read_json have int64 columns, like year, where
+		# patches computed from networks built in memory have strings
+		mixed = [c for c in bib.columns if bib[c].dtype != entries[c].dtype]
+		bib = bib.astype({c: object for c in mixed})
+		labels = pd.Series(bib.index, index=bib[cn.uid].values)
+		existing = labels.reindex(entries[cn.uid].values)
+		found = existing.notna().to_numpy()
+		if found.any():
+			rows = existing[found].astype(int).values
+			for c in bib.columns:
+				bib.loc[rows, c] = entries[c].values[found]
+		if (~found).any():
+			new = entries[~found]
+			new.index = range(len(bib), len(bib) + len(new))
+			bib = pd.concat([bib, new])
+
+		labels = pd.Series(bib.index, index=bib[cn.uid].values)
+		edges = pd.DataFrame({'src': labels.reindex(patch.addedEdges['src'].values).values, 'tgt': labels.reindex(patch.addedEdges['tgt'].values).values}).dropna().astype(int)
+		cit = pd.concat([cit, edges], ignore_index=True)
+		cit = cit[~cit.duplicated(['src', 'tgt'])].reset_index(drop=True)
+
+		cn.bib = bib
+		cn.cit = cit
+		cn.notUnique = [c for c in cn.columns if c != cn.uid]
+		cn._graph = None
+		cn._graphFile = None
+		cn._pendingGraph = cn._buildGraph
+		cn.rebuildIndexes()
+
+	cn.monitor.count('patch changes applied', len(patch))
@@ -0,0 +1,249 @@
+import numpy as np
+import pandas as pd
+from xml.sax.saxutils import escape
+from .instrument import getMonitor
+
+FORMATS = {'.graphml': 'graphml', '.gexf': 'gexf', '.csv': 'csv'}
+
+ATTRIBUTE_TYPES = {'i': 'long', 'u': 'long', 'f': 'double', 'b': 'boolean'}
+
+ENTITIES = {'"': '&quot;', '\n': '&#10;', '\t': '&#9;'}
+
+def nodeColumns(bib, uid, columns=None):
+	'''
+	Bibliography columns to export as node attributes. Defaults to
+	every column except uid, like bibliograph.util.makeGraph.
+	'''
+	if columns is None:
+		return([c for c in bib.columns if c != uid])
+	if type(columns) == str:
+		columns = [columns]
+	missing = [c for c in columns if c not in bib.columns]
+	if len(missing) != 0:
+		raise ValueError('Can only export bibliography columns, got ' + ', '.join(str(c) for c in missing))
+	return([c for c in columns if c != uid])
+
+def attributeType(series):
+	return(ATTRIBUTE_TYPES.get(series.dtype.kind, 'string'))
+
+def attributeValues(series):
+	'''
+	Escaped string values of a bibliography column, with None where
+	the value is missing. Lists, such as ADS author lists, are written
+	as their string representation.
+	'''
+	values = series.to_numpy(dtype=object)
+	missing = pd.isna(series).to_numpy()
+	if series.dtype.kind == 'b':
+		strings = np.where(values, 'true', 'false')
+	else:
+		strings = series.astype(str).to_numpy(dtype=object)
+	return([None if m else escape(s, ENTITIES) for s, m in zip(strings, missing)])
+
+def nodeIds(bib, uid):
+	'''
+	Escaped node ids indexed by bibliography index label.
+	'''
+	return(pd.Series([escape(s, ENTITIES) for s in bib[uid].astype(str)], index=bib.index))
+
+def edgeChunks(cit, ids, chunkSize):
+	'''
+	Yield (source, target) arrays of node ids for chunkSize citations
+	at a time.
+	'''
+	for start in range(0, len(cit), chunkSize):
+		chunk = cit.iloc[start:start + chunkSize]
+		src = ids.reindex(chunk['src']).to_numpy()
+		tgt = ids.reindex(chunk['tgt']).to_numpy()
+		if pd.isna(src).any() or pd.isna(tgt).any():
+			raise ValueError('Found citations whose index labels are not in the bibliography')
+		yield(start, src, tgt)
+
+def writeGraphML(filename, bib, cit, uid, columns=None, directed=True, chunkSize=100000, monitor=None):
+	'''
+	Write a GraphML file directly from bibliography and citation
+	DataFrames, chunkSize rows at a time, without building a NetworkX
+	graph. The file can be read with nx.read_graphml and gives the
+	same graph as bibliograph.util.makeGraph.
+
+	Parameters
+	----------
+	filename : string
+		Name of the GraphML file
+
+	bib : pd.DataFrame
+		Bibliography. Values in the uid column become node ids.
+
+	cit : pd.DataFrame
+		Citations with 'src' and 'tgt' columns containing index
+		labels of bib.
+
+	uid : string (probably)
+		Label of the column containing unique identifiers for each
+		bibliography entry.
+
+	columns : list-like
+		Bibliography columns written as node attributes. Defaults to
+		every column except uid.
+
+	directed : boolean
+		Write a directed graph. Default is True.
+
+	chunkSize : integer
+		Number of nodes or edges formatted at a time
+
+	monitor : bibliograph.instrument.monitor
+		Receives progress reports, timers and counters. Defaults to
+		the monitor returned by bibliograph.instrument.getMonitor.
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	columns = nodeColumns(bib, uid, columns)
+	keys = ['d' + str(i) for i in range(len(columns))]
+	ids = nodeIds(bib, uid)
+
+	with monitor.stage('writeGraphML'), open(filename, 'w', encoding='utf8') as f:
+		f.write('<?xml version=\'1.0\' encoding=\'utf-8\'?>\n')
+		f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://graphml.graphdrawing.org/xmlns http://graphml.graphdrawing.org/xmlns/1.0/graphml.xsd">\n')
+		for key, c in zip(keys, columns):
+			f.write('  <key id="' + key + '" for="node" attr.name="' + escape(str(c), ENTITIES) + '" attr.type="' + attributeType(bib[c]) + '" />\n')
+		f.write('  <graph edgedefault="' + ('directed' if directed else 'undirected') + '">\n')
+
+		for start in range(0, len(bib), chunkSize):
+			chunk = bib.iloc[start:start + chunkSize]
+			values = [attributeValues(chunk[c]) for c in columns]
+			lines = []
+			for n, i in enumerate(ids.iloc[start:start + chunkSize]):
+				data = ''.join('      <data key="' + key + '">' + v[n] + '</data>\n' for key, v in zip(keys, values) if v[n] is not None)
+				if data:
+					lines.append('    <node id="' + i + '">\n' + data + '    </node>\n')
+				else:
+					lines.append('    <node id="' + i + '" />\n')
+			f.write(''.join(lines))
+			monitor.progress('Writing GraphML nodes', start + len(chunk), len(bib))
+
+		for start, src, tgt in edgeChunks(cit, ids, chunkSize):
+			f.write(''.join('    <edge source="' + s + '" target="' + t + '" />\n' for s, t in zip(src, tgt)))
+			monitor.progress('Writing GraphML edges', start + len(src), len(cit))
+
+		f.write('  </graph>\n</graphml>\n')
+
+	monitor.count('nodes exported', len(bib))
+	monitor.count('edges exported', len(cit))
+
+def writeGEXF(filename, bib, cit, uid, columns=None, directed=True, chunkSize=100000, monitor=None):
+	'''
+	Write a GEXF 1.2 (draft) file for Gephi directly from bibliography and
+	citation DataFrames, chunkSize rows at a time, without building a
+	NetworkX graph. Node ids and labels are values in the uid column.
+
+	Parameters
+	----------
+	filename : string
+		Name of the GEXF file
+
+	bib, cit, uid, columns, directed, chunkSize, monitor
+		See writeGraphML
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	columns = nodeColumns(bib, uid, columns)
+	ids = nodeIds(bib, uid)
+
+	with monitor.stage('writeGEXF'), open(filename, 'w', encoding='utf8') as f:
+		f.write('<?xml version=\'1.0\' encoding=\'utf-8\'?>\n')
+		f.write('<gexf xmlns="http://www.gexf.net/1.2draft" xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:schemaLocation="http://www.gexf.net/1.2draft http://www.gexf.net/1.2draft/gexf.xsd" version="1.2">\n')
+		f.write('  <graph defaultedgetype="' + ('directed' if directed else 'undirected') + '" mode="static">\n')
+		f.write('    <attributes class="node" mode="static">\n')
+		for n, c in enumerate(columns):
+			f.write('      <attribute id="' + str(n) + '" title="' + escape(str(c), ENTITIES) + '" type="' + attributeType(bib[c]) + '" />\n')
+		f.write('    </attributes>\n')
+
+		f.write('    <nodes>\n')
+		for start in range(0, len(bib), chunkSize):
+			chunk = bib.iloc[start:start + chunkSize]
+			values = [attributeValues(chunk[c]) for c in columns]
+			lines = []
+			for n, i in enumerate(ids.iloc[start:start + chunkSize]):
+				data = ''.join('          <attvalue for="' + str(k) + '" value="' + v[n] + '" />\n' for k, v in enumerate(values) if v[n] is not None)
+				if data:
+					lines.append('      <node id="' + i + '" label="' + i + '">\n        <attvalues>\n' + data + '        </attvalues>\n      </node>\n')
+				else:
+					lines.append('      <node id="' + i + '" label="' + i + '" />\n')
+			f.write(''.join(lines))
+			monitor.progress('Writing GEXF nodes', start + len(chunk), len(bib))
+		f.write('    </nodes>\n')
+
+		f.write('    <edges>\n')
+		for start, src, tgt in edgeChunks(cit, ids, chunkSize):
+			f.write(''.join('      <edge id="' + str(start + n) + '" source="' + s + '" target="' + t + '" />\n' for n, (s, t) in enumerate(zip(src, tgt))))
+			monitor.progress('Writing GEXF edges', start + len(src), len(cit))
+		f.write('    </edges>\n')
+
+		f.write('  </graph>\n</gexf>\n')
+
+	monitor.count('nodes exported', len(bib))
+	monitor.count('edges exported', len(cit))
+
+def writeEdgeList(filename, bib, cit, uid, chunkSize=100000, monitor=None):
+	'''
+	Write citations as a CSV edge list with Source and Target columns
+	containing uid values, the format Gephi and Cytoscape import as an
+	edge table.
+
+	Parameters
+	----------
+	filename : string
+		Name of the CSV file
+
+	bib, cit, uid, chunkSize, monitor
+		See writeGraphML
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	ids = pd.Series(bib[uid].values, index=bib.index)
+
+	with monitor.stage('writeEdgeList'), open(filename, 'w', encoding='utf8', newline='') as f:
+		pd.DataFrame(columns=['Source', 'Target']).to_csv(f, index=False)
+		for start in range(0, len(cit), chunkSize):
+			chunk = cit.iloc[start:start + chunkSize]
+			edges = pd.DataFrame({'Source': ids.reindex(chunk['src']).values, 'Target': ids.reindex(chunk['tgt']).values})
+			if edges.isna().any().any():
+				raise ValueError('Found citations whose index labels are not in the bibliography')
+			edges.to_csv(f, index=False, header=False)
+			monitor.progress('Writing edge list', start + len(chunk), len(cit))
+
+	monitor.count('edges exported', len(cit))
+
+def writeNodeList(filename, bib, uid, columns=None, chunkSize=100000, monitor=None):
+	'''
+	Write bibliography entries as a CSV node table with an Id column
+	containing uid values followed by the selected columns, the
+	format Gephi and Cytoscape import as a node table.
+
+	Parameters
+	----------
+	filename : string
+		Name of the CSV file
+
+	bib, uid, columns, chunkSize, monitor
+		See writeGraphML
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	columns = nodeColumns(bib, uid, columns)
+
+	with monitor.stage('writeNodeList'), open(filename, 'w', encoding='utf8', newline='') as f:
+		pd.DataFrame(columns=['Id'] + columns).to_csv(f, index=False)
+		for start in range(0, len(bib), chunkSize):
+			chunk = bib.iloc[start:start + chunkSize]
+			nodes = chunk[columns].copy()
+			nodes.insert(0, 'Id', chunk[uid].values)
+			nodes.to_csv(f, index=False, header=False)
+			monitor.progress('Writing node list', start + len(chunk), len(bib))
+
+	monitor.count('nodes exported', len(bib))
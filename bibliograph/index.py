@@ -0,0 +1,260 @@
+import re
+import numpy as np
+import pandas as pd
+
+def hashable(value):
+	'''
+	Return value, or a tuple of its items if value is a list, so that
+	list-valued bibliography fields can be used as dictionary keys.
+	'''
+	if isinstance(value, (list, np.ndarray)):
+		return(tuple(value))
+	return(value)
+
+def splitTokens(value):
+	'''
+	Default tokenizer for tokenIndex. Splits multi-author BibTex fields
+	on ' and ' or ';' and list-valued fields (such as ADS author lists)
+	into items, then lowercases and strips each item. 'x' and empty
+	items are dropped.
+
+	Returns
+	-------
+	tokens : set
+	'''
+	if isinstance(value, (list, tuple, np.ndarray)):
+		items = value
+	else:
+		items = re.split(r'\s+and\s+|;', str(value))
+	tokens = set()
+	for item in items:
+		item = str(item).strip().lower()
+		if (item != '') and (item != 'x'):
+			tokens.add(item)
+	return(tokens)
+
+class hashIndex:
+	'''
+	Index of exact values in one bibliography column. Lookups return
+	the index labels of every row with a given value without scanning
+	the bibliography.
+
+	Parameters
+	----------
+	column : string (probably)
+		Label of the indexed bibliography column
+	'''
+	kind = 'hash'
+
+	def __init__(self, column):
+		self.column = column
+		self.keys = {}
+		self.buckets = {}
+
+	def build(self, bib):
+		self.keys = {}
+		self.buckets = {}
+		self.update(bib, bib.index)
+
+	def update(self, bib, labels):
+		'''
+		Update the index for rows of bib whose index labels are in
+		labels, after those rows were inserted or changed.
+		'''
+		for label, value in zip(labels, bib.loc[labels, self.column]):
+			value = hashable(value)
+			if label in self.keys:
+				old = self.keys[label]
+				if old == value:
+					continue
+				self.buckets[old].discard(label)
+				if len(self.buckets[old]) == 0:
+					del self.buckets[old]
+			self.keys[label] = value
+			self.buckets.setdefault(value, set()).add(label)
+
+	def lookup(self, value):
+		'''
+		Returns
+		-------
+		pd.Index
+			Labels of rows whose value is value
+		'''
+		return(pd.Index(sorted(self.buckets.get(hashable(value), ()))))
+
+class sortedIndex:
+	'''
+	Index of one bibliography column kept in sorted order, for range
+	queries such as year ranges. Changes are buffered and merged into
+	the sorted arrays at the next query, so bulk updates cost one sort.
+
+	Parameters
+	----------
+	column : string (probably)
+		Label of the indexed bibliography column
+
+	numeric : boolean
+		If True (default), values are converted to numbers and values
+		that can't be converted (like 'x') are left out of the index.
+		If False, values are compared as strings.
+	'''
+	kind = 'sorted'
+
+	def __init__(self, column, numeric=True):
+		self.column = column
+		self.numeric = numeric
+		self.values = np.array([])
+		self.labels = np.array([], dtype=object)
+		self.pending = {}
+
+	def convert(self, values):
+		if self.numeric:
+			return(pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype=float))
+		return(pd.Series(values).astype(str).to_numpy(dtype=object))
+
+	def build(self, bib):
+		values = self.convert(bib[self.column].values)
+		labels = bib.index.to_numpy()
+		keep = ~pd.isna(values)
+		order = np.argsort(values[keep], kind='stable')
+		self.values = values[keep][order]
+		self.labels = labels[keep][order]
+		self.pending = {}
+
+	def update(self, bib, labels):
+		labels = list(labels)
+		self.pending.update(zip(labels, self.convert(bib.loc[labels, self.column].values)))
+
+	def flush(self):
+		if len(self.pending) == 0:
+			return
+		changed = np.array(list(self.pending.keys()), dtype=self.labels.dtype if len(self.labels) else object)
+		keep = ~np.isin(self.labels, changed)
+		newValues = np.array(list(self.pending.values()), dtype=self.values.dtype if self.numeric else object)
+		notna = ~pd.isna(newValues)
+		values = np.concatenate([self.values[keep], newValues[notna]])
+		labels = np.concatenate([self.labels[keep], changed[notna]])
+		order = np.argsort(values, kind='stable')
+		self.values = values[order]
+		self.labels = labels[order]
+		self.pending = {}
+
+	def range(self, low, high):
+		'''
+		Returns
+		-------
+		pd.Index
+			Labels of rows with low <= value <= high
+		'''
+		self.flush()
+		if self.numeric:
+			low, high = float(low), float(high)
+		else:
+			low, high = str(low), str(high)
+		start = np.searchsorted(self.values, low, side='left')
+		stop = np.searchsorted(self.values, high, side='right')
+		return(pd.Index(np.sort(self.labels[start:stop])))
+
+	def lookup(self, value):
+		return(self.range(value, value))
+
+class tokenIndex:
+	'''
+	Inverted index of tokens in a multi-valued bibliography column,
+	such as an author list. Lookups return the labels of every row
+	containing a token.
+
+	Parameters
+	----------
+	column : string (probably)
+		Label of the indexed bibliography column
+
+	tokenizer : function
+		Takes a field value and returns a set of tokens. Defaults to
+		splitTokens. Lookup values are passed through the same
+		tokenizer.
+	'''
+	kind = 'token'
+
+	def __init__(self, column, tokenizer=None):
+		self.column = column
+		self.tokenizer = tokenizer if tokenizer is not None else splitTokens
+		self.tokens = {}
+		self.postings = {}
+
+	def build(self, bib):
+		self.tokens = {}
+		self.postings = {}
+		self.update(bib, bib.index)
+
+	def update(self, bib, labels):
+		for label, value in zip(labels, bib.loc[labels, self.column]):
+			tokens = self.tokenizer(value)
+			old = self.tokens.get(label, set())
+			if old == tokens:
+				continue
+			for t in old - tokens:
+				self.postings[t].discard(label)
+				if len(self.postings[t]) == 0:
+					del self.postings[t]
+			for t in tokens - old:
+				self.postings.setdefault(t, set()).add(label)
+			self.tokens[label] = tokens
+
+	def lookup(self, value):
+		'''
+		Returns
+		-------
+		pd.Index
+			Labels of rows containing every token of value
+		'''
+		found = None
+		for t in self.tokenizer(value):
+			labels = self.postings.get(t, set())
+			found = set(labels) if found is None else found & labels
+		return(pd.Index(sorted(found or ())))
+
+INDEX_KINDS = {'hash': hashIndex, 'sorted': sortedIndex, 'token': tokenIndex}
+
+class edgeIndex:
+	'''
+	Citations sorted by source and by target, so that the citations of
+	a set of papers can be found with binary searches instead of
+	masking the whole cit DataFrame.
+
+	Parameters
+	----------
+	cit : pd.DataFrame
+		Citations with 'src' and 'tgt' columns
+	'''
+	def __init__(self, cit):
+		self.cit = cit
+		src = cit['src'].to_numpy()
+		tgt = cit['tgt'].to_numpy()
+		self.srcOrder = np.argsort(src, kind='stable')
+		self.srcSorted = src[self.srcOrder]
+		self.tgtOrder = np.argsort(tgt, kind='stable')
+		self.tgtSorted = tgt[self.tgtOrder]
+
+	@staticmethod
+	def gather(sortedValues, order, labels):
+		labels = np.asarray(labels)
+		start = np.searchsorted(sortedValues, labels, side='left')
+		stop = np.searchsorted(sortedValues, labels, side='right')
+		counts = stop - start
+		if counts.sum() == 0:
+			return(np.array([], dtype=int))
+		offsets = np.repeat(start - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+		return(order[offsets + np.arange(counts.sum())])
+
+	def outgoing(self, labels):
+		'''
+		Positions in cit of citations whose source is in labels
+		'''
+		return(self.gather(self.srcSorted, self.srcOrder, labels))
+
+	def incoming(self, labels):
+		'''
+		Positions in cit of citations whose target is in labels
+		'''
+		return(self.gather(self.tgtSorted, self.tgtOrder, labels))
@@ -0,0 +1,174 @@
+import queue
+import threading
+from .instrument import getMonitor
+from .util import collapseEntries
+from .util import entryBatch
+
+# put on the queue by a producer thread when its input is exhausted
+DONE = object()
+
+def dedupBatches(batches, uid):
+	'''
+	Combine entries with repeated uids within each batch before it is
+	merged into the bibliography. Earlier entries take precedence and
+	later entries only fill fields that are 'x', matching
+	bibliograph.util.bibUpdate.
+
+	Parameters
+	----------
+	batches : iterable
+		bibliograph.util.entryBatch objects
+
+	uid : string (probably)
+		Label of the column containing unique identifiers
+
+	Yields
+	------
+	bibliograph.util.entryBatch
+	'''
+	for batch in batches:
+		if (len(batch.entries) != 0) and batch.entries[uid].duplicated().any():
+			batch = entryBatch(collapseEntries(batch.entries, uid).fillna('x'), batch.edges, batch.sources)
+		yield batch
+
+def asBatches(items):
+	'''
+	Wrap DataFrames of bibliography entries, such as the batches
+	yielded by bibliograph.readwrite.iterBibTex, in entryBatch objects.
+	entryBatch objects are passed through.
+	'''
+	for item in items:
+		yield item if isinstance(item, entryBatch) else entryBatch(item)
+
+def put(channel, item, stop):
+	'''
+	Put item on channel, waiting while it is full. Returns False
+	without putting the item if stop is set while waiting.
+	'''
+	while not stop.is_set():
+		try:
+			channel.put(item, timeout=0.1)
+			return(True)
+		except queue.Full:
+			pass
+	return(False)
+
+def produce(items, channel, stop, errors):
+	'''
+	Body of a producer thread. Puts every item of items on channel and
+	then DONE. An exception raised while producing items is stored in
+	errors for the consuming thread to raise.
+	'''
+	try:
+		for item in items:
+			if not put(channel, item, stop):
+				return
+	except BaseException as error:
+		errors.append(error)
+	finally:
+		put(channel, DONE, stop)
+
+def overlap(producers, consume, maxQueued=4, monitor=None):
+	'''
+	Iterate over each producer in its own thread and pass every item
+	produced to consume in the calling thread, so that reading files
+	or waiting for ADS overlaps with merging into the network. Items
+	pass through a queue holding at most maxQueued items; producers
+	wait while it is full, so no more than maxQueued items plus one
+	per producer are in memory however far reading gets ahead of
+	merging. Items from one producer are consumed in the order it
+	produced them. Items from different producers may interleave.
+
+	If a producer raises an exception, the other producers are
+	stopped and the exception is raised here once they have finished.
+	If consume raises an exception, the producers are stopped and it
+	is raised.
+
+	Parameters
+	----------
+	producers : list
+		Iterables, such as generators, each iterated by one thread
+
+	consume : function
+		Called with every item, in the calling thread
+
+	maxQueued : integer
+		Maximum number of items waiting to be consumed
+
+	monitor : bibliograph.instrument.monitor
+		Time spent waiting for producers is added to the 'ingestWait'
+		timer. Defaults to the monitor returned by
+		bibliograph.instrument.getMonitor.
+
+	Returns
+	-------
+	consumed : integer
+		Number of items consumed
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	channel = queue.Queue(maxsize=maxQueued)
+	stop = threading.Event()
+	errors = []
+	threads = [threading.Thread(target=produce, args=(p, channel, stop, errors), daemon=True) for p in producers]
+	for thread in threads:
+		thread.start()
+
+	running = len(threads)
+	consumed = 0
+	try:
+		while (running != 0) and (len(errors) == 0):
+			with monitor.stage('ingestWait'):
+				item = channel.get()
+			if item is DONE:
+				running -= 1
+				continue
+			consume(item)
+			consumed += 1
+			monitor.count('batches merged')
+	finally:
+		stop.set()
+		for thread in threads:
+			thread.join()
+
+	if len(errors) != 0:
+		raise errors[0]
+	return(consumed)
+
+def ingestBatches(cn, readers, maxQueued=4, noNewSources=False):
+	'''
+	Merge batches from several readers into a citation network. Each
+	reader is iterated in its own thread, repeated uids are combined
+	within each batch in that thread, and batches are merged one at a
+	time with citnet.applyBatch in the calling thread. See overlap.
+
+	Batches from different readers can be merged in any order, so a
+	reference CSV whose sources come from a BibTex file read at the
+	same time should not use noNewSources.
+
+	Parameters
+	----------
+	cn : bibliograph.citnet
+		The network
+
+	readers : list
+		Iterables of bibliograph.util.entryBatch objects or DataFrames
+		of entries, like those returned by
+		bibliograph.readwrite.iterBibTex and
+		bibliograph.readwrite.iterReferenceCSV
+
+	maxQueued : integer
+		Maximum number of batches read but not yet merged
+
+	noNewSources : boolean
+		See citnet.applyBatch
+
+	Returns
+	-------
+	batches : integer
+		Number of batches merged
+	'''
+	uid = cn.inputColumns()[1]
+	with cn.monitor.stage('ingest'):
+		return(overlap([dedupBatches(asBatches(r), uid) for r in readers], lambda batch: cn.applyBatch(batch, noNewSources=noNewSources), maxQueued=maxQueued, monitor=cn.monitor))
@@ -0,0 +1,151 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+class consoleProgress:
+	'''
+	Progress callback that writes a single updating line to a stream.
+	Updates are throttled so that reporting progress for every row of
+	a large file costs almost nothing.
+
+	Parameters
+	----------
+	stream : file-like
+		Stream to write to. Defaults to sys.stdout.
+
+	interval : float
+		Minimum number of seconds between updates of the line.
+	'''
+	def __init__(self, stream=None, interval=0.25):
+		self.stream = stream
+		self.interval = interval
+		self.last = 0.0
+
+	def __call__(self, stage, done, total=None):
+		stream = self.stream if self.stream is not None else sys.stdout
+		now = time.perf_counter()
+		finished = (total is not None) and (done >= total)
+		if (not finished) and (now - self.last < self.interval):
+			return
+		self.last = now
+		if total:
+			line = stage + ': ' + str(done) + '/' + str(total) + ' (' + format(100*done/total, '.0f') + '%)'
+		else:
+			line = stage + ': ' + str(done)
+		stream.write('\r' + line + ('\n' if finished else ''))
+		stream.flush()
+
+class monitor:
+	'''
+	Collects per-stage timers and counters and forwards progress
+	reports to callbacks. Every bibliograph loader reports to the
+	monitor of the citnet it modifies (or the default monitor returned
+	by getMonitor), so a job can read all metrics from one place:
+
+		m = monitor(quiet=True, progress=myCallback)
+		cn = citnet(bibtex='refs.bib', monitor=m)
+		m.report()
+		# {'timers': {'slurpBibTex': 1.9}, 'counters': {'entries parsed': 5000, ...}}
+
+	Parameters
+	----------
+	quiet : boolean
+		If True, informational messages are not printed. Progress
+		callbacks are still called.
+
+	progress : callable or list of callables
+		Functions called as progress(stage, done, total) where total
+		is None if unknown. If None, a consoleProgress writing to
+		stdout is used unless quiet is True.
+
+	stream : file-like
+		Stream for informational messages. Defaults to sys.stdout.
+	'''
+	def __init__(self, quiet=False, progress=None, stream=None):
+		self.quiet = quiet
+		self.stream = stream
+		self.lock = threading.Lock()
+		if progress is None:
+			self.callbacks = [] if quiet else [consoleProgress(stream)]
+		elif callable(progress):
+			self.callbacks = [progress]
+		else:
+			self.callbacks = list(progress)
+		self.reset()
+
+	def reset(self):
+		'''
+		Clear all timers and counters.
+		'''
+		self.timers = {}
+		self.calls = {}
+		self.counters = {}
+
+	@contextmanager
+	def stage(self, name):
+		'''
+		Context manager that adds the time spent in its block to the
+		timer for stage name.
+		'''
+		start = time.perf_counter()
+		try:
+			yield self
+		finally:
+			with self.lock:
+				self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - start
+				self.calls[name] = self.calls.get(name, 0) + 1
+
+	def count(self, name, n=1):
+		'''
+		Add n to the counter name. Safe to call from several threads.
+		'''
+		with self.lock:
+			self.counters[name] = self.counters.get(name, 0) + n
+
+	def progress(self, stage, done, total=None):
+		'''
+		Report that done of total items in stage have been processed.
+		'''
+		for callback in self.callbacks:
+			callback(stage, done, total)
+
+	def addCallback(self, callback):
+		self.callbacks.append(callback)
+
+	def message(self, *args, **kwargs):
+		'''
+		Print an informational message unless quiet. Takes the same
+		arguments as print.
+		'''
+		if not self.quiet:
+			kwargs.setdefault('file', self.stream if self.stream is not None else sys.stdout)
+			print(*args, **kwargs)
+
+	def report(self):
+		'''
+		Returns
+		-------
+		dictionary
+			Copies of the timers (seconds), stage call counts, and
+			counters, suitable for serializing to JSON.
+		'''
+		return({'timers': dict(self.timers), 'calls': dict(self.calls), 'counters': dict(self.counters)})
+
+_default = monitor()
+
+def getMonitor():
+	'''
+	Return the default monitor used when no monitor is passed to a
+	citnet or to a bibliograph function.
+	'''
+	return(_default)
+
+def setMonitor(m):
+	'''
+	Replace the default monitor and return the previous one.
+	'''
+	global _default
+	previous = _default
+	_default = m
+	return(previous)
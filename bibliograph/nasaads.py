@@ -1,9 +1,50 @@
-import ads
-import progressbar
 from datetime import datetime
 import pandas as pd
+from .ingest import overlap
+from .instrument import getMonitor
 
-def makeQueries(sources, searchColumns, adsTerms=None, toQuery=None, wrapper=None):
+def docColumns(docs, fetchTerms, columns=None):
+	'''
+	Decode the raw JSON documents of an ADS response into a DataFrame
+	with one column per fetch term, building each column in one pass
+	over the documents instead of creating and processing an article
+	object per document. List fields such as author, title and page
+	are flattened to strings, so fetched entries get the same refs as
+	entries read from BibTex files: lists of one item become the item
+	and longer lists, like author lists, are joined with ' and ' as
+	BibTex author fields are. Fields missing from a document are 'x'.
+
+	Parameters
+	----------
+	docs : list
+		Documents from search.response.docs of an executed
+		ads.SearchQuery
+
+	fetchTerms : list-like
+		ADS fields to decode
+
+	columns : list-like
+		Column labels corresponding to fetchTerms. If None, use
+		fetchTerms.
+
+	Returns
+	-------
+	pd.DataFrame
+	'''
+	columns = list(fetchTerms) if columns is None else list(columns)
+	return(pd.DataFrame({c: [flatten(doc.get(t, 'x')) for doc in docs] for c, t in zip(columns, fetchTerms)}, columns=columns))
+
+def flatten(value):
+	'''
+	String form of a list field of an ADS document. See docColumns.
+	'''
+	if not isinstance(value, list):
+		return(value)
+	if len(value) == 0:
+		return('x')
+	return(' and '.join(str(v) for v in value))
+
+def makeQueries(sources, searchColumns, adsTerms=None, toQuery=None, wrapper=None, monitor=None):
 	'''
 	Make strings that represent ADS search queries
 
@@ -30,6 +71,10 @@ def makeQueries(sources, searchColumns, adsTerms=None, toQuery=None, wrapper=Non
 		'references'. List of ADS operators is in the drop-down menu
 		above the search bar at https://ui.adsabs.harvard.edu/
 
+	monitor : bibliograph.instrument.monitor
+		Receives messages. Defaults to the monitor returned by
+		bibliograph.instrument.getMonitor.
+
 	Returns
 	-------
 	queries : pd.DataFrame
@@ -46,7 +91,10 @@ def makeQueries(sources, searchColumns, adsTerms=None, toQuery=None, wrapper=Non
 	else:
 		thisIndex = sources.index
 
-	print('Making ADS query strings for\n', sources.loc[thisIndex], '\n')
+	if monitor is None:
+		monitor = getMonitor()
+
+	monitor.message('Making ADS query strings for ' + str(len(thisIndex)) + ' bibliography entries\n')
 
 	if adsTerms is not None:
 		fields = [[c, adsTerms[i]] for i,c in enumerate(searchColumns)]
@@ -56,7 +104,7 @@ def makeQueries(sources, searchColumns, adsTerms=None, toQuery=None, wrapper=Non
 	queries = pd.DataFrame(columns=['query'])
 	badQueries = []
 
-	if len(queries) == 0:
+	if len(thisIndex) == 0:
 		return((queries, badQueries))
 
 	for i in thisIndex:
@@ -80,7 +128,7 @@ def makeQueries(sources, searchColumns, adsTerms=None, toQuery=None, wrapper=Non
 
 	return((queries, badQueries))
 
-def confirmADS(queries):
+def confirmADS(queries, monitor=None):
 	'''
 	Get the current rate limits on the NASA/ADS API token for this
 	system, report values, and ask user to proceed if there may be
@@ -93,16 +141,25 @@ def confirmADS(queries):
 
 	Parameters
 	----------
-	queries : pd.DataFrame
-		queries to submit to the API.
+	queries : pd.DataFrame OR integer
+		queries to submit to the API, or the number of queries.
+
+	monitor : bibliograph.instrument.monitor
+		Receives messages and counts the rate limit query.
 
 	Returns
 	-------
 	boolean
 		False if user decides not to proceed when close to rate limit.
 	'''
-	numQueries = len(queries.index)
+	if monitor is None:
+		monitor = getMonitor()
+
+	import ads
+
+	numQueries = len(queries.index) if isinstance(queries, pd.DataFrame) else int(queries)
 	q = ads.SearchQuery(q='q').execute()
+	monitor.count('ADS queries')
 	limits = ads.RateLimits('SearchQuery').limits
 	reset = datetime.utcfromtimestamp(int(limits['reset'])).strftime('%H:%M:%S, %Y-%m-%d')
 	if numQueries > int(limits['limit']):
@@ -111,16 +168,13 @@ def confirmADS(queries):
 		raise ValueError('\nTrying to run up to ' + str(numQueries) + ' NASA/ADS search queries but this API token only has ' + limits['remaining'] + ' queries remaining today.\n\tRate limit resets at ' + reset + '\n')
 	else:
 		remainder = int(limits['remaining']) - numQueries
-		print('\nAbout to run ' + str(numQueries) + ' NASA/ADS search queries.\nThere will be ' + str(remainder) + ' queries available today after this operation.\nRate limit resets at ' + reset + '\n')
+		monitor.message('\nAbout to run ' + str(numQueries) + ' NASA/ADS search queries.\nThere will be ' + str(remainder) + ' queries available today after this operation.\nRate limit resets at ' + reset + '\n')
 		if remainder <= (int(limits['limit'])*0.1):
 			answer = input('Remainder will likely be less than 10% of the daily limit. Enter y to continue, anything else to break.\n')
-			if (answer != 'y') and (answer != 'Y'):
-				return(True)
-			else:
-				return(False)
+			return((answer == 'y') or (answer == 'Y'))
 		return(True)
 
-def queryADSbibcodes(sources, searchColumns, adsTerms=None, toQuery=None):
+def queryADSbibcodes(sources, searchColumns, adsTerms=None, toQuery=None, monitor=None):
 	'''
 	Get ADS bibcodes for papers in the sources DataFrame
 
@@ -144,6 +198,11 @@ def queryADSbibcodes(sources, searchColumns, adsTerms=None, toQuery=None):
 	toQuery : pd.DataFrame, dtype == boolean
 		A boolean mask to select which sources should be queried.
 
+	monitor : bibliograph.instrument.monitor
+		Receives messages, progress reports, timers and counters.
+		Defaults to the monitor returned by
+		bibliograph.instrument.getMonitor.
+
 	Returns
 	-------
 	queries : pd.DataFrame
@@ -156,37 +215,72 @@ def queryADSbibcodes(sources, searchColumns, adsTerms=None, toQuery=None):
 		values in columns to be searched either contained spaces or 
 		were 'x'.	
 	'''
-	queries, badQueries = makeQueries(sources, searchColumns, adsTerms=adsTerms, toQuery=toQuery)
+	if monitor is None:
+		monitor = getMonitor()
+
+	queries, badQueries = makeQueries(sources, searchColumns, adsTerms=adsTerms, toQuery=toQuery, monitor=monitor)
 	queries.insert(len(queries.columns), 'ADSarticles', [None]*len(queries))
 	queries.insert(len(queries.columns), 'bibcode', ['']*len(queries))
 
 	if len(queries) == 0:
-		print('queryADSbibcodes created no query strings')
+		monitor.message('queryADSbibcodes created no query strings')
 		return ((queries, badQueries))
 
-	if confirmADS(queries):
-
-		#set up and start a progress bar
-		widgets = ['Queries: ', progressbar.Percentage(),' ', progressbar.Bar(marker='='),'|', progressbar.Timer(),]
-		bar = progressbar.ProgressBar(widgets=widgets, maxval=(len(queries)-1)).start()
-		qIndex = list(queries.index)
-
-		for i in qIndex:
-			q = queries.loc[i, 'query']
-			search = ads.SearchQuery(q=q, fl='bibcode')
-			try:
-				search.execute()
-			finally:
-				queries.to_json('queries.json')
-			queries.loc[i, 'ADSarticles'] = search.articles
-			queries.loc[i, 'bibcode'] = ' '.join(list(map(lambda x: x.bibcode, search.articles)))
-			bar.update(qIndex.index(i))
-
-		bar.finish()
+	if confirmADS(queries, monitor=monitor):
+		import ads
+
+		with monitor.stage('queryADSbibcodes'):
+			qIndex = list(queries.index)
+
+			for n, i in enumerate(qIndex):
+				q = queries.loc[i, 'query']
+				search = ads.SearchQuery(q=q, fl='bibcode')
+				try:
+					search.execute()
+				finally:
+					queries.drop(columns='ADSarticles').to_json('queries.json')
+				monitor.count('ADS queries')
+				monitor.count('ADS results', len(search.articles))
+				queries.at[i, 'ADSarticles'] = search.articles
+				queries.loc[i, 'bibcode'] = ' '.join(doc['bibcode'] for doc in search.response.docs)
+				monitor.progress('ADS bibcode queries', n + 1, len(qIndex))
 
 	return((queries, badQueries))
 
-def queryADS(sources, searchColumns, fetchTerms, adsTerms=None, fetchColumns=None, toQuery=None, wrapper='references', articleProcessor=None):
+def fetchResults(queries, fetchTerms, columns, articleProcessor=None, monitor=None):
+	'''
+	Run the queries made by queryADS one at a time and yield the
+	results of each as a DataFrame with columns followed by 'srcidx'.
+	If articleProcessor is given, articles are stored in the
+	'ADSarticles' column of queries; otherwise no article objects are
+	made. If a query fails, queries is written to queries.json.
+	'''
+	import ads
+
+	if monitor is None:
+		monitor = getMonitor()
+
+	qIndex = list(queries.index)
+	for n, i in enumerate(qIndex):
+		q = queries.loc[i, 'query']
+		search = ads.SearchQuery(q=q, fl=fetchTerms)
+		try:
+			search.execute()
+		except:
+			queries.drop(columns='ADSarticles').to_json('queries.json')
+			raise
+		monitor.count('ADS queries')
+		monitor.count('ADS results', len(search.response.docs))
+		if articleProcessor is None:
+			frame = docColumns(search.response.docs, fetchTerms, columns)
+		else:
+			queries.at[i, 'ADSarticles'] = search.articles
+			frame = pd.DataFrame([list(articleProcessor(article)) for article in search.articles], columns=columns)
+		frame['srcidx'] = i
+		monitor.progress('ADS queries', n + 1, len(qIndex))
+		yield frame
+
+def queryADS(sources, searchColumns, fetchTerms, adsTerms=None, fetchColumns=None, toQuery=None, wrapper='references', articleProcessor=None, consume=None, maxQueued=4, monitor=None):
 	'''
 	Submit API queries to NASA/ADS.
 
@@ -231,9 +325,26 @@ def queryADS(sources, searchColumns, fetchTerms, adsTerms=None, fetchColumns=Non
 	articleProcessor : function
 		Function that takes an ads article object and returns a
 		list-like object of with values for a bibliography entry. If
-		not provided, assume fetchTerms contains bibliography column
-		labels and enter fetched data directly into the results
-		DataFrame.
+		not provided, the raw documents of each response are decoded
+		column by column with docColumns, fetchTerms are assumed to
+		correspond to fetchColumns and fetched data is entered
+		directly into the results DataFrame.
+
+	consume : function
+		If given, queries run in a background thread and consume is
+		called in the calling thread with the results of each query,
+		a DataFrame with the columns of results, as soon as they
+		arrive, so results can be merged while later queries wait for
+		ADS. See bibliograph.ingest.overlap.
+
+	maxQueued : integer
+		Only used with consume. Maximum number of query results
+		waiting to be consumed.
+
+	monitor : bibliograph.instrument.monitor
+		Receives messages, progress reports, timers and counters.
+		Defaults to the monitor returned by
+		bibliograph.instrument.getMonitor.
 
 	Returns
 	-------
@@ -246,7 +357,9 @@ def queryADS(sources, searchColumns, fetchTerms, adsTerms=None, fetchColumns=Non
 
 	queries : pd.DataFrame
 		DataFrame with query strings and data returned from ADS
-		queries. Index corresponds to the sources index.
+		queries. Index corresponds to the sources index. ADS article
+		objects are in the 'ADSarticles' column only if
+		articleProcessor is given.
 
 	badQueries : list
 		List of index values from the sources DataFrame for which
@@ -263,48 +376,93 @@ def queryADS(sources, searchColumns, fetchTerms, adsTerms=None, fetchColumns=Non
 	if type(fetchColumns) == str:
 		fetchColumns = [fetchColumns]
 
-	queries, badQueries = makeQueries(sources, searchColumns, adsTerms=adsTerms, toQuery=toQuery, wrapper=wrapper)
+	if monitor is None:
+		monitor = getMonitor()
+
+	queries, badQueries = makeQueries(sources, searchColumns, adsTerms=adsTerms, toQuery=toQuery, wrapper=wrapper, monitor=monitor)
 	queries.insert(len(queries.columns), 'ADSarticles', [None]*len(queries))
 
 	if fetchColumns is None:
-		theseColumns = fetchTerms
+		theseColumns = list(fetchTerms)
 	else:
-		theseColumns = fetchColumns
+		theseColumns = list(fetchColumns)
 
 	theseColumns.append('srcidx')
 
 	results = pd.DataFrame(columns=theseColumns)
 
 	if len(queries) == 0:
-		print('queryADS created no query strings')
+		monitor.message('queryADS created no query strings')
 		return((results, queries, badQueries))
 
-	if articleProcessor is None:
-		articleProcessor = lambda x: [x.__getattribute__(t) for t in fetchTerms]
+	frames = []
 
-	if confirmADS(queries):
+	if confirmADS(queries, monitor=monitor):
+		fetched = fetchResults(queries, fetchTerms, theseColumns[:-1], articleProcessor=articleProcessor, monitor=monitor)
 
-		#set up and start a progress bar
-		widgets = ['Queries: ', progressbar.Percentage(),' ', progressbar.Bar(marker='='),'|', progressbar.Timer(),]
-		bar = progressbar.ProgressBar(widgets=widgets, maxval=(len(queries)-1)).start()
-		qIndex = list(queries.index)
+		def keep(frame):
+			frames.append(frame)
+			if consume is not None:
+				consume(frame)
 
-		for i in qIndex:
-			q = queries.loc[i, 'query']
-			search = ads.SearchQuery(q=q, fl=fetchTerms)
+		with monitor.stage('queryADS'):
 			try:
-				search.execute()
+				if consume is None:
+					for frame in fetched:
+						keep(frame)
+				else:
+					overlap([fetched], keep, maxQueued=maxQueued, monitor=monitor)
 			except:
-				results.to_json('results.json')
-				queries.to_json('queries.json')
+				if len(frames) != 0:
+					pd.concat(frames, ignore_index=True).to_json('results.json')
 				raise
-			queries.loc[i, 'ADSarticles'] = search.articles
-			for article in search.articles:
-				values = articleProcessor(article)
-				values.append(i)
-				results = results.append(pd.Series(dict(zip(theseColumns, values))), ignore_index=True)
-			bar.update(qIndex.index(i))
 
-		bar.finish()
+	if len(frames) != 0:
+		results = pd.concat(frames, ignore_index=True)
 
 	return((results, queries, badQueries))
+
+def iterBibcodeQueries(bibcodes, fetchTerms, batchSize=50, raw=False, monitor=None):
+	'''
+	Fetch ADS records for a list of bibcodes, batchSize bibcodes per
+	API query, instead of one query per bibcode.
+
+	Parameters
+	----------
+	bibcodes : list-like
+		ADS bibcodes to fetch
+
+	fetchTerms : list-like
+		ADS fields to get for each record
+
+	batchSize : integer
+		Bibcodes per query. The ADS API returns at most 2000 records
+		per query.
+
+	raw : boolean
+		If True, yield the raw JSON documents of each response, for
+		decoding with docColumns, instead of article objects.
+
+	monitor : bibliograph.instrument.monitor
+		Counts queries and results. Defaults to the monitor returned
+		by bibliograph.instrument.getMonitor.
+
+	Yields
+	------
+	articles : list
+		ads article objects (or documents, if raw) for one batch.
+		Bibcodes that ADS doesn't know are missing from the list.
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	import ads
+
+	bibcodes = list(bibcodes)
+	for start in range(0, len(bibcodes), batchSize):
+		batch = bibcodes[start:start + batchSize]
+		search = ads.SearchQuery(q='bibcode:(' + ' OR '.join(batch) + ')', fl=list(fetchTerms), rows=len(batch))
+		search.execute()
+		monitor.count('ADS queries')
+		monitor.count('ADS results', len(search.response.docs))
+		yield search.response.docs if raw else search.articles
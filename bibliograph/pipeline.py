@@ -0,0 +1,331 @@
+import json
+import os
+import time
+from importlib import import_module
+from .citnet import citnet
+from .ingest import ingestBatches
+from .instrument import getMonitor
+from .readwrite import iterBibTex
+from .readwrite import iterReferenceCSV
+
+STAGES = ['ingest', 'ads', 'authors', 'graph', 'export']
+
+def resolve(name):
+	'''
+	Return the object named by a string like 'package.module:function'.
+	Used to refer to translators, tag processors and article processors
+	from a JSON pipeline configuration.
+	'''
+	if not isinstance(name, str):
+		return(name)
+	if ':' not in name:
+		raise ValueError('Expected a name like "module:function", got ' + name)
+	module, attr = name.split(':', 1)
+	obj = import_module(module)
+	for a in attr.split('.'):
+		obj = getattr(obj, a)
+	return(obj)
+
+def resolveProcessors(tag_processors):
+	'''
+	Resolve function names in a tag_processors dictionary read from a
+	JSON configuration.
+	'''
+	if tag_processors is None:
+		return(None)
+	resolved = {}
+	for tag, processor in tag_processors.items():
+		if type(processor[0]) is not str:
+			resolved[tag] = [[p[0], resolve(p[1])] for p in processor]
+		else:
+			resolved[tag] = [processor[0], resolve(processor[1])]
+	return(resolved)
+
+class pipeline:
+	'''
+	Batch pipeline that builds a citation network from a configuration
+	dictionary, usually read from a JSON file by the bibliograph
+	command. Stages run in the order
+
+		ingest -> ads -> authors -> graph -> export
+
+	Input files are read in batches by a reader thread while the
+	batches already read are merged into the network, see
+	bibliograph.ingest.ingestBatches. At most maxQueued batches wait to
+	be merged, so no input file is held in memory.
+	ADS enrichment queries the entries present before it started in
+	chunks of rows; references it adds are not queried, also when a
+	run is resumed. After each input file and every checkpointEvery
+	ADS chunks, the network is written to the checkpoint directory,
+	so an interrupted run can be resumed where it stopped. Each
+	checkpoint rewrites the whole network, so checkpointing fewer ADS
+	chunks keeps large runs from spending most of their time writing
+	checkpoints. The authors stage stores integer author ids in the
+	bibliography and saves the table of normalized names, which the
+	next run (of this or any other configuration using the same
+	table) loads instead of normalizing every name again.
+
+	Configuration keys:
+
+		name        prefix of the exported network files (required)
+		bibcols     bibliography column labels
+		refcols     columns joined to create the ref uid, or a uid column
+		fingerprint use 64-bit fingerprints of refs as uids, default
+		            false
+		database    SQLite file to keep the network in instead of
+		            memory. The database is the checkpoint, so only
+		            the list of completed steps is written to the
+		            checkpoint directory. A run that is not resumed
+		            refuses to start if the file exists, unless run
+		            is called with overwrite=True (bibliograph run
+		            --overwrite), which deletes it.
+		batchSize   entries per batch, default 1000
+		maxQueued   batches read ahead of merging, default 4
+		checkpoints checkpoint directory, default name + '-checkpoints'
+		checkpointEvery
+		            ADS chunks per checkpoint, default 10. The last
+		            chunk is always checkpointed.
+		inputs      list of {"bibtex": filename, "tag_processors": {...}}
+		            or {"csv": filename, "direction": ..., "separator":
+		            ..., "translator": ..., "noNewSources": ...}
+		ads         {"bibcodes": {"searchColumns": [...], "adsTerms":
+		            [...]}, "references": {"searchColumns": [...],
+		            "fetchTerms": [...], "fetchColumns": [...],
+		            "articleProcessor": ...}}
+		authors     {"column": "author", "idColumn": "authorId",
+		            "allAuthors": false, "table": filename}, see
+		            citnet.authorIds. table defaults to name +
+		            '-authors.json'.
+
+	Functions are given as "module:function" strings.
+
+	Parameters
+	----------
+	config : dictionary
+		Pipeline configuration
+
+	monitor : bibliograph.instrument.monitor
+		Receives messages, progress reports, timers and counters.
+		Defaults to the monitor returned by
+		bibliograph.instrument.getMonitor.
+	'''
+	def __init__(self, config, monitor=None):
+		if 'name' not in config:
+			raise ValueError('pipeline configuration needs a name')
+		self.config = config
+		self.monitor = monitor if monitor is not None else getMonitor()
+		self.name = config['name']
+		self.batchSize = config.get('batchSize', 1000)
+		self.maxQueued = config.get('maxQueued', 4)
+		self.checkpoints = config.get('checkpoints', self.name + '-checkpoints')
+		self.checkpointEvery = config.get('checkpointEvery', 10)
+		self.statefile = os.path.join(self.checkpoints, 'state.json')
+		self.prefix = os.path.join(self.checkpoints, 'checkpoint')
+		self.completed = []
+		self.adsRows = None
+		self.throughput = {}
+		self.cn = None
+
+	def newCitnet(self, overwrite=False):
+		config = self.config
+		database = config.get('database')
+		if database is not None:
+			if os.path.isfile(database) and not overwrite:
+				raise FileExistsError('Database ' + database + ' already exists. Resume the run, or overwrite the database to start over.')
+			for name in [database, database + '-wal', database + '-shm']:
+				if os.path.isfile(name):
+					os.remove(name)
+		return(citnet(bibcols=config.get('bibcols'), refcols=config.get('refcols', 'title'), database=database, fingerprint=config.get('fingerprint', False), monitor=self.monitor))
+
+	def checkpoint(self, step, graph=False, write=True):
+		'''
+		Write the network and the list of completed steps to the
+		checkpoint directory. Files are written under temporary names
+		and moved into place so an interrupted write never replaces a
+		good checkpoint. Networks kept in a database are already
+		committed, so only the completed steps are written. If write
+		is False, step is only added to the completed steps written by
+		the next checkpoint; if the run stops before then, it is run
+		again when resuming.
+		'''
+		self.completed.append(step)
+		if not write:
+			return
+		os.makedirs(self.checkpoints, exist_ok=True)
+		with self.monitor.stage('checkpoint'):
+			if self.cn.store is None:
+				self.cn.bib.to_json(self.prefix + '-bib.json.tmp')
+				self.cn.cit.to_json(self.prefix + '-cit.json.tmp')
+				os.replace(self.prefix + '-bib.json.tmp', self.prefix + '-bib.json')
+				os.replace(self.prefix + '-cit.json.tmp', self.prefix + '-cit.json')
+			if graph:
+				import networkx as nx
+				nx.write_graphml(self.cn.graph, self.prefix + '.graphml.tmp')
+				os.replace(self.prefix + '.graphml.tmp', self.prefix + '.graphml')
+			self.writeState()
+
+	def writeState(self):
+		'''
+		Write the completed steps, and the number of entries the ads
+		stage queries once it has started, to the state file.
+		'''
+		os.makedirs(self.checkpoints, exist_ok=True)
+		with open(self.statefile + '.tmp', 'w') as f:
+			json.dump({'completed': self.completed, 'adsRows': self.adsRows}, f)
+		os.replace(self.statefile + '.tmp', self.statefile)
+
+	def resume(self):
+		'''
+		Load the network and completed steps from the checkpoint
+		directory. Returns False if there is no checkpoint.
+
+		A database may hold batches committed after the last
+		checkpoint. Those steps are run again, which is safe because
+		updates only fill missing values and citations are unique.
+		'''
+		if not os.path.isfile(self.statefile):
+			return(False)
+		with open(self.statefile) as f:
+			state = json.load(f)
+		self.completed = state['completed']
+		self.adsRows = state.get('adsRows')
+		config = self.config
+		if config.get('database') is not None:
+			self.cn = citnet(bibcols=config.get('bibcols'), refcols=config.get('refcols', 'title'), database=config['database'], fingerprint=config.get('fingerprint', False), monitor=self.monitor)
+		else:
+			self.cn = citnet(fileprefix=self.prefix, refcols=config.get('refcols', 'title'), monitor=self.monitor)
+		self.monitor.message('Resuming after ' + str(len(self.completed)) + ' completed steps')
+		return(True)
+
+	def readInput(self, spec):
+		'''
+		Reader for one input in the configuration: an iterator over
+		batches of the input, which doesn't touch the network while
+		it is iterated so it can run in a reader thread.
+		'''
+		config = self.config
+		if 'bibtex' in spec:
+			return(iterBibTex(spec['bibtex'], bibcols=config.get('bibcols'), refcols=config.get('refcols', 'title'), tag_processors=resolveProcessors(spec.get('tag_processors')), batchSize=self.batchSize, monitor=self.monitor))
+		elif 'csv' in spec:
+			bibcols, uid = self.cn.inputColumns()
+			return(iterReferenceCSV(spec['csv'], bibcols, uid, direction=spec.get('direction', 'outgoing'), separator=spec.get('separator', ' | '), translator=resolve(spec.get('translator')), batchSize=self.batchSize, monitor=self.monitor))
+		else:
+			raise ValueError('pipeline inputs need a "bibtex" or "csv" key, got ' + str(spec))
+
+	def ingest(self):
+		for i, spec in enumerate(self.config.get('inputs', [])):
+			step = 'ingest:' + str(i)
+			if step in self.completed:
+				continue
+			self.monitor.message('Ingesting ' + str(spec.get('bibtex', spec.get('csv'))))
+			ingestBatches(self.cn, [self.readInput(spec)], maxQueued=self.maxQueued, noNewSources=spec.get('noNewSources', False))
+			self.checkpoint(step)
+
+	def ads(self):
+		config = self.config.get('ads')
+		if config is None:
+			return
+		bibcodes = config.get('bibcodes')
+		references = config.get('references')
+		if self.adsRows is None:
+			# rows added by ADS get the next labels, so the rows to
+			# query stay the same however many chunks have been merged
+			self.adsRows = len(self.cn.store) if self.cn.store is not None else len(self.cn.bib)
+			self.writeState()
+		starts = range(0, self.adsRows, self.batchSize)
+		for n, start in enumerate(starts):
+			step = 'ads:' + str(start)
+			if step in self.completed:
+				continue
+			# labels, not a mask over bib, so only the chunk is read
+			# from a database
+			chunk = list(range(start, min(start + self.batchSize, self.adsRows)))
+			if bibcodes is not None:
+				self.cn.getADSbibcodes(bibcodes['searchColumns'], adsTerms=bibcodes.get('adsTerms'), toQuery=chunk)
+			if references is not None:
+				toQuery = chunk
+				if 'bibcode' in self.cn.columns:
+					rows = self.cn.entries(chunk)
+					toQuery = list(rows.index[rows['bibcode'].notna() & ~rows['bibcode'].isin(['?', '', 'x'])])
+				self.cn.queryADS(references['searchColumns'], list(references['fetchTerms']), adsTerms=references.get('adsTerms'), fetchColumns=references.get('fetchColumns'), articleProcessor=resolve(references.get('articleProcessor')), toQuery=toQuery)
+			due = ((n + 1) % self.checkpointEvery == 0) or (n == len(starts) - 1)
+			self.checkpoint(step, write=due or (self.cn.store is not None))
+
+	def authors(self):
+		config = self.config.get('authors')
+		if (config is None) or ('authors' in self.completed):
+			return
+		table = config.get('table', self.name + '-authors.json')
+		self.cn.authorIds(column=config.get('column', 'author'), idColumn=config.get('idColumn', 'authorId'), allAuthors=config.get('allAuthors', False), authors=table)
+		self.cn.authors.write(table)
+		self.checkpoint('authors')
+
+	def graph(self):
+		if 'graph' in self.completed:
+			return
+		self.cn.graph = self.cn._buildGraph()
+		self.checkpoint('graph', graph=True)
+
+	def export(self):
+		self.cn.writeNetwork(self.name)
+
+	def run(self, stages=STAGES, resume=False, overwrite=False):
+		'''
+		Run the pipeline.
+
+		Parameters
+		----------
+		stages : list-like
+			Names of stages to run, a subset of STAGES
+
+		resume : boolean
+			If True, continue from the last checkpoint instead of
+			starting over. Raises FileNotFoundError if there is no
+			checkpoint.
+
+		overwrite : boolean
+			If True, delete an existing database (see the database
+			configuration key) when starting over. If False, starting
+			over with an existing database raises FileExistsError.
+
+		Returns
+		-------
+		citnet
+			The network built by the pipeline
+		'''
+		if resume:
+			if not self.resume():
+				raise FileNotFoundError('Found no checkpoint to resume from in ' + self.checkpoints)
+		else:
+			self.cn = self.newCitnet(overwrite=overwrite)
+			self.completed = []
+
+		for stage in STAGES:
+			if stage not in stages:
+				continue
+			before = dict(self.monitor.counters)
+			start = time.perf_counter()
+			with self.monitor.stage('pipeline:' + stage):
+				getattr(self, stage)()
+			self.throughput[stage] = self.stageThroughput(stage, time.perf_counter() - start, before)
+
+		self.writeReport()
+		return(self.cn)
+
+	def stageThroughput(self, stage, seconds, before):
+		'''
+		Compute items per second for counters that changed during a
+		stage.
+		'''
+		counts = {k: v - before.get(k, 0) for k, v in self.monitor.counters.items() if v != before.get(k, 0)}
+		rates = {k: (v/seconds if seconds > 0 else None) for k, v in counts.items()}
+		self.monitor.message(stage + ': ' + format(seconds, '.2f') + ' s' + ''.join('\n\t' + k + ': ' + str(v) + ('' if rates[k] is None else ' (' + format(rates[k], '.0f') + '/s)') for k, v in counts.items()))
+		return({'seconds': seconds, 'counts': counts, 'rates': rates})
+
+	def writeReport(self):
+		'''
+		Write per-stage throughput and the monitor report to
+		name + '-pipeline.json'.
+		'''
+		with open(self.name + '-pipeline.json', 'w') as f:
+			json.dump({'stages': self.throughput, 'monitor': self.monitor.report(), 'completed': self.completed}, f, indent=1)
@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+from .instrument import getMonitor
+
+def adjacency(n, src, tgt):
+	'''
+	Compressed adjacency lists: the targets of node i are
+	targets[offsets[i]:offsets[i + 1]].
+	'''
+	order = np.argsort(src, kind='stable')
+	offsets = np.zeros(n + 1, dtype='int64')
+	np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+	return(offsets, tgt[order])
+
+def gather(offsets, targets, nodes):
+	'''
+	Targets of every node in nodes, concatenated
+	'''
+	start = offsets[nodes]
+	counts = offsets[nodes + 1] - start
+	total = counts.sum()
+	if total == 0:
+		return(np.array([], dtype=targets.dtype))
+	shift = np.repeat(start - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+	return(targets[shift + np.arange(total)])
+
+def peel(n, src, tgt, active=None):
+	'''
+	Repeatedly remove nodes with no incoming edges, a whole level at a
+	time, as in Kahn's topological sort.
+
+	Returns
+	-------
+	levels : np.ndarray
+		Level at which each node was removed, counting from 0, or -1
+		for nodes that were never removed because they are on or
+		downstream of a cycle. Inactive nodes are -1.
+	'''
+	levels = np.full(n, -1, dtype='int64')
+	if active is None:
+		active = np.ones(n, dtype=bool)
+	keep = active[src] & active[tgt]
+	src = src[keep]
+	tgt = tgt[keep]
+	indegree = np.bincount(tgt, minlength=n)
+	offsets, targets = adjacency(n, src, tgt)
+	frontier = np.flatnonzero(active & (indegree == 0))
+	level = 0
+	while len(frontier) != 0:
+		levels[frontier] = level
+		reached = gather(offsets, targets, frontier)
+		np.subtract.at(indegree, reached, 1)
+		reached = np.unique(reached)
+		frontier = reached[indegree[reached] == 0]
+		level += 1
+	return(levels)
+
+def strongComponents(n, src, tgt, nodes):
+	'''
+	Strongly connected components of the subgraph induced by nodes,
+	with an iterative version of Tarjan's algorithm.
+
+	Returns
+	-------
+	components : dictionary
+		Component number of every node in nodes
+	'''
+	inside = np.zeros(n, dtype=bool)
+	inside[nodes] = True
+	keep = inside[src] & inside[tgt]
+	offsets, targets = adjacency(n, src[keep], tgt[keep])
+	offsets = offsets.tolist()
+	targets = targets.tolist()
+
+	index = {}
+	low = {}
+	onStack = set()
+	stack = []
+	components = {}
+	count = 0
+	number = 0
+
+	for root in nodes.tolist():
+		if root in index:
+			continue
+		work = [(root, offsets[root])]
+		index[root] = low[root] = count
+		count += 1
+		stack.append(root)
+		onStack.add(root)
+		while work:
+			node, position = work[-1]
+			if position < offsets[node + 1]:
+				work[-1] = (node, position + 1)
+				child = targets[position]
+				if child not in index:
+					index[child] = low[child] = count
+					count += 1
+					stack.append(child)
+					onStack.add(child)
+					work.append((child, offsets[child]))
+				elif child in onStack:
+					low[node] = min(low[node], index[child])
+				continue
+			work.pop()
+			if work:
+				parent = work[-1][0]
+				low[parent] = min(low[parent], low[node])
+			if low[node] == index[node]:
+				while True:
+					member = stack.pop()
+					onStack.discard(member)
+					components[member] = number
+					if member == node:
+						break
+				number += 1
+	return(components)
+
+class reachIndex:
+	'''
+	Index answering whether one paper cites another directly or
+	through a chain of citations, and by which shortest chain, without
+	a fresh traversal of the whole graph for every question.
+
+	Strongly connected components of the citation graph are condensed
+	into single nodes, which leaves a directed acyclic graph. Since
+	citation graphs are nearly acyclic, components are only searched
+	for among the few nodes left after peeling sources and sinks level
+	by level. Every node of the condensed graph gets its height (the
+	longest chain of citations below it), its depth (the longest chain
+	above it) and interval labels [low, rank] for several random
+	reverse topological orders, where low is the smallest rank it can
+	reach. If a reaches b then b is lower, deeper and inside every
+	interval of a, so most negative questions are answered by
+	comparing numbers, and searches for positive answers skip every
+	node that fails the same tests.
+
+	Parameters
+	----------
+	bib : pd.DataFrame
+		The bibliography. Only its index is used.
+
+	cit : pd.DataFrame
+		Citations with 'src' and 'tgt' columns containing index
+		labels of bib. src cites tgt.
+
+	labelings : integer
+		Number of random interval labelings. More labelings answer
+		more negative questions without searching and cost 16 bytes
+		per component each.
+
+	seed : integer
+		Seed for the random orders
+
+	monitor : bibliograph.instrument.monitor
+		Receives timers and counters. Defaults to the monitor returned
+		by bibliograph.instrument.getMonitor.
+	'''
+	def __init__(self, bib, cit, labelings=2, seed=0, monitor=None):
+		self.cit = cit
+		self.monitor = monitor if monitor is not None else getMonitor()
+		self.labels = pd.Index(bib.index)
+		n = len(self.labels)
+
+		with self.monitor.stage('buildReachIndex'):
+			src = self.labels.get_indexer(cit['src'])
+			tgt = self.labels.get_indexer(cit['tgt'])
+			if (src < 0).any() or (tgt < 0).any():
+				raise ValueError('Found citations whose index labels are not in the bibliography')
+			self.offsets, self.targets = adjacency(n, src, tgt)
+			self.roffsets, self.sources = adjacency(n, tgt, src)
+
+			remaining = peel(n, src, tgt) < 0
+			if remaining.any():
+				remaining &= peel(n, tgt, src, active=remaining) < 0
+			core = np.flatnonzero(remaining)
+			components = strongComponents(n, src, tgt, core)
+
+			component = np.full(n, -1, dtype='int64')
+			numCore = 1 + max(components.values()) if components else 0
+			if len(core) != 0:
+				component[core] = [components[i] for i in core.tolist()]
+			single = component < 0
+			component[single] = numCore + np.arange(single.sum())
+			self.component = component
+			numComponents = numCore + int(single.sum())
+
+			csrc = component[src]
+			ctgt = component[tgt]
+			keep = csrc != ctgt
+			pairs = np.unique(csrc[keep]*numComponents + ctgt[keep])
+			csrc = pairs//numComponents
+			ctgt = pairs % numComponents
+			self.coffsets, self.ctargets = adjacency(numComponents, csrc, ctgt)
+			self.rcoffsets, self.csources = adjacency(numComponents, ctgt, csrc)
+
+			self.height = peel(numComponents, ctgt, csrc)
+			self.depth = peel(numComponents, csrc, ctgt)
+
+			random = np.random.default_rng(seed)
+			self.low = []
+			self.rank = []
+			levelOrder = np.argsort(self.height[csrc], kind='stable')
+			byLevel = np.searchsorted(self.height[csrc][levelOrder], np.arange(self.height.max() + 2 if numComponents else 1))
+			for i in range(labelings):
+				order = np.lexsort((random.random(numComponents), self.height))
+				rank = np.empty(numComponents, dtype='int64')
+				rank[order] = np.arange(numComponents)
+				low = rank.copy()
+				for h in range(1, len(byLevel) - 1):
+					edges = levelOrder[byLevel[h]:byLevel[h + 1]]
+					if len(edges) != 0:
+						np.minimum.at(low, csrc[edges], low[ctgt[edges]])
+				self.low.append(low)
+				self.rank.append(rank)
+
+		self.monitor.count('reach index components', numComponents)
+		self.monitor.count('reach index condensed edges', len(pairs))
+		self.numComponents = numComponents
+		self.numCondensedEdges = len(pairs)
+
+	def nbytes(self):
+		'''
+		Memory used by the index arrays, in bytes
+		'''
+		arrays = [self.offsets, self.targets, self.roffsets, self.sources, self.component, self.coffsets, self.ctargets, self.rcoffsets, self.csources, self.height, self.depth] + self.low + self.rank
+		return(sum(a.nbytes for a in arrays))
+
+	def position(self, label):
+		position = self.labels.get_loc(label)
+		if not isinstance(position, (int, np.integer)):
+			raise ValueError('Bibliography index label ' + str(label) + ' is not unique')
+		return(position)
+
+	def mayReach(self, a, b):
+		'''
+		False if component a can't reach component b by the height,
+		depth and interval tests. True means a search is needed. a or
+		b can be an array of components.
+		'''
+		possible = (self.height[a] > self.height[b]) & (self.depth[a] < self.depth[b])
+		for low, rank in zip(self.low, self.rank):
+			possible = possible & (low[a] <= low[b]) & (rank[a] >= rank[b])
+		return(possible)
+
+	def componentReaches(self, a, b):
+		'''
+		Search the condensed graph for a chain from component a to
+		component b, from both ends and one whole level at a time,
+		skipping components that fail the tests of mayReach.
+		'''
+		if a == b:
+			return(True)
+		if not self.mayReach(a, b):
+			return(False)
+		forward = np.zeros(self.numComponents, dtype=bool)
+		backward = np.zeros(self.numComponents, dtype=bool)
+		forward[a] = True
+		backward[b] = True
+		forwardFrontier = np.array([a])
+		backwardFrontier = np.array([b])
+		while (len(forwardFrontier) != 0) and (len(backwardFrontier) != 0):
+			if len(forwardFrontier) <= len(backwardFrontier):
+				children = np.unique(gather(self.coffsets, self.ctargets, forwardFrontier))
+				if backward[children].any():
+					return(True)
+				children = children[~forward[children]]
+				forwardFrontier = children[self.mayReach(children, b)]
+				forward[forwardFrontier] = True
+			else:
+				parents = np.unique(gather(self.rcoffsets, self.csources, backwardFrontier))
+				if forward[parents].any():
+					return(True)
+				parents = parents[~backward[parents]]
+				backwardFrontier = parents[self.mayReach(a, parents)]
+				backward[backwardFrontier] = True
+		return(False)
+
+	def reaches(self, src, tgt):
+		'''
+		True if the paper with index label src cites the paper with
+		index label tgt directly or through a chain of citations. A
+		paper reaches itself.
+		'''
+		return(self.componentReaches(self.component[self.position(src)], self.component[self.position(tgt)]))
+
+	def expand(self, frontier, offsets, targets, keep, visited, other):
+		'''
+		Visit the unvisited neighbors of a frontier which pass keep,
+		recording the node they were reached from in visited.
+
+		Returns
+		-------
+		meeting : integer
+			A neighbor already visited from the other end, or None
+
+		frontier : np.ndarray
+			The newly visited neighbors
+		'''
+		neighbors = gather(offsets, targets, frontier)
+		reachedFrom = np.repeat(frontier, offsets[frontier + 1] - offsets[frontier])
+		passed = keep(self.component[neighbors])
+		nextFrontier = []
+		for node, previous in zip(neighbors[passed].tolist(), reachedFrom[passed].tolist()):
+			if node in visited:
+				continue
+			visited[node] = previous
+			if node in other:
+				return(node, None)
+			nextFrontier.append(node)
+		return(None, np.array(nextFrontier, dtype='int64'))
+
+	def path(self, src, tgt):
+		'''
+		Shortest chain of citations from src to tgt, found by a
+		breadth-first search from both ends that skips every paper
+		which can't reach tgt or be reached from src. Since no paper
+		on a chain is skipped, the first level at which the searches
+		meet gives a shortest chain.
+
+		Returns
+		-------
+		path : list
+			Index labels from src to tgt, or None if src doesn't reach
+			tgt
+		'''
+		start = self.position(src)
+		end = self.position(tgt)
+		if start == end:
+			return([src])
+		source = self.component[start]
+		target = self.component[end]
+		if not self.componentReaches(source, target):
+			return(None)
+
+		forward = {start: None}
+		backward = {end: None}
+		forwardFrontier = np.array([start])
+		backwardFrontier = np.array([end])
+		meeting = None
+		while (meeting is None) and (len(forwardFrontier) != 0) and (len(backwardFrontier) != 0):
+			if len(forwardFrontier) <= len(backwardFrontier):
+				meeting, forwardFrontier = self.expand(forwardFrontier, self.offsets, self.targets, lambda c: (c == target) | self.mayReach(c, target), forward, backward)
+			else:
+				meeting, backwardFrontier = self.expand(backwardFrontier, self.roffsets, self.sources, lambda c: (c == source) | self.mayReach(source, c), backward, forward)
+
+		if meeting is None:
+			return(None)
+		path = [meeting]
+		while forward[path[0]] is not None:
+			path.insert(0, forward[path[0]])
+		while backward[path[-1]] is not None:
+			path.append(backward[path[-1]])
+		return([self.labels[p] for p in path])
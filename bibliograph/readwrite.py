@@ -1,16 +1,92 @@
 import csv
-import progressbar
-import networkx as nx
 import pandas as pd
-from .util import bibUpdate
+from .ingest import overlap
+from .instrument import getMonitor
+from .util import entryBatch
 from .util import getBibtexTags
-from .util import refToBib
 
-def slurpBibTex(cn, bibTexFilename, bibcols=None, refcols='title', tag_processors=None):
+def texEntries(bibTexFilename, chunkSize=2**20):
 	'''
-	Read a BibTex file and create a pandas DataFrame for the
-	bibliography.
-	
+	Yield the text of each entry in a BibTex file, reading the file in
+	chunks. Equivalent to open(bibTexFilename).read().split('@')[1:]
+	without holding the whole file in memory.
+
+	Parameters
+	----------
+	bibTexFilename : string
+		Name of a file containing BibTex data
+
+	chunkSize : integer
+		Number of characters to read at a time
+	'''
+	with open(bibTexFilename, encoding='utf8') as f:
+		buffer = ''
+		first = True
+		while True:
+			chunk = f.read(chunkSize)
+			if chunk == '':
+				break
+			parts = (buffer + chunk).split('@')
+			buffer = parts.pop()
+			for part in parts:
+				if first:
+					first = False
+				else:
+					yield part
+		if not first:
+			yield buffer
+
+def columnProcessor(func):
+	'''
+	Mark a BibTex tag processor as column-wise. Instead of being
+	called once for every entry with the text of one tag, a
+	column-wise processor is called once per batch with a pd.Series
+	of the raw text of that tag in every entry of the batch that has
+	it, and returns a list-like of processed values of the same
+	length, so it can use vectorized string methods. Use as a
+	decorator:
+
+		@columnProcessor
+		def firstAuthor(texts):
+			return(texts.str.split(' and ').str[0].str.strip())
+
+		tag_processors = {'author': ['author', firstAuthor]}
+	'''
+	func.columnwise = True
+	return(func)
+
+def makeEntries(rows, raw, columnProcessors, bibcols, refcols):
+	'''
+	Apply column-wise tag processors to one batch of parsed BibTex
+	entries, add the ref column and return a DataFrame with columns
+	bibcols.
+	'''
+	entries = pd.DataFrame(rows, index=range(len(rows)))
+
+	for tag, (positions, texts) in raw.items():
+		texts = pd.Series(texts, index=positions, dtype=object)
+		for column, processor in columnProcessors[tag]:
+			values = processor(texts)
+			if len(values) != len(texts):
+				raise ValueError('Column-wise processor for tag ' + tag + ' returned ' + str(len(values)) + ' values for ' + str(len(texts)) + ' entries')
+			entries[column] = pd.Series(list(values), index=positions)
+
+	if type(refcols) != str:
+		ref = pd.Series('', index=entries.index, dtype=object)
+		for key in refcols:
+			if key in entries.columns:
+				present = entries[key].notna()
+				ref[present] = ref[present] + entries.loc[present, key] + ' '
+		entries['ref'] = ref.str[:-1].astype(str)
+
+	return(entries.reindex(columns=bibcols).fillna('x'))
+
+def iterBibTex(bibTexFilename, bibcols=None, refcols='title', tag_processors=None, batchSize=1000, monitor=None):
+	'''
+	Read a BibTex file and yield bibliography entries in batches.
+	Parsing is the same as in slurpBibTex, which merges these batches
+	into a citnet.
+
 	Parameters
 	----------
 	bibTexFilename : string
@@ -27,24 +103,24 @@ def slurpBibTex(cn, bibTexFilename, bibcols=None, refcols='title', tag_processor
 		contain a column label. Defaults to 'title'.
 
 	tag_processors : dictionary
-		tag_processors is a dictionary with format 
-		
-			{bibTexTag:[columnName, function_to_process_bibTex]}
-		or
-			{bibTexTag:[[columnName1, function1_to_process_bibTex],
-						[columnName2, function2_to_process_bibTex]]}
+		See slurpBibTex
 
-		where bibTexTag is a field in the BibTex entries, columnName
-		is the label for a bibliography column where data from that
-		tag should be stored, and the functions translate the text of
-		the BibTex entry into a value that should be stored in the 
-		bibliography column
+	batchSize : integer
+		Number of entries in each batch
+
+	monitor : bibliograph.instrument.monitor
+		Receives messages, progress reports and counters. Defaults to
+		the monitor returned by bibliograph.instrument.getMonitor.
 
-	Returns
-	-------
-	bib : pd.DataFrame
-		The bibliography
+	Yields
+	------
+	pd.DataFrame
+		Up to batchSize bibliography entries with columns bibcols.
+		Missing values are 'x'.
 	'''
+	if monitor is None:
+		monitor = getMonitor()
+
 	texTags = getBibtexTags(bibTexFilename)
 
 	if bibcols is None:
@@ -53,35 +129,49 @@ def slurpBibTex(cn, bibTexFilename, bibcols=None, refcols='title', tag_processor
 	if (type(refcols) == str) and (refcols not in bibcols):
 		raise ValueError('If using an existing column instead of a "ref" column, refcols must be in bibcols.')
 
+	tags_to_process = []
+	translated = []
+
 	if not all([c in texTags for c in bibcols]):
 
 		if tag_processors is None:
 			if not any([c in texTags for c in bibcols]):
 				raise ValueError('bibcols contains no values which are tags in the bibTex file, but no translation dictionary was given.')
 			else: 
-				tags_to_process = []
-				print('No bibTex tag translators given. bibliography columns not listed as tags in the bibTex file:\n\t', [c for c in bibcols if c not in texTags], '\n')
+				monitor.message('No bibTex tag translators given. bibliography columns not listed as tags in the bibTex file:\n\t', [c for c in bibcols if c not in texTags], '\n')
 		else:
 			if not all([t in texTags for t in tag_processors.keys()]):
 				raise ValueError('tag_processors contains keys which are not tags in the bibTex file.')
 			tags_to_process = tag_processors.keys()
-			translated = []
 
 		for tag in tags_to_process:
 			processor = tag_processors[tag]
 			if type(processor[0]) is not str:
 				for thisProcessor in processor:
-					print('bibTex tag translator found:', tag, '->', thisProcessor[0])
+					monitor.message('bibTex tag translator found:', tag, '->', thisProcessor[0])
 					translated.append(thisProcessor[0])
 			else:
-				print('bibTex tag translator found:', tag, '->', tag_processors[tag][0])
+				monitor.message('bibTex tag translator found:', tag, '->', tag_processors[tag][0])
 				translated.append(tag_processors[tag][0])
-		print('bibliography columns not translated from bibTex data:', [c for c in bibcols if c not in translated], '\n')
+		monitor.message('bibliography columns not translated from bibTex data:', [c for c in bibcols if c not in translated], '\n')
+
+	itemProcessors = {}
+	columnProcessors = {}
+	for tag in tags_to_process:
+		processor = tag_processors[tag]
+		if type(processor[0]) is str:
+			processor = [processor]
+		for thisProcessor in processor:
+			if getattr(thisProcessor[1], 'columnwise', False):
+				columnProcessors.setdefault(tag, []).append(thisProcessor)
+			else:
+				itemProcessors.setdefault(tag, []).append(thisProcessor)
 
-	#bib = pd.DataFrame(columns=bibcols, dtype='str')
-			
-	for texEntry in open(bibTexFilename, encoding='utf8').read().split('@')[1:]:
-		
+	rows = []
+	raw = {}
+
+	for n, texEntry in enumerate(texEntries(bibTexFilename)):
+	
 		bibEntry = {}
 		texEntry = texEntry.translate(str.maketrans('','','{}\t')).split('\n')
 
@@ -100,27 +190,174 @@ def slurpBibTex(cn, bibTexFilename, bibcols=None, refcols='title', tag_processor
 					item = item[:-1]
 
 				if tag in tags_to_process:
-					thisTag = tag_processors[tag]
-					if type(thisTag[0]) is not str:
-						for processor in thisTag:
-							bibEntry[processor[0]] = processor[1](item)
-					else:
-						bibEntry[thisTag[0]] = thisTag[1](item)
+					for processor in itemProcessors.get(tag, []):
+						bibEntry[processor[0]] = processor[1](item)
+					if tag in columnProcessors:
+						positions, texts = raw.setdefault(tag, ([], []))
+						positions.append(len(rows))
+						texts.append(item)
 				elif tag in bibcols:
 					bibEntry[tag] = item
 
-		if type(refcols) != str:
-			bibEntry['ref'] = ''
-			for key in refcols:
-				if key in bibEntry.keys():
-					bibEntry['ref'] += bibEntry[key] + ' '
-			bibEntry['ref'] = bibEntry['ref'][:-1]
+		rows.append(bibEntry)
+		monitor.count('entries parsed')
+		monitor.progress('Parsing ' + bibTexFilename, n + 1)
+
+		if len(rows) == batchSize:
+			yield makeEntries(rows, raw, columnProcessors, bibcols, refcols)
+			rows = []
+			raw = {}
+
+	if len(rows) != 0:
+		yield makeEntries(rows, raw, columnProcessors, bibcols, refcols)
+
+def slurpBibTex(cn, bibTexFilename, bibcols=None, refcols='title', tag_processors=None, batchSize=1000):
+	'''
+	Read a BibTex file and create a pandas DataFrame for the
+	bibliography.
+	
+	Parameters
+	----------
+	bibTexFilename : string
+		Name of a file containing BibTex data
+
+	bibcols : list-like
+		Labels of columns the bibliography will contain. If None, the
+		bibliography will contain columns for every tag in the BibTex
+		file.
+
+	refcols : list-like OR string
+		Labels of columns whose values should be joined by spaces to
+		create a unique reference string for each row. If string, must
+		contain a column label. Defaults to 'title'.
+
+	tag_processors : dictionary
+		tag_processors is a dictionary with format 
+		
+			{bibTexTag:[columnName, function_to_process_bibTex]}
+		or
+			{bibTexTag:[[columnName1, function1_to_process_bibTex],
+						[columnName2, function2_to_process_bibTex]]}
+
+		where bibTexTag is a field in the BibTex entries, columnName
+		is the label for a bibliography column where data from that
+		tag should be stored, and the functions translate the text of
+		the BibTex entry into a value that should be stored in the 
+		bibliography column. Functions decorated with columnProcessor
+		are instead called once per batch with the text of their tag
+		in every entry, see columnProcessor.
+
+	batchSize : integer
+		Number of entries parsed before they are merged into the
+		bibliography with citnet.updateMany. Batches are parsed in a
+		reader thread while earlier batches are merged, see
+		bibliograph.ingest.overlap.
+	'''
+	with cn.monitor.stage('slurpBibTex'):
+		overlap([iterBibTex(bibTexFilename, bibcols=bibcols, refcols=refcols, tag_processors=tag_processors, batchSize=batchSize, monitor=cn.monitor)], cn.updateMany, monitor=cn.monitor)
+
+def iterReferenceCSV(csvname, bibcols, uid, direction='outgoing', separator=' | ', translator=None, batchSize=1000, monitor=None):
+	'''
+	Read a reference CSV file in the format described in
+	slurpReferenceCSV and yield its entries and citations in batches.
+
+	Parameters
+	----------
+	csvname : string
+		Name of csv file
+
+	bibcols : list-like
+		Labels of the bibliography columns
+
+	uid : string (probably)
+		Label of the column containing unique identifiers for each
+		bibliography entry.
+
+	direction : string
+		"outgoing" if references in column two are cited by the paper
+		in column one, "incoming" if they cite it.
 
-		cn.update(pd.Series(bibEntry, index=bibcols))
+	separator : string
+		separator between bibliography fields listed for each citation
+		in the csv file.
 
-	#return(bib)
+	translator : function
+		See slurpReferenceCSV
+
+	batchSize : integer
+		Number of references in each batch
 
-def slurpReferenceCSV(cn, csvname, direction='outgoing', noNewSources=False, separator=' | ', translator=None):
+	monitor : bibliograph.instrument.monitor
+		Receives progress reports and counters. Defaults to the
+		monitor returned by bibliograph.instrument.getMonitor.
+
+	Yields
+	------
+	bibliograph.util.entryBatch
+		Reference entries, citations between uids, and the uids of the
+		column one papers named since the previous batch.
+	'''
+	if monitor is None:
+		monitor = getMonitor()
+
+	if direction not in ['incoming', 'outgoing']:
+		raise ValueError('slurpReferenceCSV needs direction "incoming" or "outgoing" to define sources and targets in cit DataFrame.\n\tGot ' + str(direction))
+
+	bibcols = list(bibcols)
+
+	with open(csvname, 'r', encoding='utf-8') as f:
+		reader = csv.reader(f, delimiter=',')
+		badEntries = []
+		entries = []
+		edges = []
+		sources = []
+		thisSrc = None
+		for row in reader:
+			monitor.count('csv rows')
+			monitor.progress('Reading ' + csvname, reader.line_num)
+			row = [r.strip() for r in row] + ['']*(2 - len(row))
+			paper, reference = row[0], row[1]
+
+			if (paper != '') and (reference != ''):
+				raise ValueError('Found the following row with two entries in ' + csvname + ':\n\t' + str(row))
+			elif (paper == '') and (reference == ''):
+				raise ValueError('Found row with no data at line ' + str(reader.line_num) + ' in ' + csvname)
+			elif reference == '':
+				thisSrc = paper
+				sources.append(paper)
+			else:
+				if thisSrc is None:
+					raise ValueError('Found reference before any bibliography paper at line ' + str(reader.line_num) + ' in ' + csvname)
+				fields = reference.split(separator)
+				if translator is not None:
+					fields = translator(fields)
+					if isinstance(fields, int) and (fields == 0):
+						badEntries.append(str(reader.line_num) + '  ' + reference)
+						continue
+				entry = dict(zip(bibcols, fields))
+				if uid not in entry:
+					raise ValueError('Reference at line ' + str(reader.line_num) + ' in ' + csvname + ' has no value for ' + str(uid))
+				entries.append(entry)
+				if direction == 'outgoing':
+					edges.append((thisSrc, entry[uid]))
+				else:
+					edges.append((entry[uid], thisSrc))
+				monitor.count('entries parsed')
+
+				if len(entries) == batchSize:
+					yield entryBatch(pd.DataFrame(entries, columns=bibcols), pd.DataFrame(edges, columns=['src', 'tgt']), sources)
+					entries = []
+					edges = []
+					sources = []
+
+		if (len(entries) != 0) or (len(sources) != 0):
+			yield entryBatch(pd.DataFrame(entries, columns=bibcols), pd.DataFrame(edges, columns=['src', 'tgt']), sources)
+
+		monitor.message('\tRead ' + str(reader.line_num) + ' rows')
+		if len(badEntries) != 0:
+			raise ValueError('Found ' + str(len(badEntries)) + ' bad entries in csv file:\n\t' + '\n\t'.join(badEntries))
+
+def slurpReferenceCSV(cn, csvname, direction='outgoing', noNewSources=False, separator=' | ', translator=None, batchSize=1000):
 	'''
 	Read a CSV file that contains reference data. File should have two
 	columns and every row should have data in at most one column. If a
@@ -159,10 +396,6 @@ def slurpReferenceCSV(cn, csvname, direction='outgoing', noNewSources=False, sep
 		the bib DataFrame (they're references TO papers in the
 		bibliogrpahy).
 
-	uid : string (probably)
-		Label of the column containing unique identifiers for each
-		bibliography entry.
-
 	noNewSources : boolean
 		If True, only get reference data for papers already listed in
 		the bib DataFrame. If False, add sources in the csv file to
@@ -182,53 +415,16 @@ def slurpReferenceCSV(cn, csvname, direction='outgoing', noNewSources=False, sep
 		translator is None, script assumes reference strings contain
 		data for all bibliography columns listed in the order of
 		columns in the bibliography.
-	'''
-	print('\tSlurping file ' + csvname)
-
-	if direction not in ['incoming', 'outgoing']:
-		raise ValueError('slurpReferenceCSV needs direction "incoming" or "outgoing" to define sources and targets in cit DataFrame.\n\tGot ' + str(direction))
 
-	bibcols = cn.bib.columns
-	oldSources = cn.bib[cn.uid].copy()
+	batchSize : integer
+		Number of references read before they are merged into the
+		bibliography with citnet.applyBatch. Batches are read in a
+		reader thread while earlier batches are merged, see
+		bibliograph.ingest.overlap.
+	'''
+	cn.monitor.message('\tSlurping file ' + csvname)
 
-	with open(csvname, 'r', encoding='utf-8') as f:
-		reader = csv.reader(f, delimiter=',')
-		badEntries = []
-		for row in reader:
-			print('\tReading row ' + str(reader.line_num), end='\r')
-			if direction == 'outgoing':
-				src = row[0].strip()
-				tgt = row[1].strip()
-			elif direction == 'incoming':
-				src = row[1].strip()
-				tgt = row[0].strip()
-
-			if (src != '') and (tgt != ''):
-				raise ValueError('Found the following row with two entries in ' + csvname + ':\n\t' + str(row))
-			elif (src == '') and (tgt == ''):
-				raise ValueError('Found row with no data at line ' + str(reader.line_num) + ' in ' + csvname)
-			elif src == '':
-				thisTgt = tgt.split(' | ')
-				if translator is not None:
-					thisTgt = translator(thisTgt)
-					if thisTgt == 0:
-						badEntries.append(str(reader.line_num) + '  ' + tgt)
-						continue
-				thisTgt = pd.Series(dict(zip(bibcols, thisTgt)), index=bibcols)
-				cn.update(thisTgt, updateCit=True, src=thisSrcI)
-			elif (tgt == ''): 
-				if not (oldSources == src).any():
-					if noNewSources:
-						raise ValueError('Found source in ' + csvname + ' which is not in the bib DataFrame: ' + src)
-					cn.update(refToBib(src, bibcols, cn.refcols))
-					thisSrcI = cn.bib.index[-1]
-				else:
-					thisSrc = cn.bib[cn.bib[cn.uid] == src]
-					if len(thisSrc) > 1:
-						raise RuntimeError('Found repeated values in cn.bib["' + cn.uid + '"] when processing\n' + str(thisSrc))
-					thisSrcI = thisSrc.index[0]
-			else:
-				raise ValueError('Bad row at', reader.line_num, 'in', csvname)
-		print('\tReading row ' + str(reader.line_num))
-		if len(badEntries) != 0:
-			raise ValueError('Found ' + str(len(badEntries)) + ' bad entries in csv file:\n\t' + '\n\t'.join(badEntries))	
\ No newline at end of file
+	with cn.monitor.stage('slurpReferenceCSV'):
+		bibcols, uid = cn.inputColumns()
+		reader = iterReferenceCSV(csvname, bibcols, uid, direction=direction, separator=separator, translator=translator, batchSize=batchSize, monitor=cn.monitor)
+		overlap([reader], lambda batch: cn.applyBatch(batch, noNewSources=noNewSources), monitor=cn.monitor)
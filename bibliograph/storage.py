@@ -0,0 +1,184 @@
+import json
+import os
+import pandas as pd
+
+def partitionKeys(bib, partitionBy):
+	'''
+	Compute the partition key of every bibliography row.
+
+	Parameters
+	----------
+	bib : pd.DataFrame
+		The bibliography
+
+	partitionBy : string OR function
+		Label of a bibliography column whose values are partition
+		keys, or a function that takes the bibliography and returns a
+		list-like of keys, one per row. For example, to partition by
+		decade:
+
+			lambda bib: bib['year'].astype(str).str[:3] + '0'
+
+	Returns
+	-------
+	keys : pd.Series
+		String partition keys indexed like bib
+	'''
+	if callable(partitionBy):
+		keys = pd.Series(list(partitionBy(bib)), index=bib.index)
+	elif partitionBy in bib.columns:
+		keys = bib[partitionBy]
+	else:
+		raise ValueError('partitionBy must be a bibliography column or a function, got ' + str(partitionBy))
+	return(keys.astype(str))
+
+def readMeta(directory):
+	with open(os.path.join(directory, 'meta.json'), encoding='utf8') as f:
+		return(json.load(f))
+
+def isPartitioned(path):
+	'''
+	True if path is a directory written by writePartitioned.
+	'''
+	return(os.path.isdir(path) and os.path.isfile(os.path.join(path, 'meta.json')))
+
+def writePartitioned(cn, directory, partitionBy):
+	'''
+	Write a citation network to a directory as one bibliography file
+	per partition, one citation file per partition holding the
+	citations whose source is in that partition, and a meta.json file
+	describing the partitions. Partition metadata records which
+	partitions the citations in each citation file point to, so
+	loadPartitioned can find the citations touching a partition
+	without reading every file.
+
+	Parameters
+	----------
+	cn : bibliograph.citnet
+		The network to write
+
+	directory : string
+		Name of the directory. Created if it doesn't exist. Files from
+		a network previously written to the directory are removed.
+
+	partitionBy : string OR function
+		See partitionKeys
+	'''
+	os.makedirs(directory, exist_ok=True)
+	metafile = os.path.join(directory, 'meta.json')
+
+	if os.path.isfile(metafile):
+		old = readMeta(directory)
+		for part in old['partitions'].values():
+			for name in [part['bib'], part['cit']]:
+				if os.path.isfile(os.path.join(directory, name)):
+					os.remove(os.path.join(directory, name))
+
+	keys = partitionKeys(cn.bib, partitionBy)
+	labelKeys = pd.Series(keys.values, index=cn.bib.index)
+	srcKeys = labelKeys.reindex(cn.cit['src']).values
+	tgtKeys = labelKeys.reindex(cn.cit['tgt']).values
+	citGroups = pd.Series(range(len(cn.cit))).groupby(srcKeys).indices
+
+	meta = {
+		'uid': cn.uid,
+		'refcols': cn.refcols,
+		'columns': [str(c) for c in cn.bib.columns],
+		'partitionBy': partitionBy if isinstance(partitionBy, str) else None,
+		'rows': len(cn.bib),
+		'edges': len(cn.cit),
+		'partitions': {}
+	}
+
+	with cn.monitor.stage('writePartitioned'):
+		for n, (key, positions) in enumerate(sorted(pd.Series(range(len(cn.bib))).groupby(keys.values).indices.items())):
+			bibName = 'bib-' + str(n).zfill(5) + '.json'
+			citName = 'cit-' + str(n).zfill(5) + '.json'
+			cn.bib.iloc[positions].to_json(os.path.join(directory, bibName), orient='split')
+			edgePositions = citGroups.get(key, [])
+			cn.cit.iloc[edgePositions][['src', 'tgt']].to_json(os.path.join(directory, citName), orient='split')
+			meta['partitions'][key] = {
+				'bib': bibName,
+				'cit': citName,
+				'rows': len(positions),
+				'edges': len(edgePositions),
+				'targets': sorted(set(tgtKeys[edgePositions]))
+			}
+			cn.monitor.progress('Writing partitions', n + 1)
+
+		with open(metafile + '.tmp', 'w', encoding='utf8') as f:
+			json.dump(meta, f, indent=1)
+		os.replace(metafile + '.tmp', metafile)
+
+def loadPartitioned(cn, directory, predicate=None, touching=False):
+	'''
+	Load a network written by writePartitioned into cn, reading only
+	the partitions selected by predicate and the citations between
+	them. Bibliography index labels are renumbered from zero, as if
+	the selected entries had been loaded into an empty network.
+
+	Parameters
+	----------
+	cn : bibliograph.citnet
+		Network to load into. Its bib, cit, uid and refcols are
+		replaced.
+
+	directory : string
+		Directory written by writePartitioned
+
+	predicate : function
+		Takes a partition key (always a string) and returns True if
+		the partition should be loaded. If None, load all partitions.
+
+	touching : boolean
+		If False, only load citations between entries in selected
+		partitions. If True, also load citations between a selected
+		entry and an entry in another partition, and the other
+		entries those citations point to.
+	'''
+	meta = readMeta(directory)
+	parts = meta['partitions']
+	selected = [k for k in parts if (predicate is None) or predicate(k)]
+	selectedSet = set(selected)
+
+	def readBib(key):
+		return(pd.read_json(os.path.join(directory, parts[key]['bib']), orient='split', dtype=False))
+
+	def readCit(key):
+		return(pd.read_json(os.path.join(directory, parts[key]['cit']), orient='split', dtype=False))
+
+	with cn.monitor.stage('loadPartitioned'):
+		frames = [readBib(k) for k in selected]
+		bib = pd.concat(frames) if frames else pd.DataFrame(columns=meta['columns'])
+
+		citKeys = list(selected)
+		if touching:
+			citKeys += [k for k in parts if (k not in selectedSet) and selectedSet.intersection(parts[k]['targets'])]
+		frames = [readCit(k) for k in citKeys if parts[k]['edges'] != 0]
+		cit = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['src', 'tgt'])
+
+		loaded = bib.index
+		srcIn = cit['src'].isin(loaded)
+		tgtIn = cit['tgt'].isin(loaded)
+		if touching:
+			cit = cit[srcIn | tgtIn]
+			missing = pd.Index(cit['src'][~srcIn]).union(pd.Index(cit['tgt'][~tgtIn]))
+			if len(missing) != 0:
+				otherKeys = set(k for k in citKeys if k not in selectedSet)
+				for k in selected:
+					otherKeys.update(t for t in parts[k]['targets'] if t not in selectedSet)
+				extra = [readBib(k) for k in sorted(otherKeys)]
+				extra = [e[e.index.isin(missing)] for e in extra]
+				bib = pd.concat([bib] + extra)
+		else:
+			cit = cit[srcIn & tgtIn]
+
+		cn.monitor.count('partitions loaded', len(selected))
+
+		positions = pd.Series(range(len(bib)), index=bib.index)
+		cn.bib = bib.reset_index(drop=True)
+		cn.cit = pd.DataFrame({'src': positions.reindex(cit['src']).values, 'tgt': positions.reindex(cit['tgt']).values})
+
+	cn.uid = meta['uid']
+	cn.refcols = meta['refcols']
+	cn.notUnique = [c for c in cn.bib if c != cn.uid]
@@ -0,0 +1,300 @@
+import numpy as np
+import pandas as pd
+from .instrument import getMonitor
+
+METRICS = ['papers', 'citations', 'newPapers', 'newCitations', 'maxCitations', 'components', 'largestComponent']
+
+def yearValues(bib, column='year'):
+	'''
+	Numeric values of a bibliography column, NaN where the value
+	can't be converted (like 'x').
+	'''
+	return(pd.to_numeric(bib[column].astype(str).str.strip(), errors='coerce').to_numpy(dtype=float))
+
+def yearIndex(years):
+	'''
+	Index of years, as integers if every year is a whole number
+	'''
+	years = np.asarray(years, dtype=float)
+	if np.all(years == np.round(years)):
+		return(pd.Index(years.astype('int64'), name='year'))
+	return(pd.Index(years, name='year'))
+
+class snapshot:
+	'''
+	The network as it was at the end of one year: the entries that had
+	appeared and the citations made by papers published up to that
+	year. A snapshot holds slices of the sorted arrays of its
+	timeline, so making one copies no data. bib and cit DataFrames are
+	only built when they are accessed.
+
+	Attributes
+	----------
+	year : number
+		Last year included in the snapshot
+
+	positions : np.ndarray
+		Row positions in bib of the entries in the snapshot, in order
+		of arrival
+
+	edgePositions : np.ndarray
+		Row positions in cit of the citations in the snapshot, in
+		order of the citing paper's year
+	'''
+	def __init__(self, line, year, numPapers, numCitations):
+		self.timeline = line
+		self.year = year
+		self.positions = line.nodeOrder[:numPapers]
+		self.edgePositions = line.edgeOrder[:numCitations]
+
+	def __len__(self):
+		return(len(self.positions))
+
+	@property
+	def labels(self):
+		'''
+		Bibliography index labels of the entries in the snapshot
+		'''
+		return(self.timeline.bib.index[self.positions])
+
+	@property
+	def bib(self):
+		return(self.timeline.bib.iloc[self.positions])
+
+	@property
+	def cit(self):
+		return(self.timeline.cit.iloc[self.edgePositions])
+
+	def inDegree(self):
+		'''
+		Citations received by every entry in the snapshot, counting only
+		citations in the snapshot.
+
+		Returns
+		-------
+		counts : pd.Series
+			Number of citations indexed by bibliography index label
+		'''
+		line = self.timeline
+		counts = np.bincount(line.tgt[self.edgePositions], minlength=len(line.bib))
+		return(pd.Series(counts[self.positions], index=self.labels))
+
+	def subgraph(self, graph, uid):
+		'''
+		NetworkX view of graph restricted to the entries and citations
+		in the snapshot. graph must be the graph of the whole network,
+		for example citnet.graph, whose nodes are values in the uid
+		column. Citations between two entries in the snapshot are
+		filtered by the year of the citing paper, since an entry can
+		be cited before it is published.
+		'''
+		import networkx as nx
+		line = self.timeline
+		published = dict(zip(line.bib[uid].to_numpy()[self.positions], line.published[self.positions]))
+		return(nx.subgraph_view(graph, filter_node=published.__contains__, filter_edge=lambda s, t: published[s] <= self.year))
+
+class timeline:
+	'''
+	Citation network ordered in time, for per-year analysis without
+	filtering the bibliography and rebuilding the graph for every
+	year. Entries and citations are sorted once by year, so each year
+	is a prefix of the sorted arrays: snapshot(year) returns views of
+	those prefixes and metrics computes cumulative per-year metrics in
+	a single sweep over them.
+
+	A citation dates from the year of the citing paper (its src). An
+	entry appears in the year given by column or, if it is cited
+	earlier or has no year (like references loaded from a CSV file),
+	the year of the first paper citing it. Entries with no year that
+	are never cited by a dated paper, and citations made by papers
+	with no year, are left out.
+
+	Parameters
+	----------
+	bib : pd.DataFrame
+		The bibliography
+
+	cit : pd.DataFrame
+		Citations with 'src' and 'tgt' columns containing index
+		labels of bib
+
+	column : string (probably)
+		Bibliography column holding years. Default is 'year'.
+
+	monitor : bibliograph.instrument.monitor
+		Receives timers and counters. Defaults to the monitor returned
+		by bibliograph.instrument.getMonitor.
+
+	Attributes
+	----------
+	years : pd.Index
+		Every year in which an entry appears, sorted
+	'''
+	def __init__(self, bib, cit, column='year', monitor=None):
+		self.bib = bib
+		self.cit = cit
+		self.column = column
+		self.monitor = monitor if monitor is not None else getMonitor()
+		self._metrics = None
+
+		with self.monitor.stage('timeline'):
+			positions = pd.Index(bib.index)
+			src = positions.get_indexer(cit['src'])
+			tgt = positions.get_indexer(cit['tgt'])
+			if (src < 0).any() or (tgt < 0).any():
+				raise ValueError('Found citations whose index labels are not in the bibliography')
+			self.src = src
+			self.tgt = tgt
+
+			published = yearValues(bib, column)
+			self.published = published
+			edgeYears = published[src]
+			dated = ~np.isnan(edgeYears)
+			firstCited = pd.Series(edgeYears[dated]).groupby(tgt[dated]).min()
+			arrival = published.copy()
+			arrival[firstCited.index] = np.fmin(arrival[firstCited.index], firstCited.values)
+
+			nodeOrder = np.argsort(arrival, kind='stable')
+			self.nodeOrder = nodeOrder[:np.count_nonzero(~np.isnan(arrival))]
+			self.nodeYears = arrival[self.nodeOrder]
+
+			edgeOrder = np.argsort(edgeYears, kind='stable')
+			self.edgeOrder = edgeOrder[:np.count_nonzero(dated)]
+			self.edgeYears = edgeYears[self.edgeOrder]
+
+			self.years = yearIndex(np.unique(self.nodeYears))
+
+		self.monitor.count('timeline entries', len(self.nodeOrder))
+		self.monitor.count('timeline citations', len(self.edgeOrder))
+
+	def cutoffs(self, year):
+		'''
+		Number of entries and citations in the network at the end of
+		year
+		'''
+		year = float(year)
+		return(int(np.searchsorted(self.nodeYears, year, side='right')), int(np.searchsorted(self.edgeYears, year, side='right')))
+
+	def snapshot(self, year):
+		'''
+		Returns
+		-------
+		bibliograph.temporal.snapshot
+			View of the network at the end of year
+		'''
+		numPapers, numCitations = self.cutoffs(year)
+		return(snapshot(self, year, numPapers, numCitations))
+
+	def metrics(self):
+		'''
+		Cumulative network metrics at the end of every year in years,
+		computed in one sweep that adds each year's entries and
+		citations to running citation counts and to a union-find
+		forest of weakly connected components. The result is cached.
+
+		Returns
+		-------
+		metrics : pd.DataFrame
+			Indexed by year, with columns
+
+				papers            entries in the network
+				citations         citations in the network
+				newPapers         entries that appeared that year
+				newCitations      citations made that year
+				maxCitations      most citations received by one entry
+				components        weakly connected components
+				largestComponent  entries in the largest component
+		'''
+		if self._metrics is not None:
+			return(self._metrics)
+
+		n = len(self.bib)
+		parent = list(range(n))
+		size = [1]*n
+		counts = np.zeros(n, dtype='int64')
+		src = self.src[self.edgeOrder].tolist()
+		tgt = self.tgt[self.edgeOrder].tolist()
+
+		def find(i):
+			while parent[i] != i:
+				parent[i] = parent[parent[i]]
+				i = parent[i]
+			return(i)
+
+		rows = []
+		components = 0
+		largest = 0
+		maxCitations = 0
+		papers = 0
+		citations = 0
+
+		with self.monitor.stage('timelineMetrics'):
+			for year in self.years:
+				numPapers, numCitations = self.cutoffs(year)
+				components += numPapers - papers
+				if (numPapers > papers) and (largest == 0):
+					largest = 1
+
+				if numCitations > citations:
+					# counts only grow, so only entries cited this year
+					# can raise the maximum
+					targets, received = np.unique(self.tgt[self.edgeOrder[citations:numCitations]], return_counts=True)
+					counts[targets] += received
+					maxCitations = max(maxCitations, int(counts[targets].max()))
+					for s, t in zip(src[citations:numCitations], tgt[citations:numCitations]):
+						s = find(s)
+						t = find(t)
+						if s == t:
+							continue
+						if size[s] < size[t]:
+							s, t = t, s
+						parent[t] = s
+						size[s] += size[t]
+						components -= 1
+						if size[s] > largest:
+							largest = size[s]
+
+				rows.append([numPapers, numCitations, numPapers - papers, numCitations - citations, maxCitations, components, largest])
+				papers = numPapers
+				citations = numCitations
+				self.monitor.progress('Computing yearly metrics', len(rows), len(self.years))
+
+		self._metrics = pd.DataFrame(rows, index=self.years, columns=METRICS)
+		return(self._metrics)
+
+	def citationCounts(self, years=None):
+		'''
+		Cumulative citations received by every entry at the end of each
+		year, adding each year's citations to the previous counts.
+
+		The result is dense: it takes 4 bytes per entry and year, so
+		every year of a network with 1M entries over 100 years takes
+		400 MB. Pass only the years needed; citations made after the
+		last of them are not read.
+
+		Parameters
+		----------
+		years : list-like
+			Years to report. Defaults to every year in years.
+
+		Returns
+		-------
+		counts : pd.DataFrame
+			int32 counts, with one row per bibliography index label
+			and one column per year. Entries that hadn't appeared yet
+			have 0.
+		'''
+		years = self.years if years is None else yearIndex(sorted(years))
+		n = len(self.bib)
+		counts = np.zeros(n, dtype='int32')
+		columns = np.zeros((n, len(years)), dtype='int32')
+		done = 0
+		with self.monitor.stage('citationCounts'):
+			for i, year in enumerate(years):
+				cutoff = self.cutoffs(year)[1]
+				if cutoff > done:
+					targets, received = np.unique(self.tgt[self.edgeOrder[done:cutoff]], return_counts=True)
+					counts[targets] += received
+					done = cutoff
+				columns[:, i] = counts
+		return(pd.DataFrame(columns, index=self.bib.index, columns=years))
@@ -1,5 +1,4 @@
 import pandas as pd
-import networkx as nx
 from os.path import isfile
 from shutil import copyfile
 
@@ -71,7 +70,8 @@ def makeGraph(nodes, edges, uid, directed=True):
 
 	edges : pd.DataFrame
 		DataFrame of edges. Contains at least a column labeled 'src'
-		and a columne labeled 'tgt'
+		and a columne labeled 'tgt' whose values are index labels of
+		rows in nodes.
 
 	uid : string (probably)
 		Label of the column containing unique identifiers for each row
@@ -86,6 +86,8 @@ def makeGraph(nodes, edges, uid, directed=True):
 		A NetworkX graph object, either DiGraph or Graph depending on
 		the value of the directed input parameter.
 	'''
+	import networkx as nx
+
 	if uid not in nodes.columns:
 		raise ValueError('uid must be a column in the nodes DataFrame')
 
@@ -94,14 +96,11 @@ def makeGraph(nodes, edges, uid, directed=True):
 	else:
 		g = nx.Graph()
 
-	for i in nodes.index:
-		entry = nodes.loc[i].squeeze()
-		g.add_node(entry[uid])
-		for c in [c for c in nodes.columns if c is not uid]:
-			g.nodes[entry[uid]][c] = entry[c]
+	data = nodes[[c for c in nodes.columns if c != uid]].to_dict('records')
+	g.add_nodes_from(zip(nodes[uid], data))
 
-	for i in edges.index:
-		g.add_edge(edges.loc[i, 'src'], edges.loc[i, 'tgt'])
+	labels = nodes[uid]
+	g.add_edges_from(zip(labels.reindex(edges['src']).values, labels.reindex(edges['tgt']).values))
 
 	return(g)
 
@@ -181,9 +180,186 @@ def bibUpdate(bib, newEntry, uid):
 	else:
 		return(updateResult(False, newEntry))
 
+FINGERPRINT = 'fid'
+
+def refFingerprints(refs):
+	'''
+	Compute stable 64-bit fingerprints of ref strings. Strings are
+	lowercased and runs of whitespace are collapsed before hashing, so
+	refs that differ only in case or spacing get the same fingerprint.
+	Fingerprints are the same in every Python session and are stored
+	as signed integers so they survive JSON and SQLite.
+
+	Parameters
+	----------
+	refs : list-like
+		ref strings made by joining refcols values with spaces
+
+	Returns
+	-------
+	pd.Series, dtype == int64
+		Fingerprints with the index of refs if refs is a pd.Series
+	'''
+	refs = pd.Series(refs, dtype=object)
+	normalized = refs.astype(str).str.lower().str.split().str.join(' ')
+	hashes = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+	return(pd.Series(hashes.view('int64'), index=refs.index))
+
 def refToBib(refString, bibcols, refcols):
 	if refString.count(' ') != len(refcols)-1:
 		raise ValueError("ref string contains fewer values than refcols. Can't convert to series for bib entry")
 	entryDict = dict(zip(refcols, refString.split(' ')))
 	entryDict['ref'] = refString
-	return(pd.Series(entryDict, index=bibcols))
\ No newline at end of file
+	return(pd.Series(entryDict, index=bibcols))
+
+class updateManyResult:
+	'''
+	Object to conveniently store data for a bulk bibliography update
+	operation.
+
+	Attributes
+	----------
+	bib : pd.DataFrame
+		The updated bibliography
+
+	labels : pd.Series
+		Bibliography index label for every unique identifier in the
+		new entries. Series index contains the identifiers.
+
+	inserted : integer
+		Number of entries appended to the bibliography
+
+	updated : integer
+		Number of new entries whose identifier was already in the
+		bibliography
+	'''
+	def __init__(self, bib, labels, inserted, updated):
+		self.bib = bib
+		self.labels = labels
+		self.inserted = inserted
+		self.updated = updated
+
+def collapseEntries(entries, uid):
+	'''
+	Combine bibliography entries with the same unique identifier.
+	Values from earlier entries take precedence and later entries only
+	fill fields that are 'x' or missing.
+
+	Parameters
+	----------
+	entries : pd.DataFrame
+		Bibliography entries
+
+	uid : string (probably)
+		Label of the column containing unique identifiers
+
+	Returns
+	-------
+	entries : pd.DataFrame
+		One row per unique identifier, in order of first appearance.
+		Missing values are NaN rather than 'x'.
+	'''
+	columns = entries.columns
+	entries = entries.where(entries.notna() & (entries != 'x'))
+
+	if entries[uid].isna().any():
+		raise ValueError('Found entries with no value in uid column ' + str(uid))
+
+	if entries[uid].duplicated().any():
+		entries = entries.groupby(uid, sort=False).first().reset_index()[columns]
+
+	return(entries)
+
+def bibUpdateMany(bib, entries, uid):
+	'''
+	Bulk version of bibUpdate. Merge a DataFrame of bibliography
+	entries into the bib DataFrame in one pass. Entries whose uid is
+	already in bib fill fields which are 'x' in bib, new uids are
+	appended. Repeated uids within entries are combined first, with
+	earlier entries taking precedence, so the result is the same as
+	calling bibUpdate for every row in order.
+
+	Parameters
+	----------
+	bib : pd.DataFrame
+		pandas DataFrame containing bibliography data
+
+	entries : pd.DataFrame
+		New bibliography entries. Columns not in bib are ignored and
+		missing columns are treated as 'x'.
+
+	uid : string (probably)
+		Label of the column containing unique identifiers for each
+		bibliography entry.
+
+	Returns
+	-------
+	updateManyResult
+		A bibliograph.util.updateManyResult object containing the
+		updated bibliography and the index label of every entry.
+	'''
+	if len(bib.columns) == 0:
+		bib = pd.DataFrame(columns=entries.columns, dtype=str)
+
+	if uid not in entries.columns:
+		raise ValueError('entries must contain the uid column ' + str(uid))
+
+	entries = collapseEntries(entries.reindex(columns=bib.columns), uid)
+
+	existing = pd.Index(bib[uid])
+	if not existing.is_unique:
+		raise RuntimeError('Found repeated values in bibliography column ' + str(uid))
+
+	positions = existing.get_indexer(entries[uid])
+	found = positions >= 0
+
+	labels = pd.Series(index=entries[uid].values, dtype=object)
+
+	if found.any():
+		old = bib.iloc[positions[found]]
+		new = entries[found].set_index(old.index)
+		bib.loc[old.index] = old.where(old != 'x', new).fillna('x')
+		labels[found] = old.index.values
+
+	added = entries[~found].fillna('x')
+	if len(added):
+		start = len(bib)
+		bib = pd.concat([bib, added], ignore_index=True)
+		labels[~found] = range(start, len(bib))
+
+	labels = labels.infer_objects()
+
+	return(updateManyResult(bib, labels, int((~found).sum()), int(found.sum())))
+
+class entryBatch:
+	'''
+	Bibliography entries and citations read from one chunk of an input
+	file, ready to be merged into a citnet with citnet.applyBatch.
+
+	Attributes
+	----------
+	entries : pd.DataFrame
+		New bibliography entries
+
+	edges : pd.DataFrame
+		Citations between entries, with columns 'src' and 'tgt'
+		containing unique identifiers rather than bibliography index
+		labels. Identifiers must be in entries or sources, or already
+		be in the bibliography the batch is applied to.
+
+	sources : list
+		Unique identifiers of bibliography papers named in the input.
+		Identifiers not found in the bibliography are converted to
+		new entries with refToBib when the batch is applied.
+	'''
+	def __init__(self, entries, edges=None, sources=None):
+		self.entries = entries
+		if edges is None:
+			edges = pd.DataFrame(columns=['src', 'tgt'])
+		self.edges = edges
+		if sources is None:
+			sources = []
+		self.sources = sources
+
+	def __len__(self):
+		return(len(self.entries))
@@ -6,7 +6,9 @@ setup(
     author='Devin Short',
     author_email='short.devin@gmail.com',
     packages=['bibliograph'],
-    install_requires=['ads', 'datetime', 'networkx', 'pandas', 'progressbar'],
+    install_requires=['ads', 'datetime', 'networkx', 'pandas'],
+    extras_require={'arrow': ['pyarrow']},
+    entry_points={'console_scripts': ['bibliograph=bibliograph.cli:main']},
     version='0.01.0-alpha',
     license='MIT',
     description='A Python package for visualizing and analyzing bibliographic data',
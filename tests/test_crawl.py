@@ -0,0 +1,128 @@
+import pytest
+
+pytest.importorskip('ads')
+
+from bibliograph import citnet
+from bibliograph.instrument import monitor
+from benchmarks.mockads import mockADS
+from benchmarks.mockads import mockUniverse
+
+FETCH_TERMS = ['author', 'year', 'title', 'pub', 'volume', 'page']
+
+FETCH_COLUMNS = ['author', 'year', 'title', 'journal', 'volume', 'page']
+
+@pytest.fixture(scope='module')
+def universe():
+	return(mockUniverse(400, refsPerPaper=5))
+
+@pytest.fixture(scope='module')
+def server(universe):
+	with mockADS(universe) as server:
+		yield server
+
+def seedsOf(universe):
+	return([doc['bibcode'] for doc in universe.docs[-3:]])
+
+def expectedLevels(universe, seeds, depth):
+	'''
+	Bibcodes of every level of a crawl along references, each paper
+	in the first level it is found in, in the order it is found
+	'''
+	seen = set(seeds)
+	levels = [list(seeds)]
+	for level in range(depth):
+		found = []
+		for bibcode in levels[-1]:
+			for other in universe.docs[universe.byBibcode[bibcode]]['reference']:
+				if other not in seen:
+					seen.add(other)
+					found.append(other)
+		if len(found) == 0:
+			break
+		levels.append(found)
+	return(levels)
+
+def expectedEdges(universe, fetched):
+	fetched = set(fetched)
+	return({(b, r) for b in fetched for r in universe.docs[universe.byBibcode[b]]['reference'] if r in fetched})
+
+def crawledEdges(cn):
+	bibcodes = cn.bib['bibcode']
+	return(set(zip(bibcodes[cn.cit['src']].values, bibcodes[cn.cit['tgt']].values)))
+
+def newCitnet(refcols='bibcode'):
+	return(citnet(bibcols=FETCH_COLUMNS + ['bibcode'], refcols=refcols, monitor=monitor(quiet=True)))
+
+def test_levels_are_fetched_once(universe, server):
+	seeds = seedsOf(universe)
+	levels = expectedLevels(universe, seeds, 2)
+	fetched = [b for level in levels for b in level]
+	cn = newCitnet()
+	result = cn.snowball(seeds + seeds[:1], FETCH_TERMS, fetchColumns=FETCH_COLUMNS, depth=2, batchSize=7)
+
+	assert result.fetched == fetched
+	assert len(set(result.fetched)) == len(result.fetched)
+	assert result.levels == len(levels)
+	assert result.frontier == []
+	assert result.queries == sum((len(level) + 6)//7 for level in levels)
+	assert len(cn.bib) == len(fetched)
+	assert set(cn.bib['bibcode']) == set(fetched)
+	assert set(result.labels.index) == set(fetched)
+	assert crawledEdges(cn) == expectedEdges(universe, fetched)
+	assert result.edges == len(cn.cit)
+
+def test_depth(universe, server):
+	seeds = seedsOf(universe)
+	cn = newCitnet()
+	result = cn.snowball(seeds, FETCH_TERMS, fetchColumns=FETCH_COLUMNS, depth=0)
+
+	assert result.fetched == seeds
+	assert result.levels == 1
+	assert len(cn.bib) == len(seeds)
+	assert crawledEdges(cn) == expectedEdges(universe, seeds)
+
+def test_maxSize(universe, server):
+	seeds = seedsOf(universe)
+	levels = expectedLevels(universe, seeds, 2)
+	maxSize = len(levels[0]) + len(levels[1])//2
+	cn = newCitnet()
+	result = cn.snowball(seeds, FETCH_TERMS, fetchColumns=FETCH_COLUMNS, depth=2, maxSize=maxSize)
+
+	assert result.fetched == (levels[0] + levels[1])[:maxSize]
+	assert result.frontier == levels[1][maxSize - len(levels[0]):]
+	assert result.levels == 2
+	assert len(cn.bib) == maxSize
+	assert crawledEdges(cn) == expectedEdges(universe, result.fetched)
+
+def test_maxQueries(universe, server):
+	seeds = seedsOf(universe)
+	levels = expectedLevels(universe, seeds, 2)
+	batchSize = 5
+	# the seeds take one query, and level 1 is cut one query short
+	allowed = (len(levels[1]) + batchSize - 1)//batchSize
+	assert allowed > 1
+	cn = newCitnet()
+	result = cn.snowball(seeds, FETCH_TERMS, fetchColumns=FETCH_COLUMNS, depth=2, batchSize=batchSize, maxQueries=allowed)
+
+	assert result.queries == allowed
+	assert result.fetched == levels[0] + levels[1][:(allowed - 1)*batchSize]
+	assert result.frontier == levels[1][(allowed - 1)*batchSize:]
+	assert len(cn.bib) == len(result.fetched)
+	assert crawledEdges(cn) == expectedEdges(universe, result.fetched)
+
+def test_title_uid(universe, server):
+	'''
+	Documents decoded without an articleProcessor have string fields,
+	so entries can be keyed by title, the default uid
+	'''
+	seeds = seedsOf(universe)
+	levels = expectedLevels(universe, seeds, 1)
+	fetched = [b for level in levels for b in level]
+	cn = newCitnet(refcols='title')
+	result = cn.snowball(seeds, FETCH_TERMS, fetchColumns=FETCH_COLUMNS, depth=1)
+
+	titles = {universe.docs[universe.byBibcode[b]]['title'][0] for b in fetched}
+	assert result.fetched == fetched
+	assert set(cn.bib['title']) == titles
+	assert len(cn.bib) == len(titles)
+	assert all(isinstance(v, str) for column in ['author', 'title', 'page'] for v in cn.bib[column])